@@ -0,0 +1,460 @@
+"""
+Augmentare offline: K epoci augmentate (mosaic, scale/translate, HSV, flip) sunt pre-generate
+de un pool de procese în shard-uri compacte (JPEG + etichete), în fundal, în timp ce antrenarea
+citește shard-urile în ordine. Pentru același seed rezultatul este identic, indiferent de
+numărul de procese
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import Dataset, Sampler
+from ultralytics.data.build import InfiniteDataLoader, seed_worker
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+
+from image_store import IMAGE_EXTENSIONS, _load_resized
+from train_mushroom_model import TRAINING_PARAMS
+
+AUGMENT_DIR = Path("runs/augment")
+AUGMENT_VERSION = 2
+SHARD_SIZE = 256
+SEGMENT_POINTS = 100   # poligoanele sunt reeșantionate înainte de transformare (ca în Ultralytics)
+JPEG_QUALITY = 95
+PAD_VALUE = 114
+
+# Hiperparametrii de augmentare preluați din TRAINING_PARAMS
+AUGMENT_KEYS = ('imgsz', 'mosaic', 'close_mosaic', 'degrees', 'translate', 'scale',
+                'hsv_h', 'hsv_s', 'hsv_v', 'fliplr')
+
+def label_path_for(image_path):
+    image_path = Path(image_path)
+    return image_path.parent.parent / 'labels' / f"{image_path.stem}.txt"
+
+def read_polygons(label_path):
+    """Etichetele YOLO ca (clasă, poligon Nx2 normalizat); casetele devin dreptunghiuri cu 4 colțuri"""
+    labels = []
+    if not Path(label_path).exists():
+        return labels
+    with open(label_path) as f:
+        for line in f:
+            values = line.split()
+            if len(values) < 5:
+                continue
+            coords = np.array(values[1:], np.float32)
+            if len(coords) == 4:
+                x, y, w, h = coords
+                points = np.array([[x - w / 2, y - h / 2], [x + w / 2, y - h / 2],
+                                   [x + w / 2, y + h / 2], [x - w / 2, y + h / 2]], np.float32)
+            else:
+                points = coords[:len(coords) // 2 * 2].reshape(-1, 2)
+            labels.append((int(float(values[0])), points))
+    return labels
+
+def _resample(points, n=SEGMENT_POINTS):
+    """Puncte echidistante pe conturul închis: decuparea după transformare rămâne precisă"""
+    closed = np.concatenate([points, points[:1]])
+    t = np.linspace(0, len(closed) - 1, n)
+    xp = np.arange(len(closed))
+    return np.stack([np.interp(t, xp, closed[:, 0]), np.interp(t, xp, closed[:, 1])], 1)
+
+@functools.lru_cache(maxsize=64)
+def _load_sample(image_path, imgsz):
+    """Imaginea redimensionată (latura mare = imgsz) și poligoanele în pixeli; cache per proces"""
+    loaded = _load_resized(image_path, imgsz)
+    if loaded is None:
+        return None
+    image, _ = loaded
+    h, w = image.shape[:2]
+    labels = [(cls, _resample(points) * (w, h))
+              for cls, points in read_polygons(label_path_for(image_path))]
+    return image, labels
+
+def _mosaic(rng, indices, image_paths, imgsz):
+    """Mosaic 2x2 pe o pânză 2s x 2s în jurul unui centru aleator (ca Mosaic din Ultralytics)"""
+    s = imgsz
+    canvas = np.full((2 * s, 2 * s, 3), PAD_VALUE, np.uint8)
+    yc, xc = (int(v) for v in rng.uniform(s / 2, 3 * s / 2, 2))
+    labels = []
+    for i, index in enumerate(indices):
+        sample = _load_sample(image_paths[index], imgsz)
+        if sample is None:
+            continue
+        image, tile_labels = sample
+        h, w = image.shape[:2]
+        if i == 0:    # stânga sus
+            x1a, y1a, x2a, y2a = max(xc - w, 0), max(yc - h, 0), xc, yc
+            x1b, y1b, x2b, y2b = w - (x2a - x1a), h - (y2a - y1a), w, h
+        elif i == 1:  # dreapta sus
+            x1a, y1a, x2a, y2a = xc, max(yc - h, 0), min(xc + w, 2 * s), yc
+            x1b, y1b, x2b, y2b = 0, h - (y2a - y1a), min(w, x2a - x1a), h
+        elif i == 2:  # stânga jos
+            x1a, y1a, x2a, y2a = max(xc - w, 0), yc, xc, min(2 * s, yc + h)
+            x1b, y1b, x2b, y2b = w - (x2a - x1a), 0, w, min(y2a - y1a, h)
+        else:         # dreapta jos
+            x1a, y1a, x2a, y2a = xc, yc, min(xc + w, 2 * s), min(2 * s, yc + h)
+            x1b, y1b, x2b, y2b = 0, 0, min(w, x2a - x1a), min(y2a - y1a, h)
+        canvas[y1a:y2a, x1a:x2a] = image[y1b:y2b, x1b:x2b]
+        # Părțile decupate din fiecare imagine cad în afara pânzei
+        labels += [(cls, np.clip(points + (x1a - x1b, y1a - y1b), 0, 2 * s))
+                   for cls, points in tile_labels]
+    return canvas, labels
+
+def _letterbox(image_path, imgsz):
+    """Imaginea centrată pe o pânză s x s (ca LetterBox din Ultralytics)"""
+    canvas = np.full((imgsz, imgsz, 3), PAD_VALUE, np.uint8)
+    sample = _load_sample(image_path, imgsz)
+    if sample is None:
+        return canvas, []
+    image, labels = sample
+    h, w = image.shape[:2]
+    top, left = (imgsz - h) // 2, (imgsz - w) // 2
+    canvas[top:top + h, left:left + w] = image
+    return canvas, [(cls, points + (left, top)) for cls, points in labels]
+
+def _random_affine(rng, image, labels, hyp):
+    """Rotație/scalare/translație aleatoare cu ieșire s x s; filtrează obiectele aproape dispărute"""
+    s = hyp['imgsz']
+    h, w = image.shape[:2]
+    
+    center = np.eye(3)
+    center[0, 2], center[1, 2] = -w / 2, -h / 2
+    rotate = np.eye(3)
+    scale = rng.uniform(1 - hyp['scale'], 1 + hyp['scale'])
+    rotate[:2] = cv2.getRotationMatrix2D((0, 0), rng.uniform(-hyp['degrees'], hyp['degrees']), scale)
+    translate = np.eye(3)
+    translate[0, 2], translate[1, 2] = rng.uniform(0.5 - hyp['translate'], 0.5 + hyp['translate'], 2) * s
+    matrix = (translate @ rotate @ center)[:2]
+    
+    image = cv2.warpAffine(image, matrix, (s, s), borderValue=(PAD_VALUE,) * 3)
+    kept = []
+    for cls, points in labels:
+        before = np.ptp(points, 0) * scale
+        points = np.clip(points @ matrix[:, :2].T + matrix[:, 2], 0, s)
+        after = np.ptp(points, 0)
+        # Aceleași criterii ca box_candidates din Ultralytics
+        if (after > 2).all() and after.prod() / (before.prod() + 1e-16) > 0.1 \
+                and max(after[0] / after[1], after[1] / after[0]) < 100:
+            kept.append((cls, points))
+    return image, kept
+
+def _augment_hsv(rng, image, hyp):
+    """Jitter HSV cu tabele de căutare (ca RandomHSV din Ultralytics), in-place"""
+    gains = rng.uniform(-1, 1, 3) * (hyp['hsv_h'], hyp['hsv_s'], hyp['hsv_v'])
+    x = np.arange(0, 256, dtype=gains.dtype)
+    lut_hue = ((x + gains[0] * 180) % 180).astype(np.uint8)
+    lut_sat = np.clip(x * (gains[1] + 1), 0, 255).astype(np.uint8)
+    lut_val = np.clip(x * (gains[2] + 1), 0, 255).astype(np.uint8)
+    hue, sat, val = cv2.split(cv2.cvtColor(image, cv2.COLOR_BGR2HSV))
+    hsv = cv2.merge((cv2.LUT(hue, lut_hue), cv2.LUT(sat, lut_sat), cv2.LUT(val, lut_val)))
+    cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR, dst=image)
+
+def augment_sample(variant, index, image_paths, hyp, mosaic, seed):
+    """O imagine augmentată + (clasă, poligon) în pixeli; determinist pentru (seed, variantă, index)"""
+    rng = np.random.default_rng([seed, variant, index])
+    s = hyp['imgsz']
+    if mosaic and rng.random() < hyp['mosaic']:
+        others = rng.integers(0, len(image_paths), 3)
+        image, labels = _mosaic(rng, [index, *others], image_paths, s)
+    else:
+        image, labels = _letterbox(image_paths[index], s)
+    
+    image, labels = _random_affine(rng, image, labels, hyp)
+    _augment_hsv(rng, image, hyp)
+    if rng.random() < hyp['fliplr']:
+        image = np.ascontiguousarray(image[:, ::-1])
+        labels = [(cls, np.stack([s - points[:, 0], points[:, 1]], 1)) for cls, points in labels]
+    return image, labels
+
+def _generate_shard(out_path, variant, indices, image_paths, hyp, mosaic, seed):
+    """Worker: augmentează imaginile unui shard și îl scrie atomic (.tmp + os.replace)"""
+    cv2.setNumThreads(1)
+    s = hyp['imgsz']
+    jpeg, jpeg_offsets = [], [0]
+    cls, boxes, label_offsets = [], [], [0]
+    
+    for index in indices:
+        image, labels = augment_sample(variant, int(index), image_paths, hyp, mosaic, seed)
+        encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])[1]
+        jpeg.append(encoded.ravel())
+        jpeg_offsets.append(jpeg_offsets[-1] + encoded.size)
+        for class_id, polygon in labels:
+            (x1, y1), (x2, y2) = polygon.min(0), polygon.max(0)
+            cls.append(class_id)
+            boxes.append([(x1 + x2) / 2 / s, (y1 + y2) / 2 / s, (x2 - x1) / s, (y2 - y1) / s])
+        label_offsets.append(len(cls))
+    
+    arrays = {
+        'source': np.asarray(indices, np.int64),
+        'jpeg': np.concatenate(jpeg) if jpeg else np.zeros(0, np.uint8),
+        'jpeg_offsets': np.asarray(jpeg_offsets, np.int64),
+        'cls': np.asarray(cls, np.float32),
+        'boxes': np.asarray(boxes, np.float32).reshape(-1, 4),
+        'label_offsets': np.asarray(label_offsets, np.int64),
+    }
+    tmp_path = Path(f"{out_path}.tmp")
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)  # necomprimat: JPEG-urile sunt deja comprimate
+    os.replace(tmp_path, out_path)
+    return out_path
+
+def plan_epochs(epochs, k, close_mosaic):
+    """Varianta augmentată folosită în fiecare epocă: K variante cu mosaic, repetate ciclic,
+    apoi până la K variante fără mosaic pentru ultimele close_mosaic epoci"""
+    open_epochs = max(epochs - close_mosaic, 0)
+    k_open, k_closed = min(k, open_epochs), min(k, epochs - open_epochs)
+    plan = [t % k_open if t < open_epochs else k_open + (t - open_epochs) % k_closed
+            for t in range(epochs)]
+    return plan, [v < k_open for v in range(k_open + k_closed)]
+
+def shard_path(shard_dir, variant, shard):
+    return Path(shard_dir) / f"variant_{variant:03d}_shard_{shard:03d}.npz"
+
+def prepare_shards(image_dir="train/images", k=4, epochs=None, seed=0, shard_dir=AUGMENT_DIR,
+                   shard_size=SHARD_SIZE):
+    """Manifestul rulării; shard-urile existente sunt păstrate doar dacă sursa și parametrii coincid"""
+    image_paths = sorted(str(p) for p in Path(image_dir).iterdir()
+                         if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if not image_paths:
+        print(f"❌ Nicio imagine în {image_dir}")
+        return None
+    
+    hyp = {key: TRAINING_PARAMS[key] for key in AUGMENT_KEYS}
+    epochs = epochs or TRAINING_PARAMS['epochs']
+    plan, mosaic = plan_epochs(epochs, k, hyp['close_mosaic'])
+    
+    digest = hashlib.sha256(f"v{AUGMENT_VERSION}:{seed}:{shard_size}:{json.dumps(hyp)}:"
+                            f"{json.dumps(mosaic)}".encode())
+    for path in image_paths + [str(label_path_for(p)) for p in image_paths]:
+        stat = os.stat(path) if os.path.exists(path) else None
+        digest.update(f"{path}:{stat and stat.st_mtime_ns}:{stat and stat.st_size}".encode())
+    
+    manifest = {'fingerprint': digest.hexdigest(), 'seed': seed, 'hyp': hyp, 'images': image_paths,
+                'shard_size': shard_size, 'plan': plan, 'mosaic': mosaic}
+    shard_dir = Path(shard_dir)
+    manifest_path = shard_dir / "manifest.json"
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if previous['fingerprint'] != manifest['fingerprint']:
+            print(f"🗑️  Shard-urile din {shard_dir} au alte imagini sau alți parametri - se regenerează")
+            shutil.rmtree(shard_dir)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+class ShardGenerator:
+    """Generează shard-urile în fundal, în ordinea în care antrenarea le va citi"""
+    
+    def __init__(self, manifest, shard_dir=AUGMENT_DIR, workers=None):
+        self.manifest = manifest
+        self.shard_dir = Path(shard_dir)
+        self.workers = workers or max(1, (os.cpu_count() or 2) - TRAINING_PARAMS['workers'] - 1)
+        self.failed = []
+    
+    def start(self):
+        manifest = self.manifest
+        n, size = len(manifest['images']), manifest['shard_size']
+        
+        # Ordinea variantelor = ordinea primei folosiri în plan
+        variants = list(OrderedDict.fromkeys(manifest['plan']))
+        jobs = []
+        for variant in variants:
+            order = np.random.default_rng([manifest['seed'], variant]).permutation(n)
+            for shard in range(math.ceil(n / size)):
+                path = shard_path(self.shard_dir, variant, shard)
+                if not path.exists():
+                    jobs.append((str(path), variant, order[shard * size:(shard + 1) * size]))
+        
+        self.total = len(jobs)
+        print(f"🎞️  Augmentare offline: {len(variants)} variante, {self.total} shard-uri de generat "
+              f"({self.workers} procese)")
+        context = multiprocessing.get_context('spawn')
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        # Cozile ProcessPoolExecutor sunt FIFO: primele shard-uri citite sunt gata primele
+        self.futures = [self.pool.submit(_generate_shard, path, variant, indices,
+                                         manifest['images'], manifest['hyp'],
+                                         manifest['mosaic'][variant], manifest['seed'])
+                        for path, variant, indices in jobs]
+        for future in self.futures:
+            future.add_done_callback(self._on_done)
+        return self
+    
+    def _on_done(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            self.failed.append(future.exception())
+            print(f"❌ Generarea unui shard a eșuat: {future.exception()}")
+    
+    def wait(self):
+        for future in self.futures:
+            future.exception()
+        return not self.failed
+    
+    def close(self):
+        """Oprește generarea (ex. early stopping): shard-urile nepornite sunt anulate"""
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+class EpochSampler(Sampler):
+    """Indici globali epocă * n + i, în ordine; fiecare parcurgere trece la epoca următoare"""
+    
+    def __init__(self, n, epoch=0):
+        self.n = n
+        self.epoch = epoch
+    
+    def __iter__(self):
+        epoch, self.epoch = self.epoch, self.epoch + 1
+        return iter(range(epoch * self.n, (epoch + 1) * self.n))
+    
+    def __len__(self):
+        return self.n
+    
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+class ShardDataset(Dataset):
+    """Imaginile augmentate ale fiecărei epoci, citite secvențial din shard-uri"""
+    
+    collate_fn = staticmethod(YOLODataset.collate_fn)
+    
+    def __init__(self, shard_dir=AUGMENT_DIR, timeout=1800, cached_shards=2):
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / "manifest.json") as f:
+            manifest = json.load(f)
+        self.images = manifest['images']
+        self.plan = manifest['plan']
+        self.shard_size = manifest['shard_size']
+        self.imgsz = manifest['hyp']['imgsz']
+        self.timeout = timeout
+        self.cached_shards = cached_shards
+        self._cache = OrderedDict()
+    
+    def __len__(self):
+        return len(self.images)
+    
+    def _load_shard(self, path):
+        """Shard-ul din cache sau de pe disc; așteaptă dacă generatorul nu l-a scris încă"""
+        if path in self._cache:
+            self._cache.move_to_end(path)
+            return self._cache[path]
+        
+        deadline = time.monotonic() + self.timeout
+        while not path.exists():
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Shard-ul {path} nu a fost generat în {self.timeout}s")
+            time.sleep(0.5)
+        with np.load(path) as data:
+            shard = {key: data[key] for key in data.files}
+        
+        self._cache[path] = shard
+        if len(self._cache) > self.cached_shards:
+            self._cache.popitem(last=False)
+        return shard
+    
+    def __getitem__(self, index):
+        epoch, i = divmod(index, len(self))
+        variant = self.plan[min(epoch, len(self.plan) - 1)]
+        shard = self._load_shard(shard_path(self.shard_dir, variant, i // self.shard_size))
+        j = i % self.shard_size
+        
+        start, end = shard['jpeg_offsets'][j:j + 2]
+        image = cv2.imdecode(shard['jpeg'][start:end], cv2.IMREAD_COLOR)
+        first, last = shard['label_offsets'][j:j + 2]
+        count = last - first
+        s = self.imgsz
+        # Același format ca YOLODataset după Format(): CHW, RGB, casete xywh normalizate
+        return {
+            'img': torch.from_numpy(np.ascontiguousarray(image.transpose(2, 0, 1)[::-1])),
+            'cls': torch.from_numpy(shard['cls'][first:last]).view(-1, 1),
+            'bboxes': torch.from_numpy(shard['boxes'][first:last]),
+            'batch_idx': torch.zeros(int(count)),
+            'im_file': self.images[shard['source'][j]],
+            'ori_shape': (s, s),
+            'resized_shape': (s, s),
+        }
+
+class ShardDetectionTrainer(DetectionTrainer):
+    """DetectionTrainer care antrenează din shard-urile pre-augmentate (validarea rămâne neschimbată)"""
+    
+    shard_dir = AUGMENT_DIR
+    
+    def build_dataset(self, img_path, mode="train", batch=None):
+        if mode != "train":
+            return super().build_dataset(img_path, mode, batch)
+        dataset = ShardDataset(self.shard_dir)
+        if dataset.imgsz != self.args.imgsz:
+            raise ValueError(f"Shard-urile sunt generate la imgsz {dataset.imgsz}, "
+                             f"antrenarea folosește {self.args.imgsz}")
+        return dataset
+    
+    def get_dataloader(self, dataset_path, batch_size=16, rank=0, mode="train"):
+        if mode != "train":
+            return super().get_dataloader(dataset_path, batch_size, rank, mode)
+        dataset = self.build_dataset(dataset_path, mode, batch_size)
+        # Ordinea e fixată de generator: fără shuffle; după un OOM se continuă cu epoca curentă
+        sampler = EpochSampler(len(dataset), getattr(self, 'epoch', self.start_epoch))
+        workers = min(os.cpu_count() or 1, self.args.workers)
+        return InfiniteDataLoader(
+            dataset=dataset,
+            batch_size=min(batch_size, len(dataset)),
+            shuffle=False,
+            num_workers=workers,
+            sampler=sampler,
+            prefetch_factor=4 if workers > 0 else None,
+            pin_memory=torch.cuda.is_available(),
+            collate_fn=dataset.collate_fn,
+            worker_init_fn=seed_worker,
+        )
+    
+    def resume_training(self, ckpt):
+        super().resume_training(ckpt)
+        # Loader-ul a fost construit înainte de citirea checkpoint-ului (cu epoca 0) și, în unele
+        # versiuni Ultralytics, iteratorul lui a cerut deja indicii epocii 0; după set_epoch
+        # iteratorul este recreat, astfel încât prima epocă reluată citește varianta ei
+        self.train_loader.sampler.set_epoch(self.start_epoch)
+        self.train_loader.reset()
+    
+    def _close_dataloader_mosaic(self):
+        """Mosaic lipsește deja din variantele ultimelor close_mosaic epoci"""
+    
+    def plot_training_labels(self):
+        """Etichetele sunt în shard-uri, nu în dataset.labels"""
+
+def start_offline_augmentation(k=4, epochs=None, seed=0, workers=None, image_dir="train/images"):
+    """Pregătește manifestul și pornește generarea în fundal; returnează generatorul sau None"""
+    manifest = prepare_shards(image_dir, k, epochs, seed)
+    if manifest is None:
+        return None
+    return ShardGenerator(manifest, workers=workers).start()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generarea epocilor augmentate în shard-uri")
+    parser.add_argument('--k', type=int, default=4, help="Numărul de epoci augmentate distincte")
+    parser.add_argument('--epochs', type=int, default=TRAINING_PARAMS['epochs'])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, help="Procese de generare")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    generator = start_offline_augmentation(args.k, args.epochs, args.seed, args.workers)
+    if generator is not None:
+        ok = generator.wait()
+        generator.close()
+        elapsed = time.perf_counter() - start
+        if ok:
+            print(f"✅ {generator.total} shard-uri în {elapsed:.1f}s - {AUGMENT_DIR}")
+        else:
+            print(f"❌ {len(generator.failed)} shard-uri au eșuat")
@@ -0,0 +1,95 @@
+"""
+Auto-tuning pentru batch size înainte de antrenare
+Probează cel mai mare batch care încape în bugetul de memorie GPU și salvează rezultatele
+"""
+
+import copy
+import gc
+import json
+import time
+from pathlib import Path
+
+import torch
+from ultralytics import YOLO
+
+# Batch-ul nominal (nbs): Ultralytics acumulează gradientul până la el
+NOMINAL_BATCH = 64
+
+def effective_batch(batch, nbs=NOMINAL_BATCH):
+    """Batch-ul efectiv al Ultralytics: batch x max(round(nbs / batch), 1) pași acumulați"""
+    return batch * max(round(nbs / batch), 1)
+
+def is_out_of_memory(error):
+    """True pentru erori CUDA out of memory"""
+    return isinstance(error, torch.cuda.OutOfMemoryError) or "out of memory" in str(error)
+
+def probe_max_batch(weights='yolo11n.pt', imgsz=480, budget_fraction=0.8,
+                    candidates=(2, 4, 8, 16, 32, 64), amp=True, device=0, log_path=None):
+    """Rulează forward+backward pe batch-uri crescătoare; returnează cel mai mare batch sigur"""
+    
+    if not torch.cuda.is_available():
+        print("⚠️  Probarea batch-ului necesită CUDA - se păstrează batch-ul implicit")
+        return None
+    if isinstance(device, str) and device.isdigit():
+        device = int(device)  # device-ul Ultralytics ('0') -> indexul GPU pentru torch.cuda
+    
+    total = torch.cuda.get_device_properties(device).total_memory
+    budget = total * budget_fraction
+    print(f"🔬 Probare batch size (imgsz={imgsz}, buget {budget / 1024**3:.1f}GB "
+          f"din {total / 1024**3:.1f}GB)...")
+    
+    model = copy.deepcopy(YOLO(weights).model).to(device).train()
+    for param in model.parameters():
+        param.requires_grad_(True)
+    
+    probes = []
+    best = None
+    for batch in candidates:
+        torch.cuda.empty_cache()
+        torch.cuda.reset_peak_memory_stats(device)
+        start = time.perf_counter()
+        try:
+            images = torch.rand(batch, 3, imgsz, imgsz, device=device)
+            with torch.autocast('cuda', dtype=torch.float16, enabled=amp):
+                outputs = model(images)
+            loss = sum(out.float().sum() for out in outputs)
+            loss.backward()
+            torch.cuda.synchronize(device)
+            
+            peak = torch.cuda.max_memory_reserved(device)
+            fits = peak <= budget
+            probes.append({'batch': batch, 'peak_gb': peak / 1024**3, 'fits': fits,
+                           'seconds': time.perf_counter() - start})
+            print(f"   • batch {batch:>3}: {peak / 1024**3:.2f}GB {'✅' if fits else '❌ peste buget'}")
+            if not fits:
+                break
+            best = batch
+        except RuntimeError as e:
+            if not is_out_of_memory(e):
+                raise
+            probes.append({'batch': batch, 'peak_gb': None, 'fits': False, 'oom': True})
+            print(f"   • batch {batch:>3}: ❌ out of memory")
+            break
+        finally:
+            model.zero_grad(set_to_none=True)
+            images = outputs = loss = None
+            gc.collect()
+    
+    del model
+    torch.cuda.empty_cache()
+    
+    if log_path:
+        Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(log_path, 'w') as f:
+            json.dump({
+                'gpu': torch.cuda.get_device_name(device),
+                'total_gb': total / 1024**3,
+                'budget_fraction': budget_fraction,
+                'imgsz': imgsz,
+                'amp': amp,
+                'probes': probes,
+                'selected_batch': best,
+            }, f, indent=2)
+        print(f"📁 Rezultate probare salvate în: {log_path}")
+    
+    return best
@@ -0,0 +1,317 @@
+"""
+Benchmark reproductibil pentru inferență și antrenare
+Măsoară latența p50/p95/p99 și throughput-ul pe test/, salvează istoric JSON
+și compară fiecare rulare cu un baseline (eșuează la regresii)
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BENCHMARK_DIR = Path("runs/benchmark")
+HISTORY_PATH = BENCHMARK_DIR / "history.jsonl"
+BASELINE_PATH = BENCHMARK_DIR / "baseline.json"
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+def _config_key(config):
+    return f"{config['backend']}/bs{config['batch']}/img{config['imgsz']}/t{config['threads']}"
+
+def measure_inference(backend, batch, imgsz, threads, image_dir="test/images",
+                      warmup=3, repeats=3):
+    """Măsoară latența per imagine și throughput-ul pentru o singură configurație"""
+    import cv2
+    import numpy as np
+    import torch
+    from ultralytics import YOLO
+    
+    from test_model import IMAGE_EXTENSIONS, letterbox, resolve_backend
+    
+    torch.set_num_threads(threads)
+    model_path, device = resolve_backend(backend)
+    if model_path is None:
+        return None
+    model = YOLO(model_path, task='detect')
+    
+    # Imaginile sunt decodate o singură dată - se măsoară doar predict()
+    images = []
+    for img_path in sorted(Path(image_dir).iterdir()):
+        if img_path.suffix.lower() in IMAGE_EXTENSIONS:
+            image = cv2.imread(str(img_path))
+            if image is not None:
+                images.append(letterbox(image, imgsz)[0])
+    if not images:
+        print(f"❌ Nu există imagini în {image_dir}")
+        return None
+    batches = [images[i:i + batch] for i in range(0, len(images), batch)]
+    
+    for _ in range(warmup):
+        model.predict(source=batches[0], imgsz=imgsz, device=device, verbose=False)
+    
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for chunk in batches:
+            t0 = time.perf_counter()
+            model.predict(source=chunk, imgsz=imgsz, device=device, verbose=False)
+            elapsed = (time.perf_counter() - t0) * 1000
+            latencies.extend([elapsed / len(chunk)] * len(chunk))
+    total = time.perf_counter() - start
+    
+    return {
+        'images': len(images),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'images_per_sec': len(latencies) / total,
+    }
+
+def measure_map(backend, imgsz, split='test'):
+    """mAP50 / mAP50-95 pe split-ul dat (o dată per backend și imgsz)"""
+    from ultralytics import YOLO
+    
+    from test_model import resolve_backend
+    
+    model_path, device = resolve_backend(backend)
+    if model_path is None:
+        return None
+    metrics = YOLO(model_path, task='detect').val(data='data.yaml', imgsz=imgsz, split=split,
+                                                  device=device, plots=False, verbose=False)
+    return {'map50': float(metrics.box.map50), 'map50_95': float(metrics.box.map)}
+
+def measure_training(imgsz=480, batch=4, epochs=2, fraction=0.1, workers=2):
+    """Antrenare scurtă de la yolo11n.pt; returnează imagini/sec în regim staționar
+    
+    Timpul vine din callback-urile de epocă: scanarea dataset-ului și construirea modelului
+    nu intră în măsurătoare, iar prima epocă (încălzire, alocări, cuDNN) este exclusă
+    """
+    import torch
+    from ultralytics import YOLO
+    
+    device = 0 if torch.cuda.is_available() else 'cpu'
+    model = YOLO('yolo11n.pt')
+    
+    epoch_times, epoch_images = [], []
+    started = {}
+    
+    def on_train_epoch_start(trainer):
+        started['t'] = time.perf_counter()
+    
+    def on_train_epoch_end(trainer):
+        # on_train_epoch_end rulează înainte de validare (oricum dezactivată aici)
+        epoch_times.append(time.perf_counter() - started['t'])
+        epoch_images.append(len(trainer.train_loader.dataset))
+    
+    model.add_callback('on_train_epoch_start', on_train_epoch_start)
+    model.add_callback('on_train_epoch_end', on_train_epoch_end)
+    model.train(data='data.yaml', epochs=epochs, imgsz=imgsz, batch=batch, fraction=fraction,
+                device=device, workers=workers, val=False, plots=False, save=False,
+                project=str(BENCHMARK_DIR), name='train_probe', exist_ok=True, verbose=False)
+    
+    measured = slice(1, None) if len(epoch_times) > 1 else slice(None)
+    images, elapsed = sum(epoch_images[measured]), sum(epoch_times[measured])
+    return {
+        'device': str(device),
+        'imgsz': imgsz,
+        'batch': batch,
+        'epochs': epochs,
+        'measured_epochs': len(epoch_times[measured]),
+        'fraction': fraction,
+        'images': images,
+        'seconds': elapsed,
+        'images_per_sec': images / elapsed if elapsed > 0 else 0.0,
+    }
+
+def _run_isolated(config):
+    """Rulează o configurație într-un proces separat (thread-urile nu se influențează)"""
+    env = dict(os.environ, OMP_NUM_THREADS=str(config['threads']),
+               OPENBLAS_NUM_THREADS=str(config['threads']), MKL_NUM_THREADS=str(config['threads']))
+    result = subprocess.run([sys.executable, __file__, "--worker", json.dumps(config)],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        print(f"   ❌ Eroare: {result.stderr.strip()[-300:]}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def compare_with_baseline(run, baseline, speed_tolerance=0.10, map_tolerance=0.01):
+    """Lista de regresii față de baseline (throughput, p95, mAP, antrenare)
+    
+    Viteza se compară doar pe aceeași mașină; configurațiile din baseline care lipsesc din
+    rularea curentă sunt raportate ca regresii (nu se poate verifica nimic pentru ele)
+    """
+    regressions = []
+    base_inference = baseline.get('inference', {})
+    same_host = run['host'] == baseline.get('host')
+    
+    for key in base_inference:
+        if key not in run['inference']:
+            regressions.append(f"{key}: lipsește din rularea curentă (eșuată sau omisă)")
+    for key in baseline.get('accuracy', {}):
+        if key not in run['accuracy']:
+            regressions.append(f"{key}: mAP lipsește din rularea curentă")
+    
+    for key, current in run['inference'].items():
+        reference = base_inference.get(key)
+        if reference is None or not same_host:
+            continue
+        if current['images_per_sec'] < reference['images_per_sec'] * (1 - speed_tolerance):
+            regressions.append(f"{key}: throughput {current['images_per_sec']:.1f} < "
+                               f"{reference['images_per_sec']:.1f} img/s")
+        if current['p95_ms'] > reference['p95_ms'] * (1 + speed_tolerance):
+            regressions.append(f"{key}: p95 {current['p95_ms']:.1f} > {reference['p95_ms']:.1f} ms")
+    
+    for key, current in run['accuracy'].items():
+        reference = baseline.get('accuracy', {}).get(key)
+        if reference and current['map50_95'] < reference['map50_95'] - map_tolerance:
+            regressions.append(f"{key}: mAP50-95 {current['map50_95']:.3f} < "
+                               f"{reference['map50_95']:.3f}")
+    
+    current_train = run.get('training')
+    reference_train = baseline.get('training')
+    if same_host and current_train and reference_train and \
+            current_train['images_per_sec'] < reference_train['images_per_sec'] * (1 - speed_tolerance):
+        regressions.append(f"training: {current_train['images_per_sec']:.1f} < "
+                           f"{reference_train['images_per_sec']:.1f} img/s")
+    
+    return regressions
+
+def run_benchmark(backends=('pytorch',), batches=(1, 8), imgszs=(480, 640), threads=(1, 4),
+                  with_map=True, with_training=False, speed_tolerance=0.10,
+                  map_tolerance=0.01, save_baseline=False):
+    """Rulează grila completă; returnează True dacă nu există regresii"""
+    
+    print("🏁 Benchmark Mushroom Detector")
+    print("=" * 60)
+    
+    run = {
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': _git_commit(),
+        'host': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+        },
+        'inference': {},
+        'accuracy': {},
+        'training': None,
+    }
+    
+    grid = [dict(backend=b, batch=bs, imgsz=img, threads=t)
+            for b, bs, img, t in itertools.product(backends, batches, imgszs, threads)]
+    
+    print(f"\n⏱️  Inferență pe test/ ({len(grid)} configurații)")
+    print(f"   {'Configurație':<32} {'p50':>7} {'p95':>7} {'p99':>7} {'img/s':>8}")
+    failed = []
+    for config in grid:
+        result = _run_isolated(config)
+        if result is None:
+            failed.append(_config_key(config))
+            continue
+        key = _config_key(config)
+        run['inference'][key] = {**config, **result}
+        print(f"   {key:<32} {result['p50_ms']:>7.1f} {result['p95_ms']:>7.1f} "
+              f"{result['p99_ms']:>7.1f} {result['images_per_sec']:>8.1f}")
+    
+    if with_map:
+        print("\n🎯 Acuratețe pe test/")
+        for backend, imgsz in itertools.product(backends, imgszs):
+            metrics = measure_map(backend, imgsz)
+            if metrics:
+                run['accuracy'][f"{backend}/img{imgsz}"] = metrics
+                print(f"   {backend}/img{imgsz}: mAP50 {metrics['map50']:.3f}, "
+                      f"mAP50-95 {metrics['map50_95']:.3f}")
+    
+    if with_training:
+        print("\n🎓 Antrenare scurtă (2 epoci pe 10% din train/, măsurată ultima)...")
+        run['training'] = measure_training()
+        print(f"   • {run['training']['images_per_sec']:.1f} imagini/sec "
+              f"pe {run['training']['device']}")
+    
+    if failed:
+        print(f"\n❌ {len(failed)}/{len(grid)} configurații eșuate: {', '.join(failed)}")
+    if not run['inference']:
+        print("❌ Nicio configurație măsurată - istoricul și baseline-ul nu sunt modificate")
+        return False
+    
+    BENCHMARK_DIR.mkdir(parents=True, exist_ok=True)
+    with open(HISTORY_PATH, 'a') as f:
+        f.write(json.dumps(run) + "\n")
+    print(f"\n📁 Istoric actualizat: {HISTORY_PATH}")
+    
+    if save_baseline:
+        if failed:
+            print("❌ Baseline nesalvat: toate configurațiile trebuie să reușească")
+            return False
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"📌 Baseline salvat: {BASELINE_PATH}")
+        return True
+    
+    if not BASELINE_PATH.exists():
+        print("💡 Nu există baseline - rulați cu --save-baseline")
+        return not failed
+    
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)
+    if run['host'] != baseline.get('host'):
+        print(f"⚠️  Baseline-ul este de pe altă mașină ({baseline.get('host', {}).get('platform')}) "
+              "- se compară doar acuratețea")
+    regressions = compare_with_baseline(run, baseline, speed_tolerance, map_tolerance)
+    
+    if regressions:
+        print(f"\n❌ {len(regressions)} regresii față de baseline ({baseline['timestamp']}):")
+        for regression in regressions:
+            print(f"   • {regression}")
+        return False
+    
+    print(f"\n✅ Fără regresii față de baseline ({baseline['timestamp']})")
+    return not failed
+
+def latest_training_throughput():
+    """Ultimul throughput de antrenare măsurat (imagini/sec) sau None"""
+    if not HISTORY_PATH.exists():
+        return None
+    with open(HISTORY_PATH) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    for run in reversed(runs):
+        if run.get('training'):
+            return run['training']
+    return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark inferență și antrenare")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--backends', nargs='+', default=['pytorch'])
+    parser.add_argument('--batch', nargs='+', type=int, default=[1, 8])
+    parser.add_argument('--imgsz', nargs='+', type=int, default=[480, 640])
+    parser.add_argument('--threads', nargs='+', type=int, default=[1, 4])
+    parser.add_argument('--no-map', action='store_true')
+    parser.add_argument('--train', action='store_true', help="Include o antrenare scurtă")
+    parser.add_argument('--speed-tolerance', type=float, default=0.10)
+    parser.add_argument('--map-tolerance', type=float, default=0.01)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+    
+    if args.worker:
+        config = json.loads(args.worker)
+        print(json.dumps(measure_inference(config['backend'], config['batch'],
+                                           config['imgsz'], config['threads'])))
+        sys.exit(0)
+    
+    ok = run_benchmark(args.backends, args.batch, args.imgsz, args.threads,
+                       with_map=not args.no_map, with_training=args.train,
+                       speed_tolerance=args.speed_tolerance, map_tolerance=args.map_tolerance,
+                       save_baseline=args.save_baseline)
+    sys.exit(0 if ok else 1)
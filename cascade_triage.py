@@ -0,0 +1,283 @@
+"""
+Cascadă în două etape: triaj rapid la nivel de imagine înaintea detectorului YOLO
+Un clasificator mic (regresie logistică pe histograme HSV + miniatură) antrenat din etichetele
+din train/ decide dacă merită rulat detectorul; recall-ul pe death-cap este protejat de o marjă
+Negativele sunt fotografii reale fără ciuperci (etichete goale, plus negatives/<split>/ dacă există)
+"""
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from test_model import IMAGE_EXTENSIONS
+
+TRIAGE_PATH = "runs/cascade/triage.npz"
+NEGATIVES_DIR = Path("negatives")  # Fotografii suplimentare fără ciuperci: negatives/train, ...
+DEATH_CAP = 1
+NUM_CLASSES = 3
+
+def image_features(image):
+    """Vector de trăsături ieftin: histogramă HSV 16x4x4 + miniatură gri 8x8 + densitate muchii"""
+    small = cv2.resize(image, (64, 64), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1, 2], None, [16, 4, 4], [0, 180, 0, 256, 0, 256]).flatten()
+    hist /= hist.sum() + 1e-9
+    
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, (8, 8), interpolation=cv2.INTER_AREA).flatten() / 255.0
+    edges = cv2.Canny(gray, 50, 150).mean() / 255.0
+    
+    return np.concatenate([hist, thumb, [edges]]).astype(np.float32)
+
+def read_boxes(label_path, width, height):
+    """Casetele (cls, x1, y1, x2, y2) în pixeli, din etichete bbox sau poligon"""
+    boxes = []
+    if not label_path.exists():
+        return boxes
+    for line in label_path.read_text().splitlines():
+        parts = line.split()
+        if len(parts) < 5:
+            continue
+        cls, coords = int(parts[0]), np.array(parts[1:], dtype=np.float32)
+        if len(coords) == 4:
+            cx, cy, w, h = coords
+            x1, y1, x2, y2 = cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2
+        else:
+            xs, ys = coords[0::2], coords[1::2]
+            x1, y1, x2, y2 = xs.min(), ys.min(), xs.max(), ys.max()
+        boxes.append((cls, x1 * width, y1 * height, x2 * width, y2 * height))
+    return boxes
+
+def _background_crop(image, boxes, rng, attempts=20):
+    """O regiune fără ciuperci, cu proporțiile fotografiei și adusă la dimensiunea ei,
+    ca să nu difere de o fotografie întreagă prin încadrare; None dacă nu se găsește"""
+    height, width = image.shape[:2]
+    for _ in range(attempts):
+        scale = rng.uniform(0.4, 0.7)
+        w, h = int(width * scale), int(height * scale)
+        x, y = rng.randint(0, width - w), rng.randint(0, height - h)
+        if all(x + w <= b[1] or b[3] <= x or y + h <= b[2] or b[4] <= y for b in boxes):
+            return cv2.resize(image[y:y + h, x:x + w], (width, height),
+                              interpolation=cv2.INTER_LINEAR)
+    return None
+
+def split_images(split):
+    """Imaginile split-ului, urmate de fotografiile fără ciuperci din negatives/<split>/"""
+    paths = []
+    for image_dir in (Path(split, 'images'), NEGATIVES_DIR / split):
+        if image_dir.is_dir():
+            paths += sorted(p for p in image_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    return paths
+
+def _label_path(img_path):
+    return img_path.parent.parent / 'labels' / f"{img_path.stem}.txt"
+
+def build_samples(split, crops_per_image=1, seed=0):
+    """Trăsături și ținte multi-label (orice ciupercă + fiecare clasă) pentru un split
+    
+    Negativele principale sunt fotografii întregi fără ciuperci; decupajele de fundal din
+    fotografiile cu ciuperci completează (sunt aduse la aceeași încadrare ca o fotografie)
+    """
+    rng = random.Random(seed)
+    features, targets = [], []
+    
+    for img_path in split_images(split):
+        image = cv2.imread(str(img_path))
+        if image is None:
+            continue
+        height, width = image.shape[:2]
+        boxes = read_boxes(_label_path(img_path), width, height)
+        
+        target = np.zeros(NUM_CLASSES + 1, np.float32)
+        for box in boxes:
+            target[0] = 1.0
+            target[1 + box[0]] = 1.0
+        features.append(image_features(image))
+        targets.append(target)
+        
+        if not boxes:
+            continue
+        for _ in range(crops_per_image):
+            crop = _background_crop(image, boxes, rng)
+            if crop is not None:
+                features.append(image_features(crop))
+                targets.append(np.zeros(NUM_CLASSES + 1, np.float32))
+    
+    return np.stack(features), np.stack(targets)
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30, 30)))
+
+class TriageClassifier:
+    """Regresie logistică multi-label: [orice ciupercă, chanterelle, death-cap, field-mushroom]"""
+    
+    def __init__(self, weights, bias, mean, std, thresholds):
+        self.weights = weights
+        self.bias = bias
+        self.mean = mean
+        self.std = std
+        self.thresholds = thresholds
+    
+    @classmethod
+    def train(cls, features, targets, epochs=300, lr=0.5, l2=1e-3):
+        mean, std = features.mean(0), features.std(0) + 1e-6
+        x = (features - mean) / std
+        weights = np.zeros((x.shape[1], targets.shape[1]), np.float32)
+        bias = np.zeros(targets.shape[1], np.float32)
+        
+        # Ponderi pe clase: pozitivele rare (death-cap) contează la fel de mult
+        positive = targets.mean(0).clip(1e-3, 1 - 1e-3)
+        sample_weight = np.where(targets > 0, 0.5 / positive, 0.5 / (1 - positive))
+        
+        for _ in range(epochs):
+            probs = _sigmoid(x @ weights + bias)
+            grad = (probs - targets) * sample_weight / len(x)
+            weights -= lr * (x.T @ grad + l2 * weights)
+            bias -= lr * grad.sum(0)
+        
+        return cls(weights, bias, mean, std, thresholds=np.zeros(2, np.float32))
+    
+    def predict_proba(self, features):
+        return _sigmoid(((np.atleast_2d(features) - self.mean) / self.std) @ self.weights + self.bias)
+    
+    def calibrate(self, features, targets, any_recall=0.98, death_cap_recall=1.0, margin=0.05):
+        """Praguri pe valid/: recall țintă pentru 'orice ciupercă' și death-cap, minus marja"""
+        probs = self.predict_proba(features)
+        
+        def threshold_for(scores, recall):
+            if len(scores) == 0:
+                return 0.0
+            return float(np.quantile(scores, 1.0 - recall))
+        
+        t_any = threshold_for(probs[targets[:, 0] > 0, 0], any_recall)
+        t_death = threshold_for(probs[targets[:, 1 + DEATH_CAP] > 0, 1 + DEATH_CAP], death_cap_recall)
+        # Marja de siguranță: imaginile incerte din jurul pragului merg la detector
+        self.thresholds = np.array([max(0.0, t_any - margin), max(0.0, t_death - margin)],
+                                   np.float32)
+        return self.thresholds
+    
+    def should_run_detector(self, features):
+        probs = self.predict_proba(features)[0]
+        return bool(probs[0] >= self.thresholds[0] or probs[1 + DEATH_CAP] >= self.thresholds[1])
+    
+    def save(self, path=TRIAGE_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, weights=self.weights, bias=self.bias, mean=self.mean,
+                 std=self.std, thresholds=self.thresholds)
+    
+    @classmethod
+    def load(cls, path=TRIAGE_PATH):
+        data = np.load(path)
+        return cls(data['weights'], data['bias'], data['mean'], data['std'], data['thresholds'])
+
+def train_triage(any_recall=0.98, death_cap_recall=1.0, margin=0.05, path=TRIAGE_PATH):
+    """Antrenează triajul pe train/, îl calibrează pe valid/ și îl salvează"""
+    print("🧮 Extragere trăsături din train/ și valid/...")
+    x_train, y_train = build_samples('train')
+    x_valid, y_valid = build_samples('valid')
+    
+    empty = sum(1 for p in split_images('train') if not read_boxes(_label_path(p), 1, 1))
+    print(f"🎓 Antrenare clasificator triaj ({len(x_train)} exemple, "
+          f"{empty} fotografii reale fără ciuperci)...")
+    classifier = TriageClassifier.train(x_train, y_train)
+    t_any, t_death = classifier.calibrate(x_valid, y_valid, any_recall, death_cap_recall, margin)
+    classifier.save(path)
+    
+    print(f"   • Prag 'orice ciupercă': {t_any:.3f}")
+    print(f"   • Prag death-cap: {t_death:.3f} (recall țintă {death_cap_recall:.0%}, marjă {margin})")
+    print(f"📁 Salvat în: {path}")
+    return classifier
+
+def evaluate_cascade(image_dir="test", conf=0.25, imgsz=480, backend='pytorch', path=TRIAGE_PATH):
+    """Fracțiunea de imagini care sar detectorul, latența medie și calitatea deciziei de a sări
+    pe fotografiile reale fără ciuperci din test/ (precizie / recall pentru „fără ciuperci”)"""
+    from ultralytics import YOLO
+    
+    from test_model import describe_detections, resolve_backend
+    
+    model_path, device = resolve_backend(backend)
+    if model_path is None:
+        return None
+    model = YOLO(model_path, task='detect')
+    classifier = TriageClassifier.load(path)
+    
+    images = split_images(image_dir)
+    model.predict(source=cv2.imread(str(images[0])), imgsz=imgsz, device=device, verbose=False)
+    
+    skipped = 0
+    cascade_ms, detector_ms = [], []
+    death_cap_images = death_cap_found = 0
+    empty_images = empty_skipped = 0
+    
+    for img_path in images:
+        image = cv2.imread(str(img_path))
+        if image is None:
+            continue
+        height, width = image.shape[:2]
+        boxes = read_boxes(_label_path(img_path), width, height)
+        has_death_cap = any(b[0] == DEATH_CAP for b in boxes)
+        
+        t0 = time.perf_counter()
+        run_detector = classifier.should_run_detector(image_features(image))
+        triage_ms = (time.perf_counter() - t0) * 1000
+        
+        t0 = time.perf_counter()
+        result = model.predict(source=image, imgsz=imgsz, conf=conf, device=device, verbose=False)[0]
+        full_ms = (time.perf_counter() - t0) * 1000
+        detector_ms.append(full_ms)
+        cascade_ms.append(triage_ms + (full_ms if run_detector else 0.0))
+        
+        if not run_detector:
+            skipped += 1
+        if not boxes:
+            empty_images += 1
+            empty_skipped += int(not run_detector)
+        if has_death_cap:
+            death_cap_images += 1
+            detected = any(d['class_id'] == DEATH_CAP for d in describe_detections(result))
+            death_cap_found += int(run_detector and detected)
+    
+    stats = {
+        'images': len(images),
+        'skip_fraction': skipped / len(images),
+        'avg_latency_ms': float(np.mean(cascade_ms)),
+        'detector_only_ms': float(np.mean(detector_ms)),
+        'death_cap_images': death_cap_images,
+        'death_cap_detected': death_cap_found,
+        'empty_images': empty_images,
+        # Decizia „fără ciuperci”: cât de des e corectă când sare, cât din imaginile goale prinde
+        'skip_precision': empty_skipped / skipped if skipped else None,
+        'skip_recall': empty_skipped / empty_images if empty_images else None,
+    }
+    
+    print(f"\n📊 Cascadă pe {image_dir}/ ({len(images)} imagini):")
+    print(f"   • Imagini care sar detectorul: {stats['skip_fraction']:.1%}")
+    print(f"   • Latență medie: {stats['avg_latency_ms']:.1f}ms "
+          f"(doar detector: {stats['detector_only_ms']:.1f}ms)")
+    print(f"   • Death-cap găsit: {death_cap_found}/{death_cap_images} imagini")
+    if empty_images:
+        precision = f"{stats['skip_precision']:.1%}" if skipped else "-"
+        print(f"   • Fotografii fără ciuperci: {empty_images}; sărite {empty_skipped} "
+              f"(recall {stats['skip_recall']:.1%}, precizie sărire {precision} - "
+              f"{skipped - empty_skipped} imagini cu ciuperci sărite)")
+    else:
+        print("   ⚠️  Nicio fotografie fără ciuperci în test/ - decizia de sărire nu poate fi evaluată")
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Triaj rapid înaintea detectorului")
+    parser.add_argument('command', choices=['train', 'evaluate'])
+    parser.add_argument('--any-recall', type=float, default=0.98)
+    parser.add_argument('--death-cap-recall', type=float, default=1.0)
+    parser.add_argument('--margin', type=float, default=0.05,
+                        help="Marja de siguranță sub pragurile calibrate")
+    args = parser.parse_args()
+    
+    if args.command == 'train':
+        train_triage(args.any_recall, args.death_cap_recall, args.margin)
+    else:
+        evaluate_cascade()
@@ -0,0 +1,309 @@
+"""
+Comprimarea modelului pentru terminale CPU slabe
+Studentul (yolo11 mai îngust) pornește din best.pt tăiat pe canale și face un fine-tune scurt
+cu distilare de trăsături de la profesor (distill_model din Ultralytics); rezultatul este
+un tabel latență/mAP pe valid/ și modelul cel mai bun sub un buget de latență
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import time
+from pathlib import Path
+
+import torch
+import yaml
+from torch import nn
+from ultralytics import YOLO
+from ultralytics.cfg import DEFAULT_CFG_DICT
+from ultralytics.nn.modules import C2PSA, C2f, C3, SPPF, Bottleneck, Concat, Conv, Detect
+from ultralytics.nn.modules.block import PSABlock
+from ultralytics.nn.tasks import yaml_model_load
+
+from test_model import MODEL_PATH
+from train_mushroom_model import TRAINING_PARAMS
+
+COMPRESS_DIR = Path("runs/compress")
+REPORT_PATH = COMPRESS_DIR / "tradeoff.json"
+
+# yolo11n = lățime 0.25; studenții sunt mai înguști (adâncime și max_channels ca la n)
+STUDENT_WIDTHS = (0.1875, 0.125)
+STUDENT_DEPTH = 0.50
+STUDENT_MAX_CHANNELS = 1024
+# Fine-tune-ul pornește din greutățile profesorului, deci ajung câteva zeci de epoci
+STUDENT_EPOCHS = 20
+
+def write_student_yaml(width, nc, depth=STUDENT_DEPTH, max_channels=STUDENT_MAX_CHANNELS):
+    """Arhitectura yolo11 cu o singură scală; numele fișierului nu conține 'yolo11n' etc.
+    astfel încât Ultralytics folosește scala din fișier în loc să o ghicească din nume"""
+    config = yaml_model_load('yolo11n.yaml')
+    for key in ('scale', 'yaml_file'):
+        config.pop(key, None)
+    config['nc'] = nc
+    config['scales'] = {'student': [depth, width, max_channels]}
+    
+    COMPRESS_DIR.mkdir(parents=True, exist_ok=True)
+    path = COMPRESS_DIR / f"student_w{int(width * 10000):04d}.yaml"
+    with open(path, 'w') as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    return path
+
+def measure_latency(weights, imgsz=480, threads=4, warmup=5, repeats=30):
+    """Latența mediană (ms) a rețelei pe CPU, batch 1, cu un număr fix de thread-uri"""
+    previous_threads = torch.get_num_threads()
+    torch.set_num_threads(threads)
+    try:
+        model = YOLO(str(weights)).model.float().eval().fuse(verbose=False)
+        x = torch.zeros(1, 3, imgsz, imgsz)
+        times = []
+        with torch.inference_mode():
+            for i in range(warmup + repeats):
+                start = time.perf_counter()
+                model(x)
+                if i >= warmup:
+                    times.append((time.perf_counter() - start) * 1000)
+        return statistics.median(times)
+    finally:
+        torch.set_num_threads(previous_threads)
+
+def _top_channels(scores, n):
+    """Indicii celor mai importante n canale, păstrați în ordinea din profesor"""
+    return scores.topk(n).indices.sort().values
+
+def _concat(parts, width):
+    """Canalele alese după un torch.cat de bucăți care au fiecare `width` canale în profesor"""
+    return torch.cat([sel + k * width for k, sel in enumerate(parts)])
+
+def _slice_conv(s, t, in_sel, out_sel=None):
+    """Copiază filtrele alese dintr-un Conv (conv + BN) al profesorului; returnează canalele de ieșire"""
+    depthwise = t.conv.groups > 1
+    if depthwise:
+        out_sel = in_sel  # un filtru depthwise aparține unui singur canal de intrare
+    elif out_sel is None:
+        out_sel = _top_channels(t.bn.weight.abs(), s.conv.out_channels)
+    weight = t.conv.weight[out_sel]
+    s.conv.weight.copy_(weight if depthwise else weight[:, in_sel])
+    for name in ('weight', 'bias', 'running_mean', 'running_var'):
+        getattr(s.bn, name).copy_(getattr(t.bn, name)[out_sel])
+    return out_sel
+
+def _split_halves(s, t, in_sel):
+    """cv1 urmat de chunk(2): canalele se aleg separat în fiecare jumătate"""
+    half_t, half_s = t.conv.out_channels // 2, s.conv.out_channels // 2
+    gamma = t.bn.weight.abs()
+    first = _top_channels(gamma[:half_t], half_s)
+    second = _top_channels(gamma[half_t:], half_s)
+    _slice_conv(s, t, in_sel, torch.cat([first, second + half_t]))
+    return first, second
+
+def _slice_attention(s, t, in_sel):
+    """Capetele de atenție se copiază întregi; ieșirea (proj) intră într-o ramură reziduală"""
+    if (s.head_dim, s.key_dim) != (t.head_dim, t.key_dim):
+        # Capete de altă dimensiune nu se pot tăia din profesor: ramura pornește neutră (x + 0)
+        s.proj.bn.weight.zero_()
+        s.proj.bn.bias.zero_()
+        return
+    per_head = 2 * t.key_dim + t.head_dim  # [q, k, v] pentru fiecare cap
+    heads = _top_channels(t.qkv.bn.weight.abs().view(t.num_heads, per_head).sum(1), s.num_heads)
+    qkv_sel = torch.cat([h * per_head + torch.arange(per_head) for h in heads])
+    v_sel = torch.cat([h * t.head_dim + torch.arange(t.head_dim) for h in heads])
+    _slice_conv(s.qkv, t.qkv, in_sel, qkv_sel)
+    _slice_conv(s.pe, t.pe, v_sel)
+    _slice_conv(s.proj, t.proj, v_sel, in_sel)
+
+def _slice_module(s, t, in_sel):
+    """Copiază în student canalele alese din modulul profesorului; returnează canalele de ieșire"""
+    if isinstance(t, Conv):
+        return _slice_conv(s, t, in_sel)
+    if isinstance(t, nn.Conv2d):  # ultimele conv din Detect: toate ieșirile (4*reg_max, nc)
+        s.weight.copy_(t.weight[:, in_sel])
+        s.bias.copy_(t.bias)
+        return torch.arange(t.out_channels)
+    if isinstance(t, nn.Sequential):
+        for s_m, t_m in zip(s, t):
+            in_sel = _slice_module(s_m, t_m, in_sel)
+        return in_sel
+    if isinstance(t, Bottleneck):
+        hidden = _slice_conv(s.cv1, t.cv1, in_sel)
+        # Cu scurtătură (x + cv2(...)) ieșirea trebuie să folosească exact canalele intrării
+        return _slice_conv(s.cv2, t.cv2, hidden, in_sel if t.add else None)
+    if isinstance(t, C2f):  # și C3k2
+        first, second = _split_halves(s.cv1, t.cv1, in_sel)
+        parts = [first, second]
+        for s_m, t_m in zip(s.m, t.m):
+            parts.append(_slice_module(s_m, t_m, parts[-1]))
+        return _slice_conv(s.cv2, t.cv2, _concat(parts, t.c))
+    if isinstance(t, C3):  # și C3k
+        inner = _slice_module(s.m, t.m, _slice_conv(s.cv1, t.cv1, in_sel))
+        side = _slice_conv(s.cv2, t.cv2, in_sel)
+        return _slice_conv(s.cv3, t.cv3, _concat([inner, side], t.cv1.conv.out_channels))
+    if isinstance(t, SPPF):
+        hidden = _slice_conv(s.cv1, t.cv1, in_sel)
+        pooled = _concat([hidden] * (getattr(t, 'n', 3) + 1), t.cv1.conv.out_channels)
+        return _slice_conv(s.cv2, t.cv2, pooled, in_sel if getattr(t, 'add', False) else None)
+    if isinstance(t, C2PSA):
+        first, second = _split_halves(s.cv1, t.cv1, in_sel)
+        second = _slice_module(s.m, t.m, second)
+        return _slice_conv(s.cv2, t.cv2, _concat([first, second], t.c))
+    if isinstance(t, PSABlock):
+        _slice_attention(s.attn, t.attn, in_sel)
+        hidden = _slice_conv(s.ffn[0], t.ffn[0], in_sel)
+        return _slice_conv(s.ffn[1], t.ffn[1], hidden, in_sel)
+    if isinstance(t, Detect):  # in_sel: câte o selecție pentru fiecare nivel P3-P5
+        for name in ('cv2', 'cv3', 'one2one_cv2', 'one2one_cv3'):
+            if getattr(t, name, None) is not None:
+                for s_m, t_m, sel in zip(getattr(s, name), getattr(t, name), in_sel):
+                    _slice_module(s_m, t_m, sel)
+        return None
+    return in_sel  # Upsample, MaxPool etc.: fără parametri, aceleași canale
+
+def _layer_widths(model, imgsz=64):
+    """Numărul de canale de ieșire al fiecărui strat (o trecere cu o imagine mică)"""
+    widths = []
+    hooks = [m.register_forward_hook(lambda m, args, out: widths.append(out.shape[1]))
+             for m in model.model[:-1]]
+    try:
+        with torch.no_grad():
+            model(torch.zeros(1, 3, imgsz, imgsz))
+    finally:
+        for hook in hooks:
+            hook.remove()
+    return widths
+
+def slice_teacher(teacher, student):
+    """Inițializează studentul (aceeași arhitectură, mai îngust) din greutățile profesorului:
+    în fiecare strat se păstrează canalele cu |gamma| BN cel mai mare, iar selecția se propagă
+    prin concatenări și ramuri reziduale astfel încât fiecare filtru copiat își găsește intrările"""
+    widths = _layer_widths(teacher)
+    image = (torch.arange(3), 3)
+    outputs = []
+    with torch.no_grad():
+        for i, (s_m, t_m) in enumerate(zip(student.model, teacher.model)):
+            sources = t_m.f if isinstance(t_m.f, list) else [t_m.f]
+            inputs = [(outputs[i - 1] if i else image) if j == -1 else outputs[j] for j in sources]
+            if isinstance(t_m, Concat):
+                sel = torch.cat([sel + sum(w for _, w in inputs[:k])
+                                 for k, (sel, _) in enumerate(inputs)])
+            elif isinstance(t_m, Detect):
+                sel = _slice_module(s_m, t_m, [sel for sel, _ in inputs])
+            else:
+                sel = _slice_module(s_m, t_m, inputs[0][0])
+            outputs.append((sel, widths[i] if i < len(widths) else None))
+
+def init_student(student_yaml, teacher_path=MODEL_PATH):
+    """best.pt tăiat la lățimea studentului, salvat ca punct de pornire pentru fine-tune"""
+    teacher = YOLO(str(teacher_path)).model.float().eval()
+    student = YOLO(str(student_yaml))
+    if [type(m) for m in teacher.modules()] != [type(m) for m in student.model.modules()]:
+        print(f"❌ {teacher_path} nu are arhitectura studentului (yolo11n, adâncime "
+              f"{STUDENT_DEPTH}) - nu se poate tăia")
+        return None
+    
+    slice_teacher(teacher, student.model)
+    path = COMPRESS_DIR / f"{Path(student_yaml).stem}_init.pt"
+    student.save(path)
+    return path
+
+def train_student(student_yaml, init_weights, teacher_path, epochs, imgsz):
+    """Fine-tune scurt al studentului tăiat din best.pt, cu distilare de trăsături de la profesor"""
+    device = TRAINING_PARAMS['device'] if torch.cuda.is_available() else 'cpu'
+    params = dict(TRAINING_PARAMS)
+    params.update({
+        'epochs': epochs,
+        'imgsz': imgsz,
+        'device': device,
+        'amp': device != 'cpu',
+        'pretrained': str(init_weights),   # greutățile tăiate (aceeași arhitectură: transfer complet)
+        'distill_model': str(teacher_path),
+        'warmup_epochs': 1,
+        'close_mosaic': min(TRAINING_PARAMS['close_mosaic'], max(epochs // 4, 1)),
+        'plots': False,
+        'project': str(COMPRESS_DIR),
+        'name': Path(student_yaml).stem,
+    })
+    model = YOLO(str(student_yaml))
+    model.train(**params)
+    return Path(model.trainer.best)
+
+def evaluate_candidate(name, weights, imgsz, threads):
+    """Un rând din tabel: latență pe CPU și mAP pe valid/"""
+    device = 0 if torch.cuda.is_available() else 'cpu'
+    metrics = YOLO(str(weights)).val(data=TRAINING_PARAMS['data'], imgsz=imgsz, device=device,
+                                     plots=False, verbose=False)
+    return {'name': name, 'weights': str(weights), 'imgsz': imgsz,
+            'latency_ms': measure_latency(weights, imgsz, threads),
+            'map50': float(metrics.box.map50), 'map50_95': float(metrics.box.map)}
+
+def compress(budget_ms=None, threads=4, widths=STUDENT_WIDTHS, imgszs=(480, 416, 320),
+             epochs=STUDENT_EPOCHS, teacher_path=MODEL_PATH):
+    """Tabel latență/mAP pentru profesor și studenți; alege cel mai bun model sub buget"""
+    
+    if not Path(teacher_path).exists():
+        print(f"❌ Modelul profesor nu există: {teacher_path}")
+        return None
+    if 'distill_model' not in DEFAULT_CFG_DICT:
+        print("❌ Versiunea de Ultralytics nu are distilare (distill_model, din 8.4): "
+              "pip install -U ultralytics")
+        return None
+    
+    with open(TRAINING_PARAMS['data']) as f:
+        nc = yaml.safe_load(f)['nc']
+    
+    # 1. Latența depinde doar de arhitectură: studenții prea lenți sunt eliminați înainte de antrenare
+    candidates = []
+    for width in widths:
+        student_yaml = write_student_yaml(width, nc)
+        fastest = measure_latency(student_yaml, min(imgszs), threads)
+        print(f"📐 Student lățime {width}: {fastest:.1f}ms la imgsz {min(imgszs)} ({threads} thread-uri)")
+        if budget_ms is not None and fastest > budget_ms:
+            print(f"   ⏭️  Peste bugetul de {budget_ms}ms chiar și la imgsz minim - nu se antrenează")
+            continue
+        candidates.append((width, student_yaml))
+    
+    # 2. Studentul pornește din best.pt tăiat, apoi fine-tune cu distilare de la profesor
+    rows = [evaluate_candidate('teacher', teacher_path, imgsz, threads) for imgsz in imgszs]
+    for width, student_yaml in candidates:
+        init_weights = init_student(student_yaml, teacher_path)
+        if init_weights is None:
+            continue
+        print(f"\n🚀 Distilare în studentul de lățime {width} ({epochs} epoci de fine-tune)...")
+        weights = train_student(student_yaml, init_weights, teacher_path, epochs, max(imgszs))
+        rows += [evaluate_candidate(f"student_w{width}", weights, imgsz, threads)
+                 for imgsz in imgszs]
+    
+    # 3. Tabelul compromisului și alegerea sub buget
+    rows.sort(key=lambda r: r['latency_ms'])
+    print(f"\n📊 Latență ({threads} thread-uri CPU) vs mAP pe valid/:")
+    print(f"   {'model':<20} {'imgsz':>5} {'latență':>10} {'mAP50':>7} {'mAP50-95':>9}")
+    for row in rows:
+        mark = "" if budget_ms is None or row['latency_ms'] <= budget_ms else "  (peste buget)"
+        print(f"   {row['name']:<20} {row['imgsz']:>5} {row['latency_ms']:>8.1f}ms "
+              f"{row['map50']:>7.3f} {row['map50_95']:>9.3f}{mark}")
+    
+    within = [r for r in rows if budget_ms is None or r['latency_ms'] <= budget_ms]
+    best = max(within, key=lambda r: r['map50_95']) if within else None
+    if best is None:
+        print(f"\n❌ Niciun model nu intră în bugetul de {budget_ms}ms; cel mai rapid: "
+              f"{rows[0]['name']} @ {rows[0]['imgsz']} ({rows[0]['latency_ms']:.1f}ms)")
+    else:
+        shutil.copy2(best['weights'], COMPRESS_DIR / "best_within_budget.pt")
+        print(f"\n✅ Ales: {best['name']} @ imgsz {best['imgsz']} - {best['latency_ms']:.1f}ms, "
+              f"mAP50-95 {best['map50_95']:.3f}")
+        print(f"📁 Salvat în: {COMPRESS_DIR / 'best_within_budget.pt'}")
+    
+    with open(REPORT_PATH, 'w') as f:
+        json.dump({'budget_ms': budget_ms, 'threads': threads, 'rows': rows, 'selected': best},
+                  f, indent=2)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distilare în studenți mai înguști cu buget de latență")
+    parser.add_argument('--budget-ms', type=float, help="Latența maximă acceptată (ex. 10)")
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--widths', nargs='+', type=float, default=list(STUDENT_WIDTHS))
+    parser.add_argument('--imgsz', nargs='+', type=int, default=[480, 416, 320])
+    parser.add_argument('--epochs', type=int, default=STUDENT_EPOCHS)
+    args = parser.parse_args()
+    
+    compress(args.budget_ms, args.threads, args.widths, args.imgsz, args.epochs)
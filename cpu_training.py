@@ -0,0 +1,122 @@
+"""
+Antrenare pe servere CPU mari (fără GPU)
+Thread-urile intra-op/inter-op și worker-ii dataloader sunt aleși după numărul de nuclee,
+forward-ul rulează în bf16 (autocast) unde procesorul îl suportă, cu layout channels-last;
+acumularea gradientului păstrează batch-ul efectiv al rețetei GPU (nbs)
+"""
+
+import functools
+import os
+from pathlib import Path
+
+import psutil
+import torch
+from ultralytics.models.yolo.detect import DetectionTrainer
+
+from auto_batch import effective_batch
+
+# Batch-ul per pas pe CPU: mai mare decât pe GPU (RAM-ul nu e limita), același batch efectiv
+CPU_BATCH = 16
+
+def cpu_supports_bf16():
+    """True dacă procesorul are instrucțiuni bf16 native (AVX512-BF16 / AMX) și oneDNN"""
+    if not torch.backends.mkldnn.is_available():
+        return False
+    cpuinfo = Path("/proc/cpuinfo")
+    if not cpuinfo.exists():
+        return False
+    flags = set()
+    for line in cpuinfo.read_text().splitlines():
+        if line.startswith("flags"):
+            flags.update(line.split(":", 1)[1].split())
+            break
+    return bool(flags & {'avx512_bf16', 'amx_bf16'})
+
+def plan_cpu_threads(cores=None):
+    """Împarte nucleele fizice între worker-ii dataloader și thread-urile de calcul"""
+    cores = cores or psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    # Augmentarea (mosaic, HSV) pe 1/4 din nuclee, restul pentru forward/backward
+    workers = min(8, max(1, cores // 4))
+    return {
+        'cores': cores,
+        'workers': workers,
+        'intra_op': max(1, cores - workers),
+        'inter_op': min(4, max(1, cores // 8)),
+    }
+
+def configure_cpu_threads(plan):
+    """Setează thread-urile torch; inter-op poate fi setat o singură dată, înainte de lucru paralel"""
+    os.environ['OMP_NUM_THREADS'] = str(plan['intra_op'])
+    torch.set_num_threads(plan['intra_op'])
+    try:
+        torch.set_num_interop_threads(plan['inter_op'])
+    except RuntimeError:
+        print("⚠️  Thread-urile inter-op erau deja pornite - se păstrează valoarea existentă")
+
+def _to_float(value):
+    """Ieșirile rețelei (tensori în structuri imbricate) convertite la float32 pentru loss"""
+    if isinstance(value, torch.Tensor):
+        return value.float() if value.is_floating_point() else value
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_float(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _to_float(v) for k, v in value.items()}
+    return value
+
+class CpuTrainingMixin:
+    """Se combină cu un DetectionTrainer (vezi cpu_trainer): worker-i, bf16 și channels-last pe CPU"""
+    
+    cpu_workers = 0
+    bf16 = False
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Ultralytics pune workers=0 pe CPU; pe un server cu multe nuclee augmentarea ar bloca antrenarea
+        self.args.workers = self.cpu_workers
+    
+    def _setup_train(self):
+        super()._setup_train()
+        self.model.to(memory_format=torch.channels_last)
+        if self.bf16:
+            # Doar rețeaua rulează în bf16; loss-ul primește float32 (EMA și validarea rămân în fp32)
+            predict = self.model.predict
+            
+            @functools.wraps(predict)
+            def predict_bf16(*args, **kwargs):
+                with torch.autocast('cpu', dtype=torch.bfloat16):
+                    return _to_float(predict(*args, **kwargs))
+            
+            self.model.predict = predict_bf16
+    
+    def preprocess_batch(self, batch):
+        batch = super().preprocess_batch(batch)
+        batch['img'] = batch['img'].contiguous(memory_format=torch.channels_last)
+        return batch
+
+def cpu_trainer(base=DetectionTrainer, workers=0, bf16=False):
+    """Trainer-ul de bază (ex. MemmapDetectionTrainer) extins pentru antrenarea pe CPU"""
+    return type(f"Cpu{base.__name__}", (CpuTrainingMixin, base), {'cpu_workers': workers, 'bf16': bf16})
+
+def cpu_training_params(params, batch=CPU_BATCH, cores=None):
+    """Parametrii rețetei GPU adaptați pentru CPU; returnează (parametri, plan thread-uri, bf16)"""
+    plan = plan_cpu_threads(cores)
+    configure_cpu_threads(plan)
+    bf16 = cpu_supports_bf16()
+    
+    gpu_batch = params['batch']
+    params = dict(params)
+    params.update({
+        'device': 'cpu',
+        'amp': False,       # AMP-ul Ultralytics este doar fp16 pe GPU; bf16 vine din CpuTrainingMixin
+        'batch': batch,
+        'workers': plan['workers'],
+    })
+    
+    accumulate = max(round(params['nbs'] / batch), 1)
+    print(f"🧮 Antrenare pe CPU: {plan['cores']} nuclee fizice")
+    print(f"   • Thread-uri: {plan['intra_op']} intra-op, {plan['inter_op']} inter-op, "
+          f"{plan['workers']} worker-i dataloader")
+    print(f"   • bf16 autocast: {'da' if bf16 else 'nu (procesorul nu are AVX512-BF16/AMX) - fp32'}")
+    print(f"   • Batch {batch} × acumulare {accumulate} = {batch * accumulate} "
+          f"(rețeta GPU: {effective_batch(gpu_batch, params['nbs'])})")
+    return params, plan, bf16
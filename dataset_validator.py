@@ -0,0 +1,205 @@
+"""
+Validator paralel și incremental pentru dataset
+Verifică imaginile și etichetele din train/valid/test, găsește duplicate aproape identice
+între split-uri (scurgeri de date) și păstrează un cache per fișier (mtime/size)
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+import yaml
+
+SPLITS = ('train', 'valid', 'test')
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+VALIDATION_CACHE = "runs/cache/dataset_validation.json"
+CACHE_VERSION = 1
+
+def load_class_names(data_yaml="data.yaml"):
+    """Numele claselor din data.yaml"""
+    with open(data_yaml) as f:
+        return yaml.safe_load(f)['names']
+
+def perceptual_hash(image):
+    """pHash pe 64 biți: DCT pe imaginea gri 32x32, biții peste mediană"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    gray = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(gray)[:8, :8].flatten()[1:]  # fără componenta DC
+    bits = low > np.median(low)
+    return int(''.join('1' if b else '0' for b in bits), 2)
+
+def _stat_signature(path):
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+def validate_file(image_path, label_path, nc):
+    """Validează o pereche imagine/etichetă (rulează într-un proces din pool)"""
+    image_path, label_path = Path(image_path), Path(label_path)
+    report = {'errors': [], 'warnings': [], 'phash': None, 'objects': 0}
+    
+    # Imaginea: decodare completă + verificare JPEG trunchiat
+    image = cv2.imread(str(image_path))
+    if image is None:
+        report['errors'].append("imagine coruptă (nu poate fi decodată)")
+    else:
+        report['shape'] = list(image.shape[:2])
+        report['phash'] = f"{perceptual_hash(image):016x}"
+        if image_path.suffix.lower() in ('.jpg', '.jpeg'):
+            with open(image_path, 'rb') as f:
+                f.seek(-2, 2)
+                if f.read() != b'\xff\xd9':
+                    report['warnings'].append("JPEG trunchiat (lipsește marcajul EOI)")
+    
+    # Eticheta: format YOLO (bbox sau poligon), coordonate normalizate
+    if not label_path.exists():
+        report['errors'].append("lipsește fișierul de etichete")
+        return report
+    
+    lines = [line.split() for line in label_path.read_text().splitlines() if line.strip()]
+    if not lines:
+        report['warnings'].append("etichetă goală (fără obiecte)")
+    
+    seen = set()
+    for number, parts in enumerate(lines, 1):
+        try:
+            cls = int(parts[0])
+            coords = [float(x) for x in parts[1:]]
+        except ValueError:
+            report['errors'].append(f"linia {number}: valori nenumerice")
+            continue
+        
+        if not 0 <= cls < nc:
+            report['errors'].append(f"linia {number}: clasă invalidă {cls} (nc={nc})")
+        if len(coords) != 4 and (len(coords) < 6 or len(coords) % 2):
+            report['errors'].append(f"linia {number}: {len(coords)} coordonate "
+                                    f"(nici bbox, nici poligon)")
+            continue
+        if any(c < 0.0 or c > 1.0 for c in coords):
+            report['errors'].append(f"linia {number}: coordonate în afara [0, 1]")
+        if len(coords) == 4 and (coords[2] <= 0 or coords[3] <= 0):
+            report['errors'].append(f"linia {number}: bbox cu lățime/înălțime zero")
+        
+        key = tuple(parts)
+        if key in seen:
+            report['warnings'].append(f"linia {number}: obiect duplicat")
+        seen.add(key)
+        report['objects'] += 1
+    
+    return report
+
+def _validate_job(job):
+    image_path, label_path, nc = job
+    return image_path, validate_file(image_path, label_path, nc)
+
+def find_near_duplicates(entries, max_distance=6):
+    """Perechi de imagini cu distanță Hamming pHash <= max_distance"""
+    entries = [(path, split, h) for path, split, h in entries if h is not None]
+    if len(entries) < 2:
+        return []
+    
+    hashes = np.array([int(h, 16) for _, _, h in entries], dtype=np.uint64)
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1)
+    
+    pairs = []
+    for i in range(len(entries) - 1):
+        distances = np.count_nonzero(bits[i + 1:] != bits[i], axis=1)
+        for offset in np.flatnonzero(distances <= max_distance):
+            j = i + 1 + offset
+            pairs.append({
+                'a': entries[i][0], 'split_a': entries[i][1],
+                'b': entries[j][0], 'split_b': entries[j][1],
+                'distance': int(distances[offset]),
+            })
+    return pairs
+
+def validate_dataset(root=".", data_yaml="data.yaml", workers=None, max_distance=6,
+                     cache_path=VALIDATION_CACHE):
+    """Validează toate split-urile; re-procesează doar fișierele modificate"""
+    
+    root = Path(root)
+    nc = len(load_class_names(root / data_yaml))
+    
+    cache = {}
+    if Path(cache_path).exists():
+        with open(cache_path) as f:
+            stored = json.load(f)
+        if stored.get('version') == CACHE_VERSION and stored.get('nc') == nc:
+            cache = stored['files']
+    
+    files, jobs = {}, []
+    for split in SPLITS:
+        image_dir = root / split / 'images'
+        if not image_dir.exists():
+            continue
+        for image_path in sorted(image_dir.iterdir()):
+            if image_path.suffix.lower() not in IMAGE_EXTENSIONS:
+                continue
+            label_path = root / split / 'labels' / f"{image_path.stem}.txt"
+            key = image_path.relative_to(root).as_posix()
+            signature = [_stat_signature(image_path), _stat_signature(label_path)]
+            
+            cached = cache.get(key)
+            if cached and cached['signature'] == signature:
+                files[key] = cached
+            else:
+                files[key] = {'split': split, 'signature': signature}
+                jobs.append((str(image_path), str(label_path), nc))
+    
+    print(f"🔍 Validare dataset: {len(files)} imagini, {len(jobs)} noi/modificate")
+    
+    if jobs:
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for image_path, report in pool.map(_validate_job, jobs, chunksize=chunksize):
+                key = Path(image_path).relative_to(root).as_posix()
+                files[key].update(report)
+    
+    Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'nc': nc, 'files': files}, f)
+    
+    duplicates = find_near_duplicates(
+        [(key, info['split'], info.get('phash')) for key, info in files.items()], max_distance
+    )
+    leakage = [pair for pair in duplicates if pair['split_a'] != pair['split_b']]
+    
+    summary = {
+        'images': len(files),
+        'revalidated': len(jobs),
+        'errors': {k: v['errors'] for k, v in files.items() if v['errors']},
+        'warnings': {k: v['warnings'] for k, v in files.items() if v['warnings']},
+        'empty_labels': sum(1 for v in files.values() if v['objects'] == 0),
+        'near_duplicates': len(duplicates),
+        'leakage': leakage,
+    }
+    
+    print(f"   {'✅' if not summary['errors'] else '❌'} Fișiere cu erori: {len(summary['errors'])}")
+    for key, errors in list(summary['errors'].items())[:10]:
+        print(f"      • {key}: {'; '.join(errors)}")
+    print(f"   ⚠️  Fișiere cu avertismente: {len(summary['warnings'])} "
+          f"(etichete goale: {summary['empty_labels']})")
+    print(f"   🔁 Duplicate aproape identice: {len(duplicates)} perechi")
+    print(f"   {'✅' if not leakage else '⚠️ '} Scurgeri între split-uri: {len(leakage)} perechi")
+    for pair in leakage[:10]:
+        print(f"      • {pair['a']} ↔ {pair['b']} (distanță {pair['distance']})")
+    
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validare paralelă a dataset-ului")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-distance', type=int, default=6,
+                        help="Distanța Hamming maximă pHash pentru duplicate")
+    parser.add_argument('--report', help="Salvează raportul complet în JSON")
+    args = parser.parse_args()
+    
+    summary = validate_dataset(workers=args.workers, max_distance=args.max_distance)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,144 @@
+"""
+Export al modelului antrenat pentru CPU: ONNX Runtime și OpenVINO
+Cuantizare INT8 opțională, calibrată pe valid/images, acceptată doar dacă mAP nu scade prea mult
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from test_model import EXPORT_REPORT, IMAGE_EXTENSIONS, MODEL_PATH, letterbox
+
+def _calibration_images(image_dir, imgsz, limit):
+    """Imagini din valid/ în formatul de intrare al rețelei (1x3xHxW, RGB, 0-1)"""
+    paths = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    for img_path in paths[:limit]:
+        image = cv2.imread(str(img_path))
+        if image is None:
+            continue
+        image, _, _ = letterbox(image, imgsz)
+        tensor = image[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+        yield np.ascontiguousarray(tensor)
+
+def quantize_onnx_int8(onnx_path, calib_dir="valid/images", imgsz=480, limit=200):
+    """Cuantizare statică INT8 cu ONNX Runtime, calibrată pe valid/images"""
+    try:
+        import onnxruntime as ort
+        from onnxruntime.quantization import (CalibrationDataReader, QuantFormat,
+                                              QuantType, quantize_static)
+    except ImportError:
+        print("❌ onnxruntime nu este instalat: pip install onnxruntime")
+        return None
+    
+    input_name = ort.InferenceSession(str(onnx_path), providers=['CPUExecutionProvider']) \
+        .get_inputs()[0].name
+    
+    class ValidCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self.images = _calibration_images(calib_dir, imgsz, limit)
+        
+        def get_next(self):
+            tensor = next(self.images, None)
+            return None if tensor is None else {input_name: tensor}
+    
+    output_path = Path(onnx_path).with_name(Path(onnx_path).stem + "_int8.onnx")
+    print(f"🔧 Calibrare INT8 pe {calib_dir} (max {limit} imagini)...")
+    quantize_static(
+        str(onnx_path),
+        str(output_path),
+        ValidCalibrationReader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+    return str(output_path)
+
+def evaluate_on_valid(model_path, data="data.yaml", imgsz=480):
+    """mAP pe valid/ rulat pe CPU; returnează metricile și timpul de inferență"""
+    model = YOLO(model_path, task='detect')
+    metrics = model.val(data=data, imgsz=imgsz, batch=1, device='cpu',
+                        split='val', plots=False, verbose=False)
+    return {
+        'map50': float(metrics.box.map50),
+        'map50_95': float(metrics.box.map),
+        'inference_ms': float(metrics.speed['inference']),
+    }
+
+def export_model(formats=('onnx', 'openvino'), int8=False, imgsz=480, data="data.yaml",
+                 max_map_drop=0.01, model_path=MODEL_PATH):
+    """Exportă best.pt și compară mAP-ul fiecărui export cu modelul FP32"""
+    
+    if not Path(model_path).exists():
+        print("❌ Modelul antrenat nu a fost găsit!")
+        print(f"🔍 Căutați în: {model_path}")
+        return None
+    
+    model = YOLO(model_path)
+    exported = {}
+    
+    for fmt in formats:
+        print(f"\n📦 Export {fmt.upper()} (FP32, imgsz={imgsz})...")
+        exported[fmt] = model.export(format=fmt, imgsz=imgsz, dynamic=True,
+                                     simplify=(fmt == 'onnx'), device='cpu')
+        
+        if int8:
+            print(f"📦 Export {fmt.upper()} INT8...")
+            if fmt == 'openvino':
+                # Ultralytics calibrează cu NNCF pe split-ul val din data.yaml (valid/images)
+                exported[f"{fmt}_int8"] = model.export(format=fmt, imgsz=imgsz, int8=True,
+                                                       data=data, device='cpu')
+            elif fmt == 'onnx':
+                int8_path = quantize_onnx_int8(exported[fmt], imgsz=imgsz)
+                if int8_path:
+                    exported[f"{fmt}_int8"] = int8_path
+    
+    print("\n🧪 Evaluare pe valid/ (CPU)...")
+    baseline = evaluate_on_valid(model_path, data, imgsz)
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'source': model_path,
+        'imgsz': imgsz,
+        'max_map_drop': max_map_drop,
+        'baseline': baseline,
+        'backends': {},
+    }
+    
+    print(f"\n📊 {'Backend':<14} {'mAP50':>7} {'mAP50-95':>9} {'Δ mAP50-95':>11} {'ms/img':>7}")
+    print(f"   {'pytorch':<14} {baseline['map50']:>7.3f} {baseline['map50_95']:>9.3f} "
+          f"{'-':>11} {baseline['inference_ms']:>7.1f}")
+    
+    for name, path in exported.items():
+        metrics = evaluate_on_valid(path, data, imgsz)
+        delta = metrics['map50_95'] - baseline['map50_95']
+        accepted = -delta <= max_map_drop
+        report['backends'][name] = {'path': str(path), 'map_delta': delta,
+                                    'accepted': accepted, **metrics}
+        
+        status = "✅" if accepted else "❌ respins"
+        print(f"   {name:<14} {metrics['map50']:>7.3f} {metrics['map50_95']:>9.3f} "
+              f"{delta:>+11.3f} {metrics['inference_ms']:>7.1f} {status}")
+    
+    Path(EXPORT_REPORT).parent.mkdir(parents=True, exist_ok=True)
+    with open(EXPORT_REPORT, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"\n📁 Raport salvat în: {EXPORT_REPORT}")
+    print(f"💡 Modelele cu scădere mAP50-95 > {max_map_drop:.3f} nu vor fi folosite ca backend")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export model pentru inferență pe CPU")
+    parser.add_argument('--formats', nargs='+', default=['onnx', 'openvino'],
+                        choices=['onnx', 'openvino'])
+    parser.add_argument('--int8', action='store_true', help="Cuantizare INT8 calibrată pe valid/")
+    parser.add_argument('--imgsz', type=int, default=480)
+    parser.add_argument('--max-map-drop', type=float, default=0.01)
+    args = parser.parse_args()
+    
+    export_model(args.formats, args.int8, args.imgsz, max_map_drop=args.max_map_drop)
@@ -0,0 +1,207 @@
+"""
+Preprocesare rapidă pentru predicție pe fotografii mari de telefon
+JPEG-urile sunt decodate direct la 1/2, 1/4 sau 1/8 din rezoluție (scalare în domeniul DCT)
+când dimensiunea țintă o permite, iar letterbox-ul scrie într-un buffer prealocat, refolosit
+"""
+
+import argparse
+import statistics
+import struct
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BENCH_DIR = Path("runs/preprocess_bench")
+
+# Markerii SOF (start of frame) care conțin dimensiunile imaginii
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Factorii de reducere suportați de libjpeg, de la cel mai mare
+REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                 (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+def jpeg_size(path):
+    """(lățime, înălțime) din header-ul JPEG, fără decodare; None dacă fișierul nu e JPEG"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read(2) != b'\xff\xd8':
+                return None
+            while True:
+                byte = f.read(1)
+                while byte and byte != b'\xff':
+                    byte = f.read(1)
+                while byte == b'\xff':  # octeți de umplere între segmente
+                    byte = f.read(1)
+                if not byte:
+                    return None
+                marker = byte[0]
+                if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # markeri fără lungime
+                    continue
+                if marker in (0xD9, 0xDA):  # EOI / începutul datelor fără SOF
+                    return None
+                length = struct.unpack('>H', f.read(2))[0]
+                if marker in SOF_MARKERS:
+                    _, height, width = struct.unpack('>BHH', f.read(5))
+                    return width, height
+                f.seek(length - 2, 1)
+    except (OSError, struct.error):
+        return None
+
+def image_size(path):
+    """(lățime, înălțime) fără decodare pentru JPEG; celelalte formate sunt decodate"""
+    size = jpeg_size(path)
+    if size is not None:
+        return size
+    image = cv2.imread(str(path))
+    return None if image is None else (image.shape[1], image.shape[0])
+
+def reduction_factor(size, target):
+    """Cel mai mare factor (8/4/2) pentru care latura mare rămâne >= target (doar micșorare după)"""
+    for factor, flag in REDUCED_FLAGS:
+        if max(size) / factor >= target:
+            return factor, flag
+    return 1, cv2.IMREAD_COLOR
+
+def read_image(path, target=None):
+    """Imaginea BGR, decodată redus când target o permite; (imagine, factor real) sau (None, 1.0)"""
+    size = jpeg_size(path) if target else None
+    if size is None:
+        return cv2.imread(str(path)), 1.0
+    
+    _, flag = reduction_factor(size, target)
+    image = cv2.imread(str(path), flag)
+    if image is None:
+        return None, 1.0
+    # Factorul real (rotunjirea libjpeg; orientarea EXIF poate inversa laturile)
+    return image, max(size) / max(image.shape[:2])
+
+def to_original(xyxy, scale, pad):
+    """Caseta din coordonatele letterbox în coordonatele imaginii originale"""
+    left, top = pad
+    x1, y1, x2, y2 = xyxy
+    return [(x1 - left) / scale, (y1 - top) / scale, (x2 - left) / scale, (y2 - top) / scale]
+
+class ImagePreprocessor:
+    """Decodare redusă + letterbox într-un buffer prealocat, refolosit de la o imagine la alta
+    (bufferul returnat este valid doar până la următorul apel)"""
+    
+    def __init__(self, imgsz=480, color=114):
+        self.imgsz = imgsz
+        self.color = color
+        self.buffer = np.full((imgsz, imgsz, 3), color, np.uint8)
+        self._geometry = None
+    
+    def read(self, path):
+        return read_image(path, self.imgsz)
+    
+    def letterbox(self, image):
+        """Aceeași geometrie ca test_model.letterbox; returnează (buffer, scale, (left, top))"""
+        s = self.imgsz
+        h, w = image.shape[:2]
+        scale = min(s / h, s / w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        left, top = int(round((s - new_w) / 2 - 0.1)), int(round((s - new_h) / 2 - 0.1))
+        
+        # Marginile se recolorează doar când se schimbă geometria (imagini de aceeași orientare)
+        geometry = (new_w, new_h, left, top)
+        if geometry != self._geometry:
+            self.buffer[:] = self.color
+            self._geometry = geometry
+        if (new_w, new_h) != (w, h):
+            image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        self.buffer[top:top + new_h, left:left + new_w] = image
+        return self.buffer, scale, (left, top)
+    
+    def __call__(self, path):
+        """(buffer, scale față de originală, pad) sau None dacă imaginea nu poate fi decodată"""
+        image, factor = self.read(path)
+        if image is None:
+            return None
+        buffer, scale, pad = self.letterbox(image)
+        return buffer, scale / factor, pad
+
+def _current_path(path, imgsz):
+    """Calea anterioară: decodare completă + letterbox cu alocări noi"""
+    from test_model import letterbox
+    
+    return letterbox(cv2.imread(str(path)), imgsz)
+
+def make_phone_images(source_dir="test/images", limit=10, long_side=4000):
+    """Copii JPEG mărite la rezoluția unui telefon (ex. 4000x3000) pentru benchmark"""
+    out_dir = BENCH_DIR / f"phone_{long_side}"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for img_path in sorted(Path(source_dir).glob("*.jpg"))[:limit]:
+        target = out_dir / img_path.name
+        if not target.exists():
+            image = cv2.imread(str(img_path))
+            scale = long_side / max(image.shape[:2])
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+            cv2.imwrite(str(target), image, [cv2.IMWRITE_JPEG_QUALITY, 92])
+        paths.append(target)
+    return paths
+
+def _measure(fn, paths, repeats):
+    """Latența mediană per imagine și vârful de memorie (tracemalloc) al celei mai mari imagini"""
+    for path in paths[:2]:
+        fn(path)  # încălzire (cache de fișiere, alocatorul OpenCV)
+    
+    latencies = []
+    for _ in range(repeats):
+        for path in paths:
+            start = time.perf_counter()
+            fn(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+    
+    # Pas separat: tracemalloc încetinește alocările și ar distorsiona latența
+    peak = 0
+    for path in paths:
+        tracemalloc.start()
+        fn(path)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {'median_ms': statistics.median(latencies), 'peak_bytes': peak}
+
+def benchmark_preprocess(paths, imgsz=480, repeats=5):
+    """Compară calea actuală (decodare completă) cu decodarea redusă + buffer prealocat"""
+    if not paths:
+        print("❌ Nicio imagine pentru benchmark")
+        return None
+    
+    size = image_size(paths[0])
+    factor, _ = reduction_factor(size, imgsz) if size else (1, None)
+    print(f"⏱️  Preprocesare pe {len(paths)} imagini {size[0]}x{size[1]} -> {imgsz} "
+          f"(decodare la 1/{factor})")
+    
+    preprocessor = ImagePreprocessor(imgsz)
+    rows = {
+        'current': _measure(lambda p: _current_path(p, imgsz), paths, repeats),
+        'reduced': _measure(preprocessor, paths, repeats),
+    }
+    for name, row in rows.items():
+        print(f"   • {name:<8} {row['median_ms']:7.1f}ms/imagine   "
+              f"vârf memorie {row['peak_bytes'] / 1024**2:7.1f}MB")
+    
+    current, reduced = rows['current'], rows['reduced']
+    print(f"📊 {current['median_ms'] / reduced['median_ms']:.1f}x mai rapid, "
+          f"{current['peak_bytes'] / max(reduced['peak_bytes'], 1):.1f}x mai puțină memorie")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark preprocesare: decodare completă vs redusă")
+    parser.add_argument('source_dir', nargs='?', default="test/images")
+    parser.add_argument('--imgsz', type=int, default=480)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--phone', type=int, metavar='PX', default=4000,
+                        help="Mărește imaginile la această latură (0 = imaginile ca atare)")
+    args = parser.parse_args()
+    
+    if args.phone:
+        paths = make_phone_images(args.source_dir, args.limit, args.phone)
+    else:
+        paths = sorted(Path(args.source_dir).glob("*.jpg"))[:args.limit]
+    benchmark_preprocess(paths, args.imgsz, args.repeats)
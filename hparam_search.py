@@ -0,0 +1,233 @@
+"""
+Căutare de hiperparametri cu successive halving peste TRAINING_PARAMS
+Trial-urile rulează în paralel într-un process pool; cele slabe sunt oprite devreme pe baza
+mAP-ului de validare intermediar, iar baza de date a trial-urilor permite reluarea
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+HPO_DIR = Path("runs/hpo")
+DEFAULT_DB = HPO_DIR / "trials.sqlite"
+
+# Spațiul de căutare: cheie din TRAINING_PARAMS -> (tip, argumente)
+SEARCH_SPACE = {
+    'lr0': ('loguniform', 1e-4, 1e-2),
+    'optimizer': ('choice', ['AdamW', 'SGD']),
+    'weight_decay': ('loguniform', 1e-5, 1e-3),
+    'mosaic': ('uniform', 0.5, 1.0),
+    'close_mosaic': ('choice', [0, 2, 5, 15]),
+    'hsv_s': ('uniform', 0.3, 0.9),
+    'scale': ('uniform', 0.2, 0.7),
+    'fliplr': ('choice', [0.0, 0.5]),
+}
+
+def sample_config(space, rng):
+    """O configurație aleatoare din spațiul de căutare"""
+    config = {}
+    for key, (kind, *args) in space.items():
+        if kind == 'choice':
+            config[key] = rng.choice(args[0])
+        elif kind == 'uniform':
+            config[key] = round(rng.uniform(args[0], args[1]), 4)
+        elif kind == 'loguniform':
+            config[key] = float(f"{math.exp(rng.uniform(math.log(args[0]), math.log(args[1]))):.3g}")
+        else:
+            raise ValueError(f"Tip necunoscut în spațiul de căutare: {kind}")
+    return config
+
+def rung_budgets(min_epochs, max_epochs, eta):
+    """Epocile pe fiecare treaptă: min_epochs * eta^i, plafonat la max_epochs"""
+    budgets = []
+    epochs = min_epochs
+    while epochs < max_epochs:
+        budgets.append(epochs)
+        epochs *= eta
+    budgets.append(max_epochs)
+    return budgets
+
+class TrialDatabase:
+    """Baza de date SQLite cu trial-uri și rezultatele lor pe fiecare treaptă"""
+    
+    def __init__(self, path=DEFAULT_DB):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS trials (
+                id INTEGER PRIMARY KEY,
+                study TEXT NOT NULL,
+                params TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                trial_id INTEGER NOT NULL,
+                rung INTEGER NOT NULL,
+                epochs INTEGER NOT NULL,
+                map50 REAL,
+                map50_95 REAL,
+                seconds REAL,
+                status TEXT NOT NULL,
+                PRIMARY KEY (trial_id, rung)
+            );
+        """)
+    
+    def trials(self, study):
+        rows = self.db.execute("SELECT id, params FROM trials WHERE study = ? ORDER BY id",
+                               (study,)).fetchall()
+        return [(trial_id, json.loads(params)) for trial_id, params in rows]
+    
+    def add_trial(self, study, params):
+        cursor = self.db.execute("INSERT INTO trials (study, params) VALUES (?, ?)",
+                                 (study, json.dumps(params)))
+        self.db.commit()
+        return cursor.lastrowid
+    
+    def result(self, trial_id, rung):
+        row = self.db.execute(
+            "SELECT map50, map50_95, seconds, status FROM results WHERE trial_id = ? AND rung = ?",
+            (trial_id, rung)).fetchone()
+        return None if row is None else dict(zip(('map50', 'map50_95', 'seconds', 'status'), row))
+    
+    def record(self, trial_id, rung, epochs, metrics):
+        self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (trial_id, rung, epochs, metrics.get('map50'), metrics.get('map50_95'),
+                         metrics.get('seconds'), metrics['status']))
+        self.db.commit()
+    
+    def cost(self, study):
+        return self.db.execute(
+            "SELECT COALESCE(SUM(r.seconds), 0), COALESCE(SUM(r.epochs), 0) FROM results r "
+            "JOIN trials t ON t.id = r.trial_id WHERE t.study = ?", (study,)).fetchone()
+
+def run_trial(trial_id, params, epochs, fraction, device, workers, imgsz):
+    """Antrenează o configurație pentru `epochs` epoci; rulează într-un proces separat"""
+    import torch
+    from ultralytics import YOLO
+    
+    from train_mushroom_model import TRAINING_PARAMS
+    
+    # Un singur thread per trial: trial-urile paralele nu concurează pentru aceleași nuclee
+    if device == 'cpu':
+        torch.set_num_threads(1)
+    
+    train_params = dict(TRAINING_PARAMS)
+    train_params.update(params)
+    train_params.update({
+        'epochs': epochs,
+        'fraction': fraction,
+        'device': device,
+        'workers': workers,
+        'imgsz': imgsz,
+        'amp': device != 'cpu',
+        'patience': epochs,
+        'close_mosaic': min(params.get('close_mosaic', 0), max(epochs - 1, 0)),
+        'warmup_epochs': min(TRAINING_PARAMS['warmup_epochs'], max(epochs - 1, 0)),
+        'plots': False,
+        'verbose': False,
+        'project': str(HPO_DIR / "trials"),
+        'name': f"trial_{trial_id:04d}_e{epochs}",
+        'exist_ok': True,
+    })
+    
+    start = time.perf_counter()
+    try:
+        model = YOLO('yolo11n.pt')
+        model.train(**train_params)
+        metrics = model.trainer.metrics
+        return {
+            'status': 'done',
+            'map50': float(metrics.get('metrics/mAP50(B)', 0.0)),
+            'map50_95': float(metrics.get('metrics/mAP50-95(B)', 0.0)),
+            'seconds': time.perf_counter() - start,
+        }
+    except Exception as e:
+        return {'status': f"failed: {e}", 'map50_95': None, 'seconds': time.perf_counter() - start}
+
+def successive_halving(n_trials=16, min_epochs=1, max_epochs=9, eta=3, fraction=0.25,
+                       parallel=2, device='cpu', workers=0, imgsz=320, seed=0,
+                       space=None, study='default', db_path=DEFAULT_DB):
+    """Successive halving: toate trial-urile pe bugetul mic, cele mai bune 1/eta avansează"""
+    
+    space = space or SEARCH_SPACE
+    db = TrialDatabase(db_path)
+    budgets = rung_budgets(min_epochs, max_epochs, eta)
+    
+    # Trial-urile existente sunt refolosite (reluare după întrerupere)
+    trials = db.trials(study)
+    rng = random.Random(seed + len(trials))
+    while len(trials) < n_trials:
+        params = sample_config(space, rng)
+        trials.append((db.add_trial(study, params), params))
+    trials = trials[:n_trials]
+    
+    print(f"🔎 Căutare hiperparametri '{study}': {len(trials)} trial-uri, trepte {budgets} epoci")
+    print(f"   • Date: {fraction:.0%} din train/, imgsz {imgsz}, device {device}, {parallel} procese")
+    
+    alive = trials
+    context = multiprocessing.get_context('spawn')
+    for rung, epochs in enumerate(budgets):
+        pending = [(trial_id, params) for trial_id, params in alive
+                   if db.result(trial_id, rung) is None]
+        print(f"\n🪜 Treapta {rung}: {len(alive)} trial-uri × {epochs} epoci "
+              f"({len(alive) - len(pending)} deja terminate)")
+        
+        if pending:
+            with ProcessPoolExecutor(max_workers=parallel, mp_context=context) as pool:
+                futures = {pool.submit(run_trial, trial_id, params, epochs, fraction,
+                                       device, workers, imgsz): trial_id
+                           for trial_id, params in pending}
+                for future in as_completed(futures):
+                    trial_id = futures[future]
+                    metrics = future.result()
+                    db.record(trial_id, rung, epochs, metrics)
+                    if metrics['status'] == 'done':
+                        print(f"   • trial {trial_id}: mAP50-95 {metrics['map50_95']:.3f} "
+                              f"({metrics['seconds']:.0f}s)")
+                    else:
+                        print(f"   • trial {trial_id}: ❌ {metrics['status']}")
+        
+        # Clasament pe mAP-ul intermediar; doar cele mai bune 1/eta avansează
+        scored = [(db.result(trial_id, rung)['map50_95'] or 0.0, trial_id, params)
+                  for trial_id, params in alive]
+        scored.sort(key=lambda item: -item[0])
+        if rung < len(budgets) - 1:
+            keep = max(1, len(scored) // eta)
+            alive = [(trial_id, params) for _, trial_id, params in scored[:keep]]
+            print(f"   ✂️  Păstrate {keep}, oprite devreme {len(scored) - keep}")
+    
+    best_map, best_id, best_params = scored[0]
+    seconds, total_epochs = db.cost(study)
+    
+    print("\n🏆 Cea mai bună configurație:")
+    print(f"   • Trial {best_id}: mAP50-95 {best_map:.3f} după {budgets[-1]} epoci")
+    for key, value in best_params.items():
+        print(f"   • {key}: {value}")
+    print(f"💰 Cost total: {seconds / 60:.1f} minute, {total_epochs} epoci "
+          f"(vs {len(trials) * budgets[-1]} fără oprire timpurie)")
+    
+    return {'trial_id': best_id, 'map50_95': best_map, 'params': best_params,
+            'cost_seconds': seconds, 'cost_epochs': total_epochs}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Căutare hiperparametri cu successive halving")
+    parser.add_argument('--trials', type=int, default=16)
+    parser.add_argument('--min-epochs', type=int, default=1)
+    parser.add_argument('--max-epochs', type=int, default=9)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--fraction', type=float, default=0.25, help="Fracțiune din train/")
+    parser.add_argument('--parallel', type=int, default=2)
+    parser.add_argument('--device', default='cpu')
+    parser.add_argument('--imgsz', type=int, default=320)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--study', default='default', help="Numele studiului (pentru reluare)")
+    args = parser.parse_args()
+    
+    successive_halving(args.trials, args.min_epochs, args.max_epochs, args.eta, args.fraction,
+                       args.parallel, args.device, imgsz=args.imgsz, seed=args.seed,
+                       study=args.study)
@@ -0,0 +1,171 @@
+"""
+Store de imagini pre-redimensionate, mapat în memorie (memmap), pentru antrenare
+Imaginile sunt decodate și redimensionate o singură dată; epocile le citesc fără copiere
+"""
+
+import argparse
+import hashlib
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from ultralytics.data.dataset import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+from ultralytics.utils import colorstr
+from ultralytics.utils.torch_utils import de_parallel
+
+STORE_DIR = Path("runs/cache/image_store")
+STORE_VERSION = 1
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+def _source_fingerprint(image_paths, imgsz):
+    """Hash peste (nume, mtime, mărime) + imgsz: se schimbă doar când sursa se schimbă"""
+    digest = hashlib.sha256(f"v{STORE_VERSION}:{imgsz}".encode())
+    for path in image_paths:
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_mtime_ns}:{stat.st_size}".encode())
+    return digest.hexdigest()
+
+def _load_resized(path, imgsz):
+    """Decodare + redimensionare identică cu BaseDataset.load_image (rect_mode)"""
+    image = cv2.imread(str(path))
+    if image is None:
+        return None
+    h0, w0 = image.shape[:2]
+    r = imgsz / max(h0, w0)
+    if r != 1:
+        w, h = (min(math.ceil(w0 * r), imgsz), min(math.ceil(h0 * r), imgsz))
+        image = cv2.resize(image, (w, h), interpolation=cv2.INTER_LINEAR)
+    return np.ascontiguousarray(image), (h0, w0)
+
+class ImageStore:
+    """Fișier binar cu imagini uint8 (HxWx3) + index JSON cu offset-uri"""
+    
+    def __init__(self, data_path, index):
+        self.index = index
+        self.entries = index['entries']
+        # Copy-on-write: augmentările in-place (ex. HSV) nu modifică fișierul
+        self.data = np.memmap(data_path, dtype=np.uint8, mode='c') \
+            if index['total_bytes'] else np.zeros(0, dtype=np.uint8)
+    
+    @staticmethod
+    def paths_for(image_dir, imgsz):
+        name = f"{Path(image_dir).parent.name}_{imgsz}"
+        return STORE_DIR / f"{name}.bin", STORE_DIR / f"{name}.json"
+    
+    @classmethod
+    def open_or_build(cls, image_dir, imgsz, workers=4):
+        """Deschide store-ul; îl reconstruiește doar dacă imaginile sau imgsz s-au schimbat"""
+        image_paths = sorted(p for p in Path(image_dir).iterdir()
+                             if p.suffix.lower() in IMAGE_EXTENSIONS)
+        fingerprint = _source_fingerprint(image_paths, imgsz)
+        data_path, index_path = cls.paths_for(image_dir, imgsz)
+        
+        if index_path.exists() and data_path.exists():
+            with open(index_path) as f:
+                index = json.load(f)
+            if index.get('fingerprint') == fingerprint:
+                return cls(data_path, index)
+        
+        return cls.build(image_paths, imgsz, fingerprint, data_path, index_path, workers)
+    
+    @classmethod
+    def build(cls, image_paths, imgsz, fingerprint, data_path, index_path, workers=4):
+        """Decodează în paralel și scrie imaginile consecutiv în fișierul binar"""
+        print(f"🗄️  Construire image store ({len(image_paths)} imagini, imgsz={imgsz})...")
+        STORE_DIR.mkdir(parents=True, exist_ok=True)
+        
+        entries = {}
+        offset = 0
+        tmp_path = data_path.with_suffix('.bin.tmp')
+        with open(tmp_path, 'wb') as f, ThreadPoolExecutor(max_workers=workers) as pool:
+            for path, loaded in zip(image_paths,
+                                    pool.map(lambda p: _load_resized(p, imgsz), image_paths)):
+                if loaded is None:
+                    print(f"   ⚠️  Imagine coruptă, sărită: {path.name}")
+                    continue
+                image, (h0, w0) = loaded
+                f.write(image.tobytes())
+                entries[path.name] = [offset, image.shape[0], image.shape[1], h0, w0]
+                offset += image.nbytes
+        tmp_path.replace(data_path)
+        
+        index = {'version': STORE_VERSION, 'imgsz': imgsz, 'fingerprint': fingerprint,
+                 'total_bytes': offset, 'entries': entries}
+        with open(index_path, 'w') as f:
+            json.dump(index, f)
+        
+        print(f"   ✅ {len(entries)} imagini, {offset / 1024**2:.1f}MB în {data_path}")
+        return cls(data_path, index)
+    
+    def get(self, image_file):
+        """(imagine, (h0, w0), (h, w)) ca view în memmap, sau None dacă lipsește"""
+        entry = self.entries.get(Path(image_file).name)
+        if entry is None:
+            return None
+        offset, h, w, h0, w0 = entry
+        image = self.data[offset:offset + h * w * 3].reshape(h, w, 3)
+        return image, (h0, w0), (h, w)
+
+class MemmapYOLODataset(YOLODataset):
+    """YOLODataset care citește imaginile din ImageStore în loc să le decodeze"""
+    
+    def __init__(self, *args, store=None, **kwargs):
+        self.store = store
+        super().__init__(*args, **kwargs)
+    
+    def load_image(self, i, rect_mode=True, **kwargs):
+        if self.ims[i] is not None:
+            return self.ims[i], self.im_hw0[i], self.im_hw[i]
+        loaded = self.store.get(self.im_files[i]) if self.store is not None and rect_mode else None
+        if loaded is None:
+            return super().load_image(i, rect_mode, **kwargs)
+        
+        # Aceeași evidență ca BaseDataset.load_image: Mosaic alege celelalte imagini din self.buffer
+        image, hw0, hw = loaded
+        if self.augment and self.cache != "ram":
+            self.ims[i], self.im_hw0[i], self.im_hw[i] = image, hw0, hw
+            self.buffer.append(i)
+            if 1 < len(self.buffer) >= self.max_buffer_length:
+                j = self.buffer.pop(0)
+                self.ims[j], self.im_hw0[j], self.im_hw[j] = None, None, None
+        return loaded
+
+class MemmapDetectionTrainer(DetectionTrainer):
+    """DetectionTrainer cu dataset-uri servite din ImageStore (train și val)"""
+    
+    def build_dataset(self, img_path, mode="train", batch=None):
+        gs = max(int(de_parallel(self.model).stride.max() if self.model else 0), 32)
+        store = ImageStore.open_or_build(img_path, self.args.imgsz)
+        # Aceiași parametri ca build_yolo_dataset din Ultralytics
+        return MemmapYOLODataset(
+            store=store,
+            img_path=img_path,
+            imgsz=self.args.imgsz,
+            batch_size=batch,
+            augment=mode == "train",
+            hyp=self.args,
+            rect=self.args.rect or mode == "val",
+            cache=None,
+            single_cls=self.args.single_cls or False,
+            stride=gs,
+            pad=0.0 if mode == "train" else 0.5,
+            prefix=colorstr(f"{mode}: "),
+            task=self.args.task,
+            classes=self.args.classes,
+            data=self.data,
+            fraction=self.args.fraction if mode == "train" else 1.0,
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construiește image store-ul pentru antrenare")
+    parser.add_argument('--imgsz', type=int, default=480)
+    parser.add_argument('--splits', nargs='+', default=['train', 'valid'])
+    args = parser.parse_args()
+    
+    for split in args.splits:
+        store = ImageStore.open_or_build(f"{split}/images", args.imgsz)
+        print(f"✅ {split}: {len(store.entries)} imagini în store")
@@ -0,0 +1,181 @@
+"""
+Antrenare incrementală pornind de la best.pt curent
+Un manifest reține imaginile deja învățate; doar imaginile noi (plus un buffer de
+reluare din cele vechi) sunt antrenate câteva epoci, iar modelul nou este acceptat
+doar dacă mAP-ul pe valid/ nu scade
+"""
+
+import argparse
+import json
+import random
+import shutil
+import time
+from pathlib import Path
+
+import torch
+import yaml
+from ultralytics import YOLO
+
+from prediction_cache import weights_fingerprint
+from test_model import IMAGE_EXTENSIONS, MODEL_PATH
+from train_mushroom_model import TRAINING_PARAMS
+
+INCREMENTAL_DIR = Path("runs/incremental")
+MANIFEST_PATH = INCREMENTAL_DIR / "manifest.json"
+
+def file_signature(img_path):
+    """Semnătura ieftină a unei imagini și a etichetei ei: (dimensiune, mtime)"""
+    label_path = img_path.parent.parent / 'labels' / f"{img_path.stem}.txt"
+    signature = [img_path.stat().st_size, img_path.stat().st_mtime_ns]
+    if label_path.exists():
+        signature += [label_path.stat().st_size, label_path.stat().st_mtime_ns]
+    return signature
+
+def scan_images(image_dir="train/images"):
+    """Toate imaginile de antrenare cu semnăturile lor"""
+    return {str(p.resolve()): file_signature(p) for p in sorted(Path(image_dir).iterdir())
+            if p.suffix.lower() in IMAGE_EXTENSIONS}
+
+def load_manifest(path=MANIFEST_PATH):
+    if not Path(path).exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(images, map50_95, weights, path=MANIFEST_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    # Hash-ul greutăților: best.pt își păstrează calea după fiecare reantrenare
+    with open(path, 'w') as f:
+        json.dump({'updated': time.strftime('%Y-%m-%d %H:%M:%S'), 'weights': str(weights),
+                   'weights_hash': weights_fingerprint(weights), 'map50_95': map50_95,
+                   'images': images}, f)
+
+def diff_images(current, manifest):
+    """Imaginile noi sau modificate față de manifest, respectiv cele deja învățate"""
+    known = manifest['images']
+    changed = [path for path, signature in current.items() if known.get(path) != signature]
+    unchanged = [path for path in current if known.get(path) == current[path]]
+    return changed, unchanged
+
+def write_subset_data(image_paths, name, data_yaml='data.yaml'):
+    """data.yaml pentru un subset: train este o listă de imagini, val rămâne valid/"""
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+    
+    INCREMENTAL_DIR.mkdir(parents=True, exist_ok=True)
+    list_path = INCREMENTAL_DIR / f"{name}.txt"
+    list_path.write_text("\n".join(image_paths) + "\n")
+    
+    subset = {
+        'train': str(list_path.resolve()),
+        'val': str(Path('valid/images').resolve()),
+        'nc': data['nc'],
+        'names': data['names'],
+    }
+    subset_yaml = INCREMENTAL_DIR / f"{name}.yaml"
+    with open(subset_yaml, 'w') as f:
+        yaml.safe_dump(subset, f)
+    return str(subset_yaml)
+
+def validate_map(weights, imgsz, device):
+    """mAP50-95 pe valid/ pentru un set de greutăți"""
+    metrics = YOLO(str(weights)).val(data=TRAINING_PARAMS['data'], imgsz=imgsz, device=device,
+                                     plots=False, verbose=False)
+    return float(metrics.box.map)
+
+def train_incremental(epochs=5, replay_ratio=1.0, min_replay=32, max_map_drop=0.005,
+                      lr_scale=0.1, weights=MODEL_PATH, seed=0):
+    """Fine-tuning pe imaginile noi + buffer de reluare, acceptat doar fără regresie pe valid/"""
+    
+    weights = Path(weights)
+    if not weights.exists():
+        print(f"❌ Modelul antrenat nu există: {weights}")
+        print("💡 Rulați mai întâi: python train_mushroom_model.py")
+        return None
+    
+    device = TRAINING_PARAMS['device'] if torch.cuda.is_available() else 'cpu'
+    imgsz = TRAINING_PARAMS['imgsz']
+    current = scan_images()
+    manifest = load_manifest()
+    
+    if manifest is None:
+        # Prima rulare: best.pt a fost antrenat pe tot train/ actual
+        print("📝 Manifest inexistent - se consideră învățate toate imaginile curente")
+        baseline = validate_map(weights, imgsz, device)
+        save_manifest(current, baseline, weights)
+        print(f"✅ Manifest creat: {len(current)} imagini, mAP50-95 {baseline:.3f}")
+        return {'status': 'bootstrapped', 'images': len(current), 'map50_95': baseline}
+    
+    changed, unchanged = diff_images(current, manifest)
+    if not changed:
+        print("✅ Nicio imagine nouă de la ultima antrenare")
+        return {'status': 'up_to_date'}
+    
+    # Buffer de reluare: imagini vechi amestecate cu cele noi, contra uitării
+    rng = random.Random(seed)
+    n_replay = min(len(unchanged), max(min_replay, int(len(changed) * replay_ratio)))
+    replay = rng.sample(unchanged, n_replay)
+    data_yaml = write_subset_data(changed + replay, 'incremental_train')
+    
+    print(f"🆕 Imagini noi/modificate: {len(changed)}")
+    print(f"🔁 Buffer de reluare: {len(replay)} din {len(unchanged)} imagini vechi")
+    
+    baseline = manifest.get('map50_95')
+    if baseline is None or manifest.get('weights_hash') != weights_fingerprint(weights):
+        baseline = validate_map(weights, imgsz, device)
+    print(f"📊 mAP50-95 curent pe valid/: {baseline:.3f}")
+    
+    train_params = dict(TRAINING_PARAMS)
+    train_params.update({
+        'data': data_yaml,
+        'epochs': epochs,
+        'device': device,
+        'amp': device != 'cpu',
+        'lr0': TRAINING_PARAMS['lr0'] * lr_scale,  # pas mic: modelul e deja aproape de optim
+        'warmup_epochs': 0,
+        'close_mosaic': min(TRAINING_PARAMS['close_mosaic'], max(epochs - 1, 0)),
+        'patience': epochs,
+        'plots': False,
+        'name': 'mushroom_detector_incremental',
+    })
+    
+    print(f"🚀 Fine-tuning {epochs} epoci pe {len(changed) + len(replay)} imagini...")
+    start = time.perf_counter()
+    model = YOLO(str(weights))
+    model.train(**train_params)
+    seconds = time.perf_counter() - start
+    
+    candidate = Path(model.trainer.best)
+    candidate_map = validate_map(candidate, imgsz, device)
+    accepted = candidate_map >= baseline - max_map_drop
+    
+    print(f"\n📊 mAP50-95 pe valid/: {baseline:.3f} → {candidate_map:.3f} "
+          f"({candidate_map - baseline:+.3f}), antrenare {seconds / 60:.1f} minute")
+    
+    if accepted:
+        backup = weights.with_name('best_prev.pt')
+        shutil.copy2(weights, backup)
+        shutil.copy2(candidate, weights)
+        save_manifest(current, candidate_map, weights)
+        print(f"✅ Model acceptat și copiat în: {weights} (anterior: {backup})")
+    else:
+        # Manifestul rămâne neschimbat: imaginile noi vor fi reîncercate data viitoare
+        print(f"❌ Model respins: regresie peste {max_map_drop:.3f} mAP50-95")
+        print(f"💡 Modelul curent rămâne {weights}; candidatul este în: {candidate}")
+    
+    return {'status': 'accepted' if accepted else 'rejected', 'new_images': len(changed),
+            'replay_images': len(replay), 'baseline_map50_95': baseline,
+            'map50_95': candidate_map, 'seconds': seconds}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Antrenare incrementală pe imaginile noi")
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--replay-ratio', type=float, default=1.0,
+                        help="Imagini vechi reluate per imagine nouă")
+    parser.add_argument('--min-replay', type=int, default=32)
+    parser.add_argument('--max-map-drop', type=float, default=0.005)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    train_incremental(args.epochs, args.replay_ratio, args.min_replay, args.max_map_drop,
+                      seed=args.seed)
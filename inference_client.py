@@ -0,0 +1,36 @@
+"""
+Client pentru serverul local de inferență (inference_server.py)
+Folosește doar biblioteca standard - nu încarcă torch/ultralytics
+"""
+
+import json
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+DEFAULT_SERVER_URL = "http://127.0.0.1:8765"
+
+def server_is_running(url=DEFAULT_SERVER_URL, timeout=0.5):
+    """Verifică dacă serverul de inferență răspunde"""
+    try:
+        with urllib.request.urlopen(f"{url}/health", timeout=timeout) as response:
+            return response.status == 200
+    except (urllib.error.URLError, OSError):
+        return False
+
+def identify(image_path, url=DEFAULT_SERVER_URL, timeout=30):
+    """Trimite o imagine la server și returnează lista de detecții"""
+    data = Path(image_path).read_bytes()
+    request = urllib.request.Request(
+        f"{url}/predict",
+        data=data,
+        headers={'Content-Type': 'application/octet-stream'},
+        method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())['detections']
+
+def get_stats(url=DEFAULT_SERVER_URL, timeout=5):
+    """Returnează statisticile serverului (coadă, latențe, batch-uri)"""
+    with urllib.request.urlopen(f"{url}/stats", timeout=timeout) as response:
+        return json.loads(response.read())
@@ -0,0 +1,226 @@
+"""
+Server local de inferență pentru detecția ciupercilor
+Păstrează modelul YOLO încărcat și grupează cererile concurente în micro-batch-uri
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from mushroom_detector import MushroomDetector, to_detections
+from test_model import (BACKENDS, DEFAULT_CONF, filter_detections, load_class_thresholds,
+                        resolve_backend)
+
+def percentile(values, q):
+    """Percentila q (0-100) prin metoda nearest-rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+class MicroBatcher:
+    """Colectează cererile concurente și le rulează împreună într-un singur batch"""
+    
+    def __init__(self, detector, thresholds=None, conf=DEFAULT_CONF, max_wait_ms=10, history=1000):
+        self.detector = detector
+        self.thresholds = thresholds or {}
+        self.conf = conf
+        self.max_batch = detector.max_batch
+        self.max_wait = max_wait_ms / 1000
+        
+        self.requests = queue.Queue()
+        self.latencies = deque(maxlen=history)
+        self.batch_sizes = deque(maxlen=history)
+        self.processed = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+    
+    def start(self):
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=5)
+    
+    def submit(self, image):
+        """Adaugă o imagine (BGR, numpy) în coadă; returnează un Future cu detecțiile"""
+        future = Future()
+        self.requests.put((image, future, time.perf_counter()))
+        return future
+    
+    def _collect_batch(self):
+        """Așteaptă prima cerere, apoi maxim max_wait pentru a umple batch-ul"""
+        try:
+            batch = [self.requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _loop(self):
+        while not self.stop_event.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            
+            images = [item[0] for item in batch]
+            try:
+                results = self.detector.detect_batch(images, raw=True)
+            except Exception as e:
+                with self.lock:
+                    self.errors += len(batch)
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            
+            done = time.perf_counter()
+            with self.lock:
+                self.batch_sizes.append(len(batch))
+                self.processed += len(batch)
+                for (_, _, submitted), _ in zip(batch, results):
+                    self.latencies.append((done - submitted) * 1000)
+            
+            # Pragurile per clasă se aplică după NMS-ul micro-batch-ului, ca în test_model
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(filter_detections(to_detections(result), self.thresholds, self.conf))
+    
+    def stats(self):
+        """Adâncimea cozii, percentile de latență și dimensiunea medie a batch-urilor"""
+        with self.lock:
+            latencies = list(self.latencies)
+            batch_sizes = list(self.batch_sizes)
+            processed = self.processed
+            errors = self.errors
+        
+        return {
+            'queue_depth': self.requests.qsize(),
+            'processed': processed,
+            'errors': errors,
+            'avg_batch_size': sum(batch_sizes) / len(batch_sizes) if batch_sizes else 0.0,
+            'latency_ms': {
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+            },
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+def make_handler(batcher):
+    """Construiește handler-ul HTTP legat de un MicroBatcher"""
+    
+    class InferenceHandler(BaseHTTPRequestHandler):
+        def _send_json(self, payload, status=200):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json({'status': 'ok'})
+            elif self.path == '/stats':
+                self._send_json(batcher.stats())
+            else:
+                self._send_json({'error': 'not found'}, status=404)
+        
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send_json({'error': 'not found'}, status=404)
+                return
+            
+            length = int(self.headers.get('Content-Length', 0))
+            data = self.rfile.read(length)
+            
+            # Acceptă fie bytes de imagine, fie JSON {"path": "..."}
+            if self.headers.get('Content-Type', '').startswith('application/json'):
+                path = json.loads(data).get('path', '')
+                data = Path(path).read_bytes() if Path(path).is_file() else b''
+            
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) if data else None
+            if image is None:
+                self._send_json({'error': 'imagine invalidă'}, status=400)
+                return
+            
+            try:
+                detections = batcher.submit(image).result(timeout=60)
+            except Exception as e:
+                self._send_json({'error': str(e)}, status=500)
+                return
+            
+            self._send_json({'detections': detections})
+        
+        def log_message(self, format, *args):
+            # Fără log pe fiecare cerere - statisticile sunt în /stats
+            pass
+    
+    return InferenceHandler
+
+def run_server(host="127.0.0.1", port=8765, backend='pytorch', max_batch=8,
+               max_wait_ms=10, conf=0.25, imgsz=480, warmup=2):
+    """Pornește serverul HTTP cu modelul menținut încărcat"""
+    
+    model_path, _ = resolve_backend(backend)
+    if model_path is None:
+        return
+    thresholds = load_class_thresholds(model_path)
+    
+    # Încălzire pe toate dimensiunile de batch: prima cerere nu plătește inițializarea
+    detector = MushroomDetector.load(backend, imgsz=imgsz, conf=conf, thresholds=thresholds,
+                                     max_batch=max_batch, warmup=warmup)
+    if detector is None:
+        return
+    
+    batcher = MicroBatcher(detector, thresholds, conf, max_wait_ms=max_wait_ms).start()
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    
+    print(f"🚀 Server pornit pe http://{host}:{port}")
+    print(f"   • Micro-batch: max {max_batch} imagini / {max_wait_ms}ms")
+    print("   • POST /predict  - imagine (bytes) sau JSON {\"path\": ...}")
+    print("   • GET  /stats    - coadă și latențe p50/p95/p99")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Oprire server...")
+    finally:
+        server.server_close()
+        batcher.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server local de inferență ciuperci")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--backend', default='pytorch', choices=BACKENDS)
+    parser.add_argument('--max-batch', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--imgsz', type=int, default=480)
+    args = parser.parse_args()
+    
+    run_server(args.host, args.port, args.backend, args.max_batch,
+               args.max_wait_ms, args.conf, args.imgsz)
@@ -0,0 +1,181 @@
+"""
+CLI unic pentru proiect: check, train, predict, benchmark, serve, similar
+Modulele grele (torch, ultralytics, cv2) sunt importate doar în subcomanda care le folosește,
+astfel încât --help și check răspund instant
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from test_model import BACKENDS, add_predict_arguments
+
+def cmd_check(args):
+    from pre_training_check import main
+    return main(deep=args.deep)
+
+def cmd_train(args):
+    if args.incremental:
+        from incremental_training import train_incremental
+        result = train_incremental(epochs=args.epochs or 5)
+        return result is not None and result['status'] != 'rejected'
+    
+    from train_mushroom_model import train_mushroom_detector
+    return train_mushroom_detector(use_image_store=not args.no_image_store,
+                                   auto_batch=args.auto_batch,
+                                   offline_augment=args.offline_augment,
+                                   augment_seed=args.augment_seed,
+                                   device=args.device) is not None
+
+def cmd_predict(args):
+    from test_model import run_predict
+    run_predict(args)
+    return True
+
+def cmd_benchmark(args):
+    from benchmark import run_benchmark
+    return run_benchmark(args.backends, args.batch, args.imgsz, args.threads,
+                         with_map=not args.no_map, with_training=args.train,
+                         save_baseline=args.save_baseline)
+
+def cmd_serve(args):
+    from inference_server import run_server
+    run_server(args.host, args.port, args.backend, args.max_batch, args.max_wait_ms,
+               args.conf, args.imgsz)
+    return True
+
+def cmd_results(args):
+    from results_store import CLASS_IDS, ResultsStore, print_rows
+    
+    store = ResultsStore()
+    print_rows(store.query(CLASS_IDS.get(args.class_name), args.min_conf, run_id=args.run,
+                           limit=args.limit))
+    store.close()
+    return True
+
+def cmd_similar(args):
+    from specimen_index import SpecimenIndex, find_similar
+    
+    index = SpecimenIndex()
+    if args.build or args.rebuild or index.meta is None:
+        index = index.update(rebuild=args.rebuild)
+        if index is None:
+            return False
+    return not args.image or find_similar(args.image, args.k, args.same_class, index) is not None
+
+def cmd_startup(args):
+    """Măsoară timpul de pornire pentru comenzile care trebuie să fie instantanee"""
+    commands = [['--help'], ['check', '--quiet']]
+    ok = True
+    
+    print(f"⏱️  Timp de pornire ({args.repeats} rulări, mediană):")
+    for command in commands:
+        times = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, __file__, *command], stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        median = statistics.median(times)
+        fast = median < args.limit
+        ok = ok and fast
+        print(f"   {'✅' if fast else '⚠️ '} {' '.join(command):<14} {median * 1000:6.0f}ms")
+    
+    # Confirmă că niciun modul greu nu este importat la pornire
+    probe = ("import sys, mushroom_cli; "
+             "print(','.join(m for m in ('torch', 'ultralytics', 'cv2', 'matplotlib') "
+             "if m in sys.modules))")
+    heavy = subprocess.run([sys.executable, '-c', probe], capture_output=True,
+                           text=True).stdout.strip()
+    if heavy:
+        print(f"   ⚠️  Module grele importate la pornire: {heavy}")
+        ok = False
+    else:
+        print("   ✅ Niciun modul greu (torch, ultralytics, cv2) importat la pornire")
+    return ok
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="mushroom_cli.py",
+                                     description="🍄 Detecție ciuperci - antrenare, testare, servire")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    check = commands.add_parser('check', help="Verificări înainte de antrenare")
+    check.add_argument('--deep', action='store_true',
+                       help="Validare completă a imaginilor (decodare, duplicate)")
+    check.add_argument('--quiet', action='store_true', help="Doar codul de ieșire")
+    check.set_defaults(func=cmd_check)
+    
+    train = commands.add_parser('train', help="Antrenarea modelului")
+    train.add_argument('--incremental', action='store_true',
+                       help="Fine-tuning doar pe imaginile noi (vezi incremental_training.py)")
+    train.add_argument('--epochs', type=int, help="Epoci pentru modul incremental")
+    train.add_argument('--auto-batch', action='store_true')
+    train.add_argument('--no-image-store', action='store_true')
+    train.add_argument('--offline-augment', type=int, default=0, metavar='K',
+                       help="Pre-generează K epoci augmentate în shard-uri (vezi augment_shards.py)")
+    train.add_argument('--augment-seed', type=int, default=0)
+    train.add_argument('--device', help="0, 1, ... sau cpu (implicit: GPU dacă există)")
+    train.set_defaults(func=cmd_train)
+    
+    predict = commands.add_parser('predict', help="Testare / predicție")
+    add_predict_arguments(predict)
+    predict.set_defaults(func=cmd_predict)
+    
+    benchmark = commands.add_parser('benchmark', help="Benchmark inferență și antrenare")
+    benchmark.add_argument('--backends', nargs='+', default=['pytorch'])
+    benchmark.add_argument('--batch', nargs='+', type=int, default=[1, 8])
+    benchmark.add_argument('--imgsz', nargs='+', type=int, default=[480, 640])
+    benchmark.add_argument('--threads', nargs='+', type=int, default=[1, 4])
+    benchmark.add_argument('--no-map', action='store_true')
+    benchmark.add_argument('--train', action='store_true')
+    benchmark.add_argument('--save-baseline', action='store_true')
+    benchmark.set_defaults(func=cmd_benchmark)
+    
+    serve = commands.add_parser('serve', help="Server local de inferență")
+    serve.add_argument('--host', default="127.0.0.1")
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--backend', default='pytorch', choices=BACKENDS)
+    serve.add_argument('--max-batch', type=int, default=8)
+    serve.add_argument('--max-wait-ms', type=float, default=10)
+    serve.add_argument('--conf', type=float, default=0.25)
+    serve.add_argument('--imgsz', type=int, default=480)
+    serve.set_defaults(func=cmd_serve)
+    
+    results = commands.add_parser('results', help="Interogarea detecțiilor salvate")
+    results.add_argument('--class', dest='class_name',
+                         choices=['chanterelle', 'death-cap', 'field-mushroom'])  # CLASS_IDS
+    results.add_argument('--min-conf', type=float, default=0.0)
+    results.add_argument('--run', type=int)
+    results.add_argument('--limit', type=int, default=50)
+    results.set_defaults(func=cmd_results)
+    
+    similar = commands.add_parser('similar', help="Exemplare etichetate asemănătoare (index)")
+    similar.add_argument('image', nargs='?')
+    similar.add_argument('--build', action='store_true', help="Actualizare incrementală a indexului")
+    similar.add_argument('--rebuild', action='store_true', help="Re-indexare cu best.pt curent")
+    similar.add_argument('--k', type=int, default=5)
+    similar.add_argument('--same-class', action='store_true')
+    similar.set_defaults(func=cmd_similar)
+    
+    startup = commands.add_parser('startup', help="Măsoară timpul de pornire al CLI-ului")
+    startup.add_argument('--repeats', type=int, default=5)
+    startup.add_argument('--limit', type=float, default=1.0, help="Limita în secunde")
+    startup.set_defaults(func=cmd_startup)
+    
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'quiet', False):
+        import contextlib
+        import io
+        with contextlib.redirect_stdout(io.StringIO()):
+            ok = args.func(args)
+    else:
+        ok = args.func(args)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Detectorul de ciuperci refolosibil: modelul se încarcă o singură dată, forma intrării este fixă
+(letterbox imgsz x imgsz) și pașii de încălzire rulează la încărcare, astfel încât primul apel
+costă cât unul obișnuit. Rezultatele sunt array-uri NumPy (casete, clase, confidence)
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from ultralytics import YOLO
+from ultralytics.utils.nms import non_max_suppression
+
+from fast_preprocess import ImagePreprocessor, read_image
+from test_model import (DEFAULT_CONF, IMAGE_EXTENSIONS, MUSHROOM_TYPES, UNKNOWN_TYPE,
+                        make_detection, resolve_backend)
+
+DEATH_CAP = 1
+
+class MushroomDetector:
+    """YOLO încărcat o dată; apelurile returnează array-uri, fără bucle Python per casetă"""
+    
+    def __init__(self, model_path, device, imgsz=480, conf=DEFAULT_CONF, thresholds=None,
+                 max_batch=1, iou=0.7, max_det=300, warmup=2):
+        self.model_path = str(model_path)
+        self.model = YOLO(self.model_path, task='detect')
+        self.imgsz = imgsz
+        self.iou = iou
+        self.max_det = max_det
+        self.max_batch = max_batch
+        self.preprocessors = [ImagePreprocessor(imgsz) for _ in range(max_batch)]
+        
+        names = self.model.names
+        # Pragul per clasă ca array: filtrarea se face vectorizat, după clasa fiecărei casete
+        self.class_conf = np.full(len(names), conf, np.float32)
+        for cls, threshold in (thresholds or {}).items():
+            self.class_conf[cls] = threshold
+        self.conf = float(self.class_conf.min())
+        self.safety = np.array([MUSHROOM_TYPES.get(cls, UNKNOWN_TYPE)[1] for cls in range(len(names))])
+        
+        # PyTorch rulează direct rețeaua (fără Results); exporturile trec prin model.predict
+        self.pytorch = self.model_path.endswith('.pt')
+        if self.pytorch:
+            self.device = torch.device('cuda:0' if device != 'cpu' and torch.cuda.is_available() else 'cpu')
+            self.half = self.device.type == 'cuda'
+            net = self.model.model.fuse(verbose=False).to(self.device).eval()
+            self.net = (net.half() if self.half else net).to(memory_format=torch.channels_last)
+            # Forma e fixă: cuDNN își alege algoritmii o dată, în timpul încălzirii
+            torch.backends.cudnn.benchmark = True
+        else:
+            self.device = device
+        
+        for _ in range(warmup):
+            self.warmup()
+    
+    @classmethod
+    def load(cls, backend='pytorch', **kwargs):
+        """Detectorul pentru backend-ul ales; None (cu mesaj) dacă modelul lipsește"""
+        model_path, device = resolve_backend(backend)
+        if model_path is None:
+            return None
+        print(f"📥 Încărcare model antrenat ({backend})...")
+        return cls(model_path, device, **kwargs)
+    
+    def warmup(self):
+        """Rulează toate dimensiunile de batch posibile cu imagini goale"""
+        blank = np.full((self.imgsz, self.imgsz, 3), 114, np.uint8)
+        for size in range(1, self.max_batch + 1):
+            self.detect_batch([blank] * size)
+        if self.pytorch and self.half:
+            torch.cuda.synchronize()
+    
+    def __call__(self, image, factor=1.0, raw=False):
+        """O imagine (BGR sau cale) -> dict cu array-urile detecțiilor, sau None dacă nu se decodează
+        (factor = cât a fost redusă imaginea la decodare, vezi fast_preprocess.read_image)"""
+        return self.detect_batch([image], [factor], raw)[0]
+    
+    @torch.inference_mode()
+    def detect_batch(self, images, factors=None, raw=False):
+        """Listă de imagini (BGR sau căi); casetele sunt în coordonatele imaginilor originale
+        (raw=True: doar pragul NMS, fără pragurile per clasă - pentru rezultate salvate în cache)"""
+        factors = factors or [1.0] * len(images)
+        outputs = []
+        for start in range(0, len(images), self.max_batch):
+            chunk = zip(images[start:start + self.max_batch], factors[start:start + self.max_batch])
+            buffers, geometry, valid = [], [], []
+            for preprocessor, (image, factor) in zip(self.preprocessors, chunk):
+                if isinstance(image, (str, Path)):
+                    image, factor = read_image(image, self.imgsz)
+                valid.append(image is not None)
+                if image is None:
+                    continue
+                buffer, scale, pad = preprocessor.letterbox(image)
+                buffers.append(buffer)
+                geometry.append((scale / factor, pad))
+            
+            predictions = self._infer(buffers) if buffers else []
+            results = iter(self._finish(pred, scale, pad, raw)
+                           for pred, (scale, pad) in zip(predictions, geometry))
+            outputs += [next(results) if ok else None for ok in valid]
+        return outputs
+    
+    def _infer(self, buffers):
+        """Casetele (n, 6): x1, y1, x2, y2, conf, clasă în coordonatele letterbox, per imagine"""
+        if not self.pytorch:
+            results = self.model.predict(source=buffers, imgsz=self.imgsz, conf=self.conf,
+                                         iou=self.iou, max_det=self.max_det, device=self.device,
+                                         verbose=False)
+            return [result.boxes.data.cpu().numpy() for result in results]
+        
+        x = torch.from_numpy(np.stack(buffers)).to(self.device, non_blocking=True)
+        # NHWC uint8 BGR -> NCHW RGB cu layout channels-last (permute nu copiază)
+        x = x[..., [2, 1, 0]].permute(0, 3, 1, 2)
+        x = (x.half() if self.half else x.float()) / 255
+        preds = self.net(x)
+        detections = non_max_suppression(preds, self.conf, self.iou, max_det=self.max_det)
+        return [det.float().cpu().numpy() for det in detections]
+    
+    def _finish(self, pred, scale, pad, raw=False):
+        classes = pred[:, 5].astype(np.int64)
+        confidences = pred[:, 4]
+        keep = confidences >= (self.conf if raw else self.class_conf[classes])
+        classes, confidences = classes[keep], confidences[keep]
+        boxes = (pred[keep, :4] - (pad[0], pad[1], pad[0], pad[1])) / scale
+        return {
+            'boxes': boxes,
+            'classes': classes,
+            'confidences': confidences,
+            'safety': self.safety[classes],
+            'toxic': bool((classes == DEATH_CAP).any()),
+        }
+
+def to_detections(result):
+    """Array-urile detectorului -> lista de detecții (dict) folosită de stocare și afișare"""
+    if result is None:
+        return []
+    return [make_detection(int(cls), float(conf), box)
+            for cls, conf, box in zip(result['classes'], result['confidences'],
+                                      result['boxes'].tolist())]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Costul primului apel vs regim staționar")
+    parser.add_argument('source_dir', nargs='?', default="test/images")
+    parser.add_argument('--backend', default='pytorch')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    args = parser.parse_args()
+    
+    image_paths = sorted(p for p in Path(args.source_dir).iterdir()
+                         if p.suffix.lower() in IMAGE_EXTENSIONS)[:args.repeats + 1]
+    start = time.perf_counter()
+    detector = MushroomDetector.load(args.backend, warmup=args.warmup)
+    if detector is not None and image_paths:
+        print(f"⏱️  Încărcare + încălzire: {(time.perf_counter() - start) * 1000:.0f}ms")
+        images = [read_image(p, detector.imgsz)[0] for p in image_paths]
+        
+        times = []
+        for image in images:
+            t0 = time.perf_counter()
+            detector(image)
+            times.append((time.perf_counter() - t0) * 1000)
+        print(f"   • Primul apel: {times[0]:.1f}ms")
+        print(f"   • Regim staționar (mediană): {statistics.median(times[1:] or times):.1f}ms")
@@ -0,0 +1,317 @@
+"""
+Evaluare offline din predicții salvate
+Predicțiile brute pe valid/ sau test/ sunt calculate o singură dată (conf 0.001) și salvate;
+mAP, curbele PR, matricea de confuzie și căutarea pragurilor per clasă rulează apoi doar cu NumPy
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from cascade_triage import read_boxes
+from prediction_cache import weights_fingerprint
+from test_model import (CLASS_THRESHOLDS_PATH, DEFAULT_CONF, IMAGE_EXTENSIONS, MUSHROOM_TYPES,
+                        resolve_backend)
+
+EVAL_DIR = Path("runs/eval")
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+NUM_CLASSES = len(MUSHROOM_TYPES)
+DEATH_CAP = 1
+
+def pairwise_iou(boxes_a, boxes_b):
+    """Matricea IoU (N, M) între două seturi de casete xyxy"""
+    tl = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    br = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(2)
+    area_a = (boxes_a[:, 2:] - boxes_a[:, :2]).prod(1)
+    area_b = (boxes_b[:, 2:] - boxes_b[:, :2]).prod(1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+def _match(iou, threshold):
+    """Perechi unice (gt, predicție) cu IoU >= prag, cele mai bune primele (ca în Ultralytics)"""
+    gt_idx, pred_idx = np.nonzero(iou >= threshold)
+    if len(gt_idx) == 0:
+        return gt_idx, pred_idx
+    order = iou[gt_idx, pred_idx].argsort()[::-1]
+    gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+    _, first = np.unique(pred_idx, return_index=True)
+    gt_idx, pred_idx = gt_idx[first], pred_idx[first]
+    _, first = np.unique(gt_idx, return_index=True)
+    return gt_idx[first], pred_idx[first]
+
+def match_predictions(pred_boxes, pred_cls, gt_boxes, gt_cls):
+    """True positive (N, 10) pentru fiecare predicție la pragurile IoU 0.5:0.95"""
+    tp = np.zeros((len(pred_boxes), len(IOU_THRESHOLDS)), bool)
+    if len(pred_boxes) == 0 or len(gt_boxes) == 0:
+        return tp
+    iou = pairwise_iou(gt_boxes, pred_boxes) * (gt_cls[:, None] == pred_cls[None, :])
+    for k, threshold in enumerate(IOU_THRESHOLDS):
+        _, pred_idx = _match(iou, threshold)
+        tp[pred_idx, k] = True
+    return tp
+
+def collect_predictions(split='valid', backend='pytorch', imgsz=480, batch_size=8, refresh=False):
+    """Predicțiile brute pe un split, calculate o singură dată per model și salvate în .npz"""
+    model_path, device = resolve_backend(backend)
+    if model_path is None:
+        return None
+    
+    fingerprint = weights_fingerprint(model_path)
+    cache_path = EVAL_DIR / f"{split}_{backend}_{imgsz}_{fingerprint[:12]}.npz"
+    if cache_path.exists() and not refresh:
+        print(f"⚡ Predicții din cache: {cache_path}")
+        data = dict(np.load(cache_path))
+        data['weights'] = fingerprint
+        return data
+    
+    import cv2
+    from ultralytics import YOLO
+    
+    image_paths = sorted(p for p in Path(split, 'images').iterdir()
+                         if p.suffix.lower() in IMAGE_EXTENSIONS)
+    print(f"🔍 Predicții brute pe {split}/ ({len(image_paths)} imagini, {backend})...")
+    model = YOLO(model_path, task='detect')
+    
+    preds = {'image': [], 'box': [], 'conf': [], 'cls': [], 'tp': []}
+    gts = {'image': [], 'box': [], 'cls': []}
+    for start in range(0, len(image_paths), batch_size):
+        batch_paths = image_paths[start:start + batch_size]
+        images = [cv2.imread(str(p)) for p in batch_paths]
+        # Prag minim și max_det ca la model.val(): curbele PR acoperă toate scorurile
+        results = model.predict(source=images, imgsz=imgsz, conf=0.001, iou=0.7, max_det=300,
+                                device=device, verbose=False)
+        for offset, (img_path, image, result) in enumerate(zip(batch_paths, images, results)):
+            index = start + offset
+            height, width = image.shape[:2]
+            labels = read_boxes(Path(split, 'labels', f"{img_path.stem}.txt"), width, height)
+            gt_box = np.array([b[1:] for b in labels], np.float32).reshape(-1, 4)
+            gt_cls = np.array([b[0] for b in labels], int)
+            
+            boxes = result.boxes
+            pred_box = boxes.xyxy.cpu().numpy().astype(np.float32)
+            pred_cls = boxes.cls.cpu().numpy().astype(int)
+            
+            preds['image'].append(np.full(len(pred_box), index))
+            preds['box'].append(pred_box)
+            preds['conf'].append(boxes.conf.cpu().numpy().astype(np.float32))
+            preds['cls'].append(pred_cls)
+            preds['tp'].append(match_predictions(pred_box, pred_cls, gt_box, gt_cls))
+            gts['image'].append(np.full(len(gt_box), index))
+            gts['box'].append(gt_box)
+            gts['cls'].append(gt_cls)
+    
+    data = {f"pred_{k}": np.concatenate(v) for k, v in preds.items()}
+    data.update({f"gt_{k}": np.concatenate(v) for k, v in gts.items()})
+    data['images'] = np.array([p.name for p in image_paths])
+    
+    EVAL_DIR.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(cache_path, **data)
+    print(f"💾 Predicții salvate în: {cache_path}")
+    data['weights'] = fingerprint
+    return data
+
+def compute_ap(recall, precision):
+    """AP prin interpolare în 101 puncte (ca în Ultralytics/COCO)"""
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    y = np.interp(x, mrec, mpre)
+    return float(np.sum((y[1:] + y[:-1]) / 2 * np.diff(x)))
+
+def class_curves(data, cls):
+    """Scoruri descrescătoare + precizie și recall cumulative (N, 10) pentru o clasă"""
+    mask = data['pred_cls'] == cls
+    order = np.argsort(-data['pred_conf'][mask], kind='stable')
+    conf = data['pred_conf'][mask][order]
+    tp = data['pred_tp'][mask][order].astype(np.float64)
+    n_gt = int((data['gt_cls'] == cls).sum())
+    
+    tp_cum = tp.cumsum(0)
+    predicted = np.arange(1, len(conf) + 1)[:, None]
+    precision = tp_cum / predicted
+    recall = tp_cum / max(n_gt, 1)
+    return conf, precision, recall, n_gt
+
+def evaluate(data):
+    """mAP50, mAP50-95 și AP per clasă"""
+    per_class = {}
+    for cls in range(NUM_CLASSES):
+        conf, precision, recall, n_gt = class_curves(data, cls)
+        if n_gt == 0:
+            continue
+        if len(conf) == 0:
+            ap = np.zeros(len(IOU_THRESHOLDS))
+        else:
+            ap = np.array([compute_ap(recall[:, k], precision[:, k])
+                           for k in range(len(IOU_THRESHOLDS))])
+        per_class[cls] = {'ap50': float(ap[0]), 'ap50_95': float(ap.mean()), 'instances': n_gt}
+    
+    return {
+        'map50': float(np.mean([c['ap50'] for c in per_class.values()])) if per_class else 0.0,
+        'map50_95': float(np.mean([c['ap50_95'] for c in per_class.values()])) if per_class else 0.0,
+        'per_class': per_class,
+    }
+
+def confusion_matrix(data, thresholds, default_conf=DEFAULT_CONF, iou_threshold=0.5):
+    """Matrice (nc+1, nc+1): rânduri = predicție, coloane = adevăr; ultimul index = fundal"""
+    matrix = np.zeros((NUM_CLASSES + 1, NUM_CLASSES + 1), int)
+    class_conf = np.array([thresholds.get(c, default_conf) for c in range(NUM_CLASSES)])
+    keep = data['pred_conf'] >= class_conf[data['pred_cls']]
+    
+    pred_image, pred_box, pred_cls = data['pred_image'][keep], data['pred_box'][keep], data['pred_cls'][keep]
+    n_images = len(data['images'])
+    pred_split = np.searchsorted(pred_image, np.arange(n_images + 1))
+    gt_split = np.searchsorted(data['gt_image'], np.arange(n_images + 1))
+    
+    for i in range(n_images):
+        p0, p1 = pred_split[i], pred_split[i + 1]
+        g0, g1 = gt_split[i], gt_split[i + 1]
+        p_cls, g_cls = pred_cls[p0:p1], data['gt_cls'][g0:g1]
+        gt_idx = pred_idx = np.zeros(0, int)
+        if p1 > p0 and g1 > g0:
+            iou = pairwise_iou(data['gt_box'][g0:g1], pred_box[p0:p1])
+            gt_idx, pred_idx = _match(iou, iou_threshold)
+        np.add.at(matrix, (p_cls[pred_idx], g_cls[gt_idx]), 1)
+        # Ciuperci ratate (coloana clasei, rândul fundal) și detecții false (rândul clasei)
+        np.add.at(matrix, (NUM_CLASSES, np.delete(g_cls, gt_idx)), 1)
+        np.add.at(matrix, (np.delete(p_cls, pred_idx), NUM_CLASSES), 1)
+    return matrix
+
+def sweep_thresholds(data, objectives=None, default_objective=('f1',)):
+    """Pragul per clasă: ('f1',) maximizează F1, ('recall', p_min) maximizează recall cu precizie >= p_min"""
+    objectives = objectives or {}
+    chosen = {}
+    for cls in range(NUM_CLASSES):
+        conf, precision, recall, n_gt = class_curves(data, cls)
+        if n_gt == 0 or len(conf) == 0:
+            continue
+        p, r = precision[:, 0], recall[:, 0]
+        f1 = 2 * p * r / np.maximum(p + r, 1e-9)
+        
+        objective = objectives.get(cls, default_objective)
+        index = int(np.argmax(f1))
+        if objective[0] == 'recall':
+            feasible = np.nonzero(p >= objective[1])[0]
+            if len(feasible):
+                # Recall-ul crește odată cu indexul: ultimul index valid = pragul cel mai permisiv
+                index = int(feasible[-1])
+            else:
+                print(f"   ⚠️  {MUSHROOM_TYPES[cls][0]}: nicio valoare cu precizie >= {objective[1]:.0%}"
+                      " - folosesc F1 maxim")
+        chosen[cls] = {'threshold': float(conf[index]), 'precision': float(p[index]),
+                       'recall': float(r[index]), 'f1': float(f1[index])}
+    return chosen
+
+def metrics_at_thresholds(data, thresholds, default_conf=DEFAULT_CONF):
+    """Precizie și recall per clasă (IoU 0.5) pentru un set de praguri"""
+    metrics = {}
+    for cls in range(NUM_CLASSES):
+        n_gt = int((data['gt_cls'] == cls).sum())
+        mask = (data['pred_cls'] == cls) & (data['pred_conf'] >= thresholds.get(cls, default_conf))
+        tp = int(data['pred_tp'][mask, 0].sum())
+        metrics[cls] = {'precision': tp / max(int(mask.sum()), 1), 'recall': tp / max(n_gt, 1)}
+    return metrics
+
+def save_pr_curves(data, out_dir=EVAL_DIR):
+    """Curbele PR (IoU 0.5) per clasă: .npz și, dacă matplotlib există, un PNG"""
+    curves = {}
+    for cls in range(NUM_CLASSES):
+        conf, precision, recall, _ = class_curves(data, cls)
+        curves[f"conf_{cls}"] = conf
+        curves[f"precision_{cls}"] = precision[:, 0]
+        curves[f"recall_{cls}"] = recall[:, 0]
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(Path(out_dir) / "pr_curves.npz", **curves)
+    
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return
+    fig, ax = plt.subplots(figsize=(6, 5))
+    for cls in range(NUM_CLASSES):
+        ax.plot(curves[f"recall_{cls}"], curves[f"precision_{cls}"], label=MUSHROOM_TYPES[cls][0])
+    ax.set_xlabel("Recall")
+    ax.set_ylabel("Precision")
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1.05)
+    ax.legend()
+    fig.savefig(Path(out_dir) / "pr_curves.png", dpi=120)
+    plt.close(fig)
+
+def save_class_thresholds(chosen, weights, objectives, path=CLASS_THRESHOLDS_PATH):
+    """Scrie pragurile per clasă citite de test_model.load_class_thresholds()"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'weights': weights,
+                   'thresholds': {str(cls): c['threshold'] for cls, c in chosen.items()},
+                   'objectives': {str(cls): list(o) for cls, o in objectives.items()}}, f, indent=2)
+
+def run_evaluation(tune_split='valid', report_split='test', backend='pytorch', imgsz=480,
+                   death_cap_precision=0.5, apply=False, refresh=False):
+    """Predicții o dată, apoi mAP, PR, confuzie și praguri per clasă alese pe tune_split"""
+    tune = collect_predictions(tune_split, backend, imgsz, refresh=refresh)
+    if tune is None:
+        return None
+    
+    metrics = evaluate(tune)
+    print(f"\n📊 {tune_split}/: mAP50 {metrics['map50']:.3f}, mAP50-95 {metrics['map50_95']:.3f}")
+    for cls, c in metrics['per_class'].items():
+        print(f"   • {MUSHROOM_TYPES[cls][0]}: AP50 {c['ap50']:.3f}, AP50-95 {c['ap50_95']:.3f} "
+              f"({c['instances']} instanțe)")
+    
+    # Death-cap: recall maxim cu o precizie minimă; celelalte clase: F1 maxim
+    objectives = {DEATH_CAP: ('recall', death_cap_precision)}
+    start = time.perf_counter()
+    chosen = sweep_thresholds(tune, objectives)
+    sweep_ms = (time.perf_counter() - start) * 1000
+    
+    print(f"\n🎚️  Praguri per clasă (căutare în {sweep_ms:.1f}ms):")
+    for cls, c in chosen.items():
+        print(f"   • {MUSHROOM_TYPES[cls][0]}: conf >= {c['threshold']:.3f} → "
+              f"precizie {c['precision']:.2f}, recall {c['recall']:.2f}")
+    thresholds = {cls: c['threshold'] for cls, c in chosen.items()}
+    
+    print("\n🧮 Matrice de confuzie (rânduri = predicție, coloane = adevăr, ultimul = fundal):")
+    for row in confusion_matrix(tune, thresholds):
+        print("   " + " ".join(f"{v:5d}" for v in row))
+    save_pr_curves(tune)
+    
+    report = {'tune': metrics, 'thresholds': chosen}
+    if report_split:
+        held_out = collect_predictions(report_split, backend, imgsz, refresh=refresh)
+        if held_out is not None:
+            fixed = metrics_at_thresholds(held_out, {})
+            tuned = metrics_at_thresholds(held_out, thresholds)
+            print(f"\n📋 {report_split}/: conf fix 0.25 vs praguri per clasă")
+            for cls in range(NUM_CLASSES):
+                print(f"   • {MUSHROOM_TYPES[cls][0]}: "
+                      f"P {fixed[cls]['precision']:.2f} → {tuned[cls]['precision']:.2f}, "
+                      f"R {fixed[cls]['recall']:.2f} → {tuned[cls]['recall']:.2f}")
+            report['report'] = {'map': evaluate(held_out), 'fixed': fixed, 'tuned': tuned}
+    
+    if apply:
+        save_class_thresholds(chosen, tune['weights'], objectives)
+        print(f"\n✅ Praguri salvate în: {CLASS_THRESHOLDS_PATH} (folosite de test_model.py)")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluare offline din predicții salvate")
+    parser.add_argument('--tune-split', default='valid')
+    parser.add_argument('--report-split', default='test')
+    parser.add_argument('--backend', default='pytorch')
+    parser.add_argument('--imgsz', type=int, default=480)
+    parser.add_argument('--death-cap-precision', type=float, default=0.5,
+                        help="Precizia minimă la care se maximizează recall-ul death-cap")
+    parser.add_argument('--apply', action='store_true',
+                        help="Salvează pragurile pentru calea de predicție")
+    parser.add_argument('--refresh', action='store_true', help="Recalculează predicțiile")
+    args = parser.parse_args()
+    
+    run_evaluation(args.tune_split, args.report_split, args.backend, args.imgsz,
+                   args.death_cap_precision, args.apply, args.refresh)
@@ -3,6 +3,7 @@ Pre-Training Setup Check pentru RTX 4050
 Acest script verifică toate cerințele înainte de training
 """
 
+import importlib.util
 import sys
 import subprocess
 import os
@@ -22,33 +23,36 @@ def check_python_version():
         return False
 
 def check_gpu_cuda():
-    """Verifică GPU și CUDA"""
+    """Verifică GPU și CUDA (prin nvidia-smi - fără a importa torch)"""
     print("\n🖥️  Verificare GPU și CUDA...")
     
-    try:
-        import torch
-        cuda_available = torch.cuda.is_available()
-        
-        if cuda_available:
-            gpu_name = torch.cuda.get_device_name(0)
-            gpu_memory = torch.cuda.get_device_properties(0).total_memory / 1024**3
-            print(f"   ✅ CUDA detectat!")
-            print(f"   📱 GPU: {gpu_name}")
-            print(f"   💾 VRAM: {gpu_memory:.1f}GB")
-            
-            if "4050" in gpu_name or gpu_memory >= 6.0:
-                print("   ✅ GPU potrivit pentru training!")
-                return True
-            else:
-                print(f"   ⚠️  GPU poate fi prea slab (VRAM < 6GB)")
-                return True  # Poate să meargă oricum
-        else:
-            print("   ❌ CUDA nu este disponibil!")
-            return False
-            
-    except ImportError:
+    if importlib.util.find_spec('torch') is None:
         print("   ❌ PyTorch nu este instalat!")
         return False
+    
+    try:
+        output = subprocess.run(
+            ['nvidia-smi', '--query-gpu=name,memory.total', '--format=csv,noheader,nounits'],
+            capture_output=True, text=True, timeout=5, check=True).stdout.strip()
+    except (FileNotFoundError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+        print("   ❌ CUDA nu este disponibil!")
+        return False
+    
+    if not output:
+        print("   ❌ CUDA nu este disponibil!")
+        return False
+    
+    gpu_name, memory_mb = [part.strip() for part in output.splitlines()[0].split(',')]
+    gpu_memory = float(memory_mb) / 1024
+    print(f"   ✅ CUDA detectat!")
+    print(f"   📱 GPU: {gpu_name}")
+    print(f"   💾 VRAM: {gpu_memory:.1f}GB")
+    
+    if "4050" in gpu_name or gpu_memory >= 6.0:
+        print("   ✅ GPU potrivit pentru training!")
+    else:
+        print(f"   ⚠️  GPU poate fi prea slab (VRAM < 6GB)")
+    return True  # Poate să meargă oricum
 
 def check_dependencies():
     """Verifică dependințele necesare"""
@@ -67,18 +71,13 @@ def check_dependencies():
     
     missing_packages = []
     
+    # find_spec găsește pachetul fără să-l importe (torch/ultralytics durează secunde)
+    import_names = {'opencv-python': 'cv2', 'pillow': 'PIL', 'pyyaml': 'yaml'}
     for package in required_packages:
-        try:
-            if package == 'opencv-python':
-                import cv2
-                print(f"   ✅ {package} (cv2)")
-            elif package == 'pillow':
-                import PIL
-                print(f"   ✅ {package} (PIL)")
-            else:
-                __import__(package)
-                print(f"   ✅ {package}")
-        except ImportError:
+        module = import_names.get(package, package)
+        if importlib.util.find_spec(module) is not None:
+            print(f"   ✅ {package}" + (f" ({module})" if module != package else ""))
+        else:
             print(f"   ❌ {package} - LIPSEȘTE!")
             missing_packages.append(package)
     
@@ -90,7 +89,7 @@ def check_dependencies():
         print("   ✅ Toate dependințele sunt instalate!")
         return True
 
-def check_dataset():
+def check_dataset(deep=True):
     """Verifică integritatea dataset-ului"""
     print("\n📊 Verificare dataset...")
     
@@ -108,17 +107,33 @@ def check_dataset():
     # Verifică data.yaml
     if os.path.exists('data.yaml'):
         print("   ✅ data.yaml: Prezent")
-        with open('data.yaml', 'r') as f:
-            content = f.read()
-            if 'chanterelle' in content and 'death-cap' in content and 'field-mushroom' in content:
+        try:
+            import yaml
+            with open('data.yaml', 'r') as f:
+                data = yaml.safe_load(f)
+            names = data.get('names', [])
+            if names == ['chanterelle', 'death-cap', 'field-mushroom'] and data.get('nc') == len(names):
                 print("   ✅ Clasele sunt definite corect")
             else:
                 print("   ⚠️  Verificați clasele în data.yaml")
+        except ImportError:
+            print("   ❓ pyyaml lipsește - nu pot citi clasele din data.yaml")
     else:
         print("   ❌ data.yaml: LIPSEȘTE!")
         return False
     
-    return True
+    if not deep:
+        return True
+    
+    # Validare completă: decodare imagini, etichete, duplicate între split-uri
+    try:
+        from dataset_validator import validate_dataset
+    except ImportError as e:
+        print(f"   ❓ Validare completă indisponibilă ({e.name} lipsește)")
+        return True
+    
+    summary = validate_dataset()
+    return not summary['errors']
 
 def check_disk_space():
     """Verifică spațiul pe disk"""
@@ -139,13 +154,25 @@ def check_disk_space():
         print("   ❓ Nu pot verifica spațiul pe disk")
         return True
 
-def estimate_training_time():
-    """Estimează timpul de training"""
-    print("\n⏱️  Estimare timp training pentru RTX 4050...")
-    print("   📊 100 epoci cu batch size 4:")
-    print("   ⏰ Timp estimat: 6-8 ore")
+def estimate_training_time(epochs=100):
+    """Estimează timpul de training din ultimul benchmark măsurat"""
+    from benchmark import latest_training_throughput
+    
+    measured = latest_training_throughput()
+    if measured is None:
+        print("\n⏱️  Estimare timp training...")
+        print("   ❓ Nu există măsurători - rulați: python benchmark.py --train")
+        return None
+    
+    train_images = len(list(Path('train/images').glob('*')))
+    hours = epochs * train_images / measured['images_per_sec'] / 3600
+    
+    print(f"\n⏱️  Estimare timp training (măsurat pe {measured['device']}):")
+    print(f"   📊 {epochs} epoci cu batch size {measured['batch']}, imgsz {measured['imgsz']}:")
+    print(f"   🚀 Throughput măsurat: {measured['images_per_sec']:.1f} imagini/sec")
+    print(f"   ⏰ Timp estimat: {hours:.1f} ore (fără validare)")
     print("   🔄 Early stopping: se poate opri mai devreme")
-    print("   💡 Recomandare: rulați peste noapte")
+    return hours
 
 def generate_install_commands():
     """Generează comenzile de instalare"""
@@ -161,8 +188,8 @@ def generate_install_commands():
     print("python -c \"import torch; print(f'CUDA: {torch.cuda.is_available()}')\"")
     print("=" * 50)
 
-def main():
-    """Funcția principală de verificare"""
+def main(deep=True):
+    """Funcția principală de verificare (deep=False sare validarea completă a imaginilor)"""
     print("🍄 PRE-TRAINING SETUP CHECK pentru Mushroom Detection")
     print("🎯 Optimizat pentru RTX 4050 (6GB VRAM)")
     print("=" * 60)
@@ -171,7 +198,7 @@ def main():
         ("Python Version", check_python_version),
         ("GPU & CUDA", check_gpu_cuda), 
         ("Dependencies", check_dependencies),
-        ("Dataset", check_dataset),
+        ("Dataset", lambda: check_dataset(deep)),
         ("Disk Space", check_disk_space)
     ]
     
@@ -206,6 +233,8 @@ def main():
     print("   python train_mushroom_model.py")
     print("\n🧪 Pentru testare după training:")
     print("   python test_model.py")
+    
+    return all_passed
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+Cache pe disc pentru predicții, adresat după conținut
+Cheia: hash-ul imaginii + hash-ul best.pt + conf + imgsz
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = "runs/cache/predictions.sqlite"
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hash SHA-256 al unui fișier, citit pe bucăți"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def weights_fingerprint(path):
+    """Hash-ul greutăților; pentru exporturi-director (OpenVINO) combină toate fișierele"""
+    path = Path(path)
+    if path.is_file():
+        return file_sha256(path)
+    
+    digest = hashlib.sha256()
+    for file in sorted(p for p in path.rglob('*') if p.is_file()):
+        digest.update(file.relative_to(path).as_posix().encode())
+        digest.update(file_sha256(file).encode())
+    return digest.hexdigest()
+
+class PredictionCache:
+    """Cache LRU (SQLite) pentru detecții; se invalidează automat când se schimbă greutățile"""
+    
+    def __init__(self, weights_path, cache_path=DEFAULT_CACHE_PATH, max_bytes=64 * 1024**2):
+        self.max_bytes = max_bytes
+        self.weights_hash = weights_fingerprint(weights_path)
+        
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(cache_path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS predictions (
+                key TEXT PRIMARY KEY,
+                weights_hash TEXT NOT NULL,
+                detections TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_last_access ON predictions(last_access);
+            CREATE TABLE IF NOT EXISTS stats (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        
+        # Greutăți noi => intrările vechi nu mai sunt valide
+        removed = self.db.execute(
+            "DELETE FROM predictions WHERE weights_hash != ?", (self.weights_hash,)
+        ).rowcount
+        if removed:
+            self.db.execute("DELETE FROM stats")
+            print(f"🔄 Cache invalidat: {removed} intrări pentru alte greutăți")
+        self.db.commit()
+    
+    def make_key(self, image_path, conf, imgsz):
+        """Cheia de cache pentru o imagine și parametrii de predicție"""
+        return hashlib.sha256(
+            f"{file_sha256(image_path)}:{self.weights_hash}:{conf:.4f}:{imgsz}".encode()
+        ).hexdigest()
+    
+    def get(self, key):
+        """Returnează detecțiile salvate sau None; actualizează ordinea LRU"""
+        row = self.db.execute(
+            "SELECT detections FROM predictions WHERE key = ?", (key,)
+        ).fetchone()
+        
+        self._increment('hits' if row else 'misses')
+        if row is None:
+            self.db.commit()
+            return None
+        
+        self.db.execute(
+            "UPDATE predictions SET last_access = ? WHERE key = ?", (time.time(), key)
+        )
+        self.db.commit()
+        return json.loads(row[0])
+    
+    def put(self, key, detections):
+        """Salvează detecțiile și elimină cele mai vechi intrări peste limita de mărime"""
+        payload = json.dumps(detections, ensure_ascii=False)
+        self.db.execute(
+            "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+            (key, self.weights_hash, payload, len(payload.encode('utf-8')), time.time())
+        )
+        self._evict()
+        self.db.commit()
+    
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM predictions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        
+        rows = self.db.execute(
+            "SELECT key, size FROM predictions ORDER BY last_access ASC"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        
+        self.db.executemany("DELETE FROM predictions WHERE key = ?", evicted)
+        self._increment('evictions', len(evicted))
+    
+    def _increment(self, name, amount=1):
+        self.db.execute(
+            "INSERT INTO stats VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+    
+    def stats(self):
+        """Hit rate, număr de intrări și mărimea cache-ului"""
+        counters = dict(self.db.execute("SELECT name, value FROM stats").fetchall())
+        entries, size = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM predictions"
+        ).fetchone()
+        
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'evictions': counters.get('evictions', 0),
+            'entries': entries,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes,
+        }
+    
+    def close(self):
+        self.db.close()
+
+def cached_predict(model, cache, image_path, conf=0.25, imgsz=480, predict=None, **predict_kwargs):
+    """Rulează model.predict (sau predict(), dacă e dat) doar la cache miss; returnează (detecții, hit)"""
+    from test_model import describe_detections
+    
+    key = cache.make_key(image_path, conf, imgsz)
+    detections = cache.get(key)
+    if detections is not None:
+        return detections, True
+    
+    if predict is not None:
+        detections = predict()
+    else:
+        results = model.predict(source=str(image_path), conf=conf, imgsz=imgsz, **predict_kwargs)
+        detections = [det for result in results for det in describe_detections(result)]
+    cache.put(key, detections)
+    return detections, False
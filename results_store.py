@@ -0,0 +1,184 @@
+"""
+Stocare structurată a predicțiilor (SQLite) și scriere asincronă a imaginilor adnotate
+Fiecare rulare păstrează versiunea modelului; detecțiile pot fi interogate ulterior
+(ex. toate death-cap peste 0.5), iar randarea JPEG nu mai blochează inferența
+"""
+
+import argparse
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from prediction_cache import file_sha256, weights_fingerprint
+from test_model import MUSHROOM_TYPES, UNKNOWN_TYPE
+
+CLASS_IDS = {'chanterelle': 0, 'death-cap': 1, 'field-mushroom': 2}
+
+DEFAULT_RESULTS_PATH = "runs/results/results.sqlite"
+ANNOTATED_DIR = "runs/results/annotated"
+
+class ResultsStore:
+    """Rulări, imagini și detecții într-o bază SQLite interogabilă"""
+    
+    def __init__(self, path=DEFAULT_RESULTS_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        # WAL: scrierile nu blochează cititorii (interogări în timpul unei rulări)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                started REAL NOT NULL,
+                model_path TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                backend TEXT NOT NULL,
+                conf REAL NOT NULL,
+                imgsz INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS images (
+                id INTEGER PRIMARY KEY,
+                run_id INTEGER NOT NULL REFERENCES runs(id),
+                path TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                created REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS detections (
+                image_id INTEGER NOT NULL REFERENCES images(id),
+                class_id INTEGER NOT NULL,
+                confidence REAL NOT NULL,
+                x1 REAL NOT NULL,
+                y1 REAL NOT NULL,
+                x2 REAL NOT NULL,
+                y2 REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_images_sha ON images(sha256);
+            CREATE INDEX IF NOT EXISTS idx_detections_class ON detections(class_id, confidence);
+            CREATE INDEX IF NOT EXISTS idx_detections_image ON detections(image_id);
+        """)
+        self.db.commit()
+    
+    def start_run(self, model_path, backend='pytorch', conf=0.25, imgsz=480):
+        """Înregistrează o rulare; versiunea modelului = hash-ul greutăților"""
+        cursor = self.db.execute(
+            "INSERT INTO runs (started, model_path, model_version, backend, conf, imgsz) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (time.time(), str(model_path), weights_fingerprint(model_path)[:16], backend, conf, imgsz))
+        self.db.commit()
+        return cursor.lastrowid
+    
+    def add(self, run_id, image_path, detections, image_hash=None):
+        """Salvează detecțiile unei imagini"""
+        cursor = self.db.execute(
+            "INSERT INTO images (run_id, path, sha256, created) VALUES (?, ?, ?, ?)",
+            (run_id, str(image_path), image_hash or file_sha256(image_path), time.time()))
+        self.db.executemany(
+            "INSERT INTO detections VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(cursor.lastrowid, det['class_id'], det['confidence'], *det['box'])
+             for det in detections])
+        self.db.commit()
+        return cursor.lastrowid
+    
+    def query(self, class_id=None, min_conf=0.0, model_version=None, run_id=None, limit=None):
+        """Detecțiile care corespund filtrelor, cele mai sigure primele"""
+        sql = ("SELECT i.path, i.sha256, r.model_version, r.id, d.class_id, d.confidence, "
+               "d.x1, d.y1, d.x2, d.y2 FROM detections d "
+               "JOIN images i ON i.id = d.image_id JOIN runs r ON r.id = i.run_id "
+               "WHERE d.confidence >= ?")
+        params = [min_conf]
+        for column, value in (('d.class_id', class_id), ('r.model_version', model_version),
+                              ('r.id', run_id)):
+            if value is not None:
+                sql += f" AND {column} = ?"
+                params.append(value)
+        sql += " ORDER BY d.confidence DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        columns = ('path', 'sha256', 'model_version', 'run_id', 'class_id', 'confidence')
+        return [dict(zip(columns, row[:6]), box=list(row[6:]))
+                for row in self.db.execute(sql, params)]
+    
+    def summary(self, run_id):
+        """Numărul de imagini și de detecții per clasă pentru o rulare"""
+        images = self.db.execute("SELECT COUNT(*) FROM images WHERE run_id = ?",
+                                 (run_id,)).fetchone()[0]
+        counts = dict(self.db.execute(
+            "SELECT d.class_id, COUNT(*) FROM detections d JOIN images i ON i.id = d.image_id "
+            "WHERE i.run_id = ? GROUP BY d.class_id", (run_id,)).fetchall())
+        return {'images': images, 'counts': counts}
+    
+    def close(self):
+        self.db.close()
+
+class AnnotationWriter:
+    """Randează și scrie imaginile adnotate pe un thread de fundal, cu o coadă limitată"""
+    
+    def __init__(self, out_dir=ANNOTATED_DIR, max_queue=16, block=False):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.block = block
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+    
+    def submit(self, image_path, detections, image=None):
+        """Pune o imagine în coadă; la coadă plină o aruncă (implicit), inferența nu așteaptă"""
+        try:
+            self.jobs.put((image_path, detections, image), block=self.block)
+        except queue.Full:
+            self.dropped += 1
+    
+    def _loop(self):
+        import cv2
+        
+        from video_stream import draw_detections
+        
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            image_path, detections, image = job
+            if image is None:
+                image = cv2.imread(str(image_path))
+            else:
+                image = image.copy()
+            if image is not None:
+                cv2.imwrite(str(self.out_dir / f"{Path(image_path).stem}.jpg"),
+                            draw_detections(image, detections))
+                self.written += 1
+    
+    def close(self):
+        """Așteaptă scrierea imaginilor rămase în coadă"""
+        self.jobs.put(None)
+        self.thread.join()
+        return {'written': self.written, 'dropped': self.dropped}
+
+def print_rows(rows):
+    """Afișează rezultatul unei interogări"""
+    print(f"🔎 {len(rows)} detecții")
+    for row in rows:
+        name, _, emoji = MUSHROOM_TYPES.get(row['class_id'], UNKNOWN_TYPE)
+        print(f"   {emoji} {name} {row['confidence']:.0%}  {row['path']}  "
+              f"(model {row['model_version']}, rulare {row['run_id']})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interogare rezultate salvate")
+    parser.add_argument('--class', dest='class_name', choices=list(CLASS_IDS))
+    parser.add_argument('--min-conf', type=float, default=0.0)
+    parser.add_argument('--model-version')
+    parser.add_argument('--run', type=int)
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+    
+    store = ResultsStore()
+    rows = store.query(CLASS_IDS.get(args.class_name), args.min_conf, args.model_version,
+                       args.run, args.limit)
+    store.close()
+    
+    print_rows(rows)
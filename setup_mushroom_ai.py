@@ -6,6 +6,7 @@ Instalare automată a dependințelor și antrenare model
 import subprocess
 import sys
 import os
+import urllib.error
 from pathlib import Path
 
 def run_command(command, description):
@@ -105,15 +106,31 @@ def main():
     
     elif choice == "3":
         print("🧪 Test rapid...")
-        if os.path.exists("test_model.py"):
-            # Verifică dacă există model antrenat
-            model_path = Path("runs/detect/mushroom_detector_rtx4050/weights/best.pt")
-            if model_path.exists():
-                run_command("python test_model.py --auto", "Test pe imagini")
+        from inference_client import DEFAULT_SERVER_URL, identify, server_is_running
+        use_server = server_is_running(DEFAULT_SERVER_URL)
+        if use_server:
+            # Serverul are deja modelul încărcat - fără cold start
+            print(f"⚡ Folosesc serverul de inferență: {DEFAULT_SERVER_URL}")
+            try:
+                for img_path in sorted(Path("test/images").glob("*.jpg"))[:5]:
+                    detections = identify(img_path, DEFAULT_SERVER_URL)
+                    print(f"\n📸 {img_path.name}: {len(detections)} ciuperci")
+                    for det in detections:
+                        print(f"   {det['emoji']} {det['name']} - {det['safety']} ({det['confidence']:.2%})")
+            except (urllib.error.URLError, OSError) as e:
+                # HTTPError (4xx/5xx) este tot un URLError; serverul oprit între timp dă URLError
+                print(f"⚠️  Serverul de inferență nu a răspuns ({e}) - testez local")
+                use_server = False
+        if not use_server:
+            if os.path.exists("test_model.py"):
+                # Verifică dacă există model antrenat
+                model_path = Path("runs/detect/mushroom_detector_rtx4050/weights/best.pt")
+                if model_path.exists():
+                    run_command("python mushroom_cli.py predict --auto", "Test pe imagini")
+                else:
+                    print("❌ Nu există model antrenat. Rulează întâi training.")
             else:
-                print("❌ Nu există model antrenat. Rulează întâi training.")
-        else:
-            print("❌ test_model.py nu a fost găsit")
+                print("❌ test_model.py nu a fost găsit")
     
     print("\n🎉 Setup finalizat!")
     print("\n📖 Pentru mai multe informații:")
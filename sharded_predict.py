@@ -0,0 +1,214 @@
+"""
+Predicție pe shard-uri pentru arhive mari de fotografii
+Directorul de intrare este împărțit între N procese; fiecare încarcă modelul o singură dată,
+își fixează numărul de thread-uri torch și scrie rezultatele în propriul fișier de shard.
+Manifestul imaginilor terminate permite reluarea unei rulări întrerupte
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from prediction_cache import weights_fingerprint
+from test_model import IMAGE_EXTENSIONS, load_class_thresholds, resolve_backend
+
+SHARDED_DIR = Path("runs/sharded")
+
+def list_images(source_dir):
+    return sorted(str(p) for p in Path(source_dir).rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+def read_completed(run_dir):
+    """Imaginile deja terminate, din manifestele tuturor shard-urilor"""
+    completed = set()
+    for manifest in Path(run_dir).glob("done_*.txt"):
+        with open(manifest) as f:
+            # O linie incompletă (proces oprit în timpul scrierii) nu se termină cu \n
+            completed.update(line[:-1] for line in f if line.endswith("\n"))
+    return completed
+
+def load_results(run_dir):
+    """Toate rezultatele unei rulări: {cale imagine: detecții}"""
+    results = {}
+    for shard in sorted(Path(run_dir).glob("shard_*.jsonl")):
+        with open(shard) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                results[record['path']] = record.get('detections')  # None = imagine nedecodabilă
+    return results
+
+def _predict_shard(shard_id, image_paths, run_dir, model_path, device, threads, batch_size,
+                   conf, imgsz, thresholds):
+    """Worker: încarcă modelul o dată și procesează imaginile shard-ului în batch-uri"""
+    # Thread-urile se fixează înainte de import: fiecare worker folosește doar nucleele lui
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    import cv2
+    import torch
+    from ultralytics import YOLO
+    
+    from test_model import describe_detections, filter_detections
+    
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(1)
+    model = YOLO(model_path, task='detect')
+    # NMS cu cel mai mic prag; pragurile per clasă (thresholds.json) se aplică după
+    predict_conf = min([conf, *thresholds.values()])
+    
+    results_path = Path(run_dir) / f"shard_{shard_id:02d}.jsonl"
+    manifest_path = Path(run_dir) / f"done_{shard_id:02d}.txt"
+    processed = failed = 0
+    start = time.perf_counter()
+    
+    with open(results_path, 'a') as results_file, open(manifest_path, 'a') as manifest:
+        for i in range(0, len(image_paths), batch_size):
+            paths, images = [], []
+            for path in image_paths[i:i + batch_size]:
+                image = cv2.imread(path)
+                if image is None:
+                    failed += 1
+                    results_file.write(json.dumps({'path': path, 'error': 'decode'}) + "\n")
+                    manifest.write(path + "\n")
+                    continue
+                paths.append(path)
+                images.append(image)
+            if not images:
+                continue
+            
+            predictions = model.predict(source=images, imgsz=imgsz, conf=predict_conf,
+                                        device=device, verbose=False)
+            for path, result in zip(paths, predictions):
+                detections = filter_detections(describe_detections(result), thresholds, default=conf)
+                results_file.write(json.dumps({'path': path, 'detections': detections}) + "\n")
+            # Rezultatele ajung pe disc înainte ca imaginile să fie marcate terminate
+            results_file.flush()
+            os.fsync(results_file.fileno())
+            manifest.write("".join(path + "\n" for path in paths))
+            manifest.flush()
+            processed += len(paths)
+    
+    return {'shard': shard_id, 'processed': processed, 'failed': failed,
+            'seconds': time.perf_counter() - start}
+
+def sharded_predict(source_dir, workers=None, threads_per_worker=1, batch_size=8, conf=0.25,
+                    imgsz=480, backend='pytorch', device=None, run_name=None, limit=None,
+                    restart=False):
+    """Predicție paralelă pe shard-uri, reluabilă; returnează statisticile rulării"""
+    
+    model_path, backend_device = resolve_backend(backend)
+    if model_path is None:
+        return None
+    # Implicit device-ul backend-ului (GPU dacă există), ca la celelalte puncte de predicție
+    device = backend_device if device is None else device
+    
+    thresholds = load_class_thresholds(model_path)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    run_dir = SHARDED_DIR / (run_name or Path(source_dir).resolve().name)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Manifestul rulării: o reluare e validă doar cu același model și aceiași parametri
+    config = {'source_dir': str(Path(source_dir).resolve()), 'weights': weights_fingerprint(model_path),
+              'conf': conf, 'imgsz': imgsz,
+              'thresholds': {str(cls): value for cls, value in sorted(thresholds.items())}}
+    config_path = run_dir / "manifest.json"
+    if config_path.exists() and not restart:
+        with open(config_path) as f:
+            previous = json.load(f)
+        if previous != config:
+            print(f"❌ Rularea din {run_dir} a folosit alt model sau alți parametri")
+            print("💡 Folosiți --restart sau alt --name")
+            return None
+    if restart:
+        for old in list(run_dir.glob("shard_*.jsonl")) + list(run_dir.glob("done_*.txt")):
+            old.unlink()
+    with open(config_path, 'w') as f:
+        json.dump(config, f, indent=2)
+    
+    images = list_images(source_dir)[:limit]
+    completed = read_completed(run_dir)
+    pending = [path for path in images if path not in completed]
+    
+    print(f"🗂️  {len(images)} imagini în {source_dir}: {len(images) - len(pending)} deja terminate, "
+          f"{len(pending)} de procesat")
+    if not pending:
+        print(f"✅ Nimic de făcut - rezultatele sunt în: {run_dir}")
+        return {'images': len(images), 'processed': 0, 'images_per_sec': 0.0}
+    
+    workers = min(workers, len(pending))
+    print(f"🚀 {workers} procese × {threads_per_worker} thread-uri torch, batch {batch_size}")
+    
+    # Împărțire round-robin: shard-urile au dimensiuni egale și imagini amestecate
+    shards = [pending[k::workers] for k in range(workers)]
+    # Numerotarea shard-urilor continuă după cele existente: fișierele vechi nu se suprascriu
+    first_shard = len(list(run_dir.glob("done_*.txt")))
+    
+    start = time.perf_counter()
+    stats = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(_predict_shard, first_shard + k, shard, str(run_dir), model_path,
+                               device, threads_per_worker, batch_size, conf, imgsz, thresholds)
+                   for k, shard in enumerate(shards)]
+        for future in as_completed(futures):
+            shard_stats = future.result()
+            stats.append(shard_stats)
+            print(f"   • shard {shard_stats['shard']}: {shard_stats['processed']} imagini "
+                  f"în {shard_stats['seconds']:.1f}s")
+    elapsed = time.perf_counter() - start
+    
+    processed = sum(s['processed'] for s in stats)
+    failed = sum(s['failed'] for s in stats)
+    throughput = processed / elapsed if elapsed > 0 else 0.0
+    print(f"\n📊 {processed} imagini în {elapsed:.1f}s ({throughput:.1f} imagini/sec)")
+    if failed:
+        print(f"   ⚠️  {failed} imagini nu au putut fi decodate")
+    print(f"📁 Rezultate: {run_dir}/shard_*.jsonl")
+    
+    return {'images': len(images), 'processed': processed, 'failed': failed,
+            'workers': workers, 'elapsed': elapsed, 'images_per_sec': throughput}
+
+def measure_scaling(source_dir="test/images", worker_counts=(1, 2, 4), limit=64, **kwargs):
+    """Throughput pentru diferite numere de procese și eficiența față de scalarea liniară"""
+    rows = []
+    for workers in worker_counts:
+        stats = sharded_predict(source_dir, workers=workers, limit=limit, restart=True,
+                                run_name=f"scaling_w{workers}", **kwargs)
+        if stats is None:
+            return None
+        rows.append((workers, stats['images_per_sec']))
+    
+    base = rows[0][1] / rows[0][0]
+    print("\n📈 Scalare cu numărul de procese:")
+    for workers, throughput in rows:
+        print(f"   • {workers} procese: {throughput:6.1f} imagini/sec "
+              f"(eficiență {throughput / (base * workers):.0%})")
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predicție paralelă pe shard-uri, reluabilă")
+    parser.add_argument('source_dir', nargs='?', default="test/images")
+    parser.add_argument('--workers', type=int, help="Implicit: nuclee / thread-uri per worker")
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--imgsz', type=int, default=480)
+    parser.add_argument('--backend', default='pytorch')
+    parser.add_argument('--device', help="Implicit: GPU 0 dacă există, altfel cpu")
+    parser.add_argument('--name', help="Numele rulării (implicit: numele directorului)")
+    parser.add_argument('--restart', action='store_true', help="Ignoră progresul existent")
+    parser.add_argument('--scaling', nargs='+', type=int,
+                        help="Măsoară scalarea pentru aceste numere de procese")
+    args = parser.parse_args()
+    
+    common = dict(threads_per_worker=args.threads_per_worker, batch_size=args.batch_size,
+                  conf=args.conf, imgsz=args.imgsz, backend=args.backend, device=args.device)
+    if args.scaling:
+        measure_scaling(args.source_dir, args.scaling, **common)
+    else:
+        sharded_predict(args.source_dir, args.workers, run_name=args.name, restart=args.restart,
+                        **common)
@@ -0,0 +1,172 @@
+"""
+Inferență pe felii (tiles) pentru fotografii de telefon de rezoluție mare
+Imaginea este tăiată în felii suprapuse, rulate într-un singur batch, iar casetele
+sunt unite per clasă: NMS pentru casetele întregi, unire (IoS) pentru cele tăiate de marginea
+unei felii; o trecere rapidă pe toată imaginea stabilește ordinea feliilor
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+from ultralytics import YOLO
+
+from test_model import make_detection, print_detections, resolve_backend
+
+# Casetele la mai puțin de atâția pixeli de o margine interioară a feliei sunt considerate tăiate
+EDGE_MARGIN = 4
+
+def tile_grid(height, width, tile_size=960, overlap=0.2):
+    """Coordonatele (x1, y1, x2, y2) ale feliilor suprapuse care acoperă imaginea"""
+    step = max(1, int(tile_size * (1 - overlap)))
+    
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)  # ultima felie lipită de margine
+        return positions
+    
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in starts(height) for x in starts(width)]
+
+def box_overlaps(box, boxes):
+    """(IoU, IoS) între o casetă și un set de casete (xyxy); IoS = intersecția / aria mai mică"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    iou = inter / np.maximum(area + areas - inter, 1e-9)
+    ios = inter / np.maximum(np.minimum(area, areas), 1e-9)
+    return iou, ios
+
+def merge_detections(boxes, scores, classes, partial, iou_threshold=0.5, ios_threshold=0.5):
+    """Unire per clasă, în ordinea scorului: casetele întregi se suprimă prin IoU (NMS);
+    o casetă tăiată de marginea feliei (partial) se potrivește prin IoS și caseta păstrată
+    se extinde la reuniunea lor, astfel încât bucățile unei ciuperci mari dau caseta întreagă"""
+    order = scores.argsort()[::-1]
+    merged = []
+    while order.size:
+        i, rest = order[0], order[1:]
+        box = boxes[i].copy()
+        iou, ios = box_overlaps(boxes[i], boxes[rest])
+        pieces = partial[i] | partial[rest]
+        match = (classes[rest] == classes[i]) & np.where(pieces, ios > ios_threshold,
+                                                         iou > iou_threshold)
+        for j in rest[match & pieces]:
+            box[:2] = np.minimum(box[:2], boxes[j, :2])
+            box[2:] = np.maximum(box[2:], boxes[j, 2:])
+        merged.append((box, scores[i], classes[i]))
+        order = rest[~match]
+    return merged
+
+def inner_edge_mask(boxes, tile, width, height, margin=EDGE_MARGIN):
+    """True pentru casetele care nu ating o margine a feliei aflată în interiorul imaginii
+    (o casetă care o atinge este probabil doar partea din ciupercă aflată în felie)"""
+    x1, y1, x2, y2 = tile
+    keep = np.ones(len(boxes), bool)
+    if x1 > 0:
+        keep &= boxes[:, 0] > x1 + margin
+    if y1 > 0:
+        keep &= boxes[:, 1] > y1 + margin
+    if x2 < width:
+        keep &= boxes[:, 2] < x2 - margin
+    if y2 < height:
+        keep &= boxes[:, 3] < y2 - margin
+    return keep
+
+def _boxes_from_result(result, shift=(0, 0)):
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, int)
+    xyxy = boxes.xyxy.cpu().numpy() + np.array([*shift, *shift], dtype=np.float32)
+    return xyxy, boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(int)
+
+def sliced_predict(model, image, tile_size=960, overlap=0.2, imgsz=480, conf=0.25,
+                   screen_conf=0.05, max_tiles=24, iou_threshold=0.5, device='cpu'):
+    """Detecții pe felii + trecere pe imaginea întreagă; returnează (detecții, statistici)"""
+    height, width = image.shape[:2]
+    timings = {}
+    
+    # 1. Trecere rapidă pe toată imaginea, cu prag mic: ordinea feliilor + ciupercile mari
+    t0 = time.perf_counter()
+    full = model.predict(source=image, imgsz=imgsz, conf=screen_conf, device=device,
+                         verbose=False)[0]
+    full_boxes, full_scores, full_classes = _boxes_from_result(full)
+    timings['screen_ms'] = (time.perf_counter() - t0) * 1000
+    
+    # 2. Toate feliile rulează (o ciupercă prea mică pentru 480px nu apare la trecerea rapidă);
+    # scorurile trecerii rapide doar ordonează feliile, pentru limita max_tiles
+    tiles = tile_grid(height, width, tile_size, overlap)
+    cx = (full_boxes[:, 0] + full_boxes[:, 2]) / 2
+    cy = (full_boxes[:, 1] + full_boxes[:, 3]) / 2
+    scored = []
+    for tile in tiles:
+        x1, y1, x2, y2 = tile
+        inside = (cx >= x1) & (cx < x2) & (cy >= y1) & (cy < y2)
+        scored.append((full_scores[inside].max() if inside.any() else 0.0, tile))
+    scored.sort(key=lambda item: -item[0])
+    selected = [tile for _, tile in scored[:max_tiles]] if len(tiles) > 1 else []
+    
+    # 3. Toate feliile selectate într-un singur batch
+    all_boxes, all_scores, all_classes = [full_boxes], [full_scores], [full_classes]
+    all_partial = [np.zeros(len(full_boxes), bool)]
+    t0 = time.perf_counter()
+    if selected:
+        crops = [image[y1:y2, x1:x2] for x1, y1, x2, y2 in selected]
+        results = model.predict(source=crops, imgsz=imgsz, conf=conf, device=device,
+                                verbose=False)
+        for tile, result in zip(selected, results):
+            boxes, scores, classes = _boxes_from_result(result, shift=tile[:2])
+            # Casetele tăiate de marginea feliei au IoU mic cu caseta întreagă și NMS nu le-ar
+            # elimina; sunt marcate ca bucăți și unite prin IoS la pasul 4
+            all_boxes.append(boxes)
+            all_scores.append(scores)
+            all_classes.append(classes)
+            all_partial.append(~inner_edge_mask(boxes, tile, width, height))
+    timings['tiles_ms'] = (time.perf_counter() - t0) * 1000
+    
+    # 4. Pragul final de confidence, apoi unirea per clasă (NMS + bucățile de la margini)
+    boxes = np.concatenate(all_boxes)
+    scores = np.concatenate(all_scores)
+    classes = np.concatenate(all_classes)
+    partial = np.concatenate(all_partial)
+    confident = scores >= conf
+    merged = merge_detections(boxes[confident], scores[confident], classes[confident],
+                              partial[confident], iou_threshold)
+    
+    detections = [make_detection(int(cls), float(score), box.tolist())
+                  for box, score, cls in merged]
+    stats = {
+        'tiles_total': len(tiles),
+        'tiles_run': len(selected),
+        'tiles_skipped': len(tiles) - len(selected),
+        **timings,
+    }
+    return detections, stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inferență pe felii pentru imagini mari")
+    parser.add_argument('image')
+    parser.add_argument('--tile-size', type=int, default=960)
+    parser.add_argument('--overlap', type=float, default=0.2)
+    parser.add_argument('--imgsz', type=int, default=480)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--max-tiles', type=int, default=24)
+    parser.add_argument('--backend', default='pytorch')
+    args = parser.parse_args()
+    
+    model_path, device = resolve_backend(args.backend)
+    if model_path is not None:
+        model = YOLO(model_path, task='detect')
+        detections, stats = sliced_predict(model, cv2.imread(args.image), args.tile_size,
+                                           args.overlap, args.imgsz, args.conf,
+                                           max_tiles=args.max_tiles, device=device)
+        print_detections(detections)
+        print(f"\n🧩 Felii: {stats['tiles_run']}/{stats['tiles_total']} rulate "
+              f"({stats['tiles_skipped']} sărite), "
+              f"{stats['screen_ms']:.0f}ms + {stats['tiles_ms']:.0f}ms")
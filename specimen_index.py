@@ -0,0 +1,334 @@
+"""
+Index de embedding-uri pentru exemplarele etichetate din train/ și valid/
+Fiecare casetă etichetată este decupată și trecută prin backbone-ul modelului; vectorii
+(float16, normalizați L2) stau într-un fișier memmap, iar căutarea top-k durează milisecunde.
+Imaginile noi sunt adăugate la coadă, fără re-embedding pentru restul dataset-ului
+"""
+
+import argparse
+import json
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from ultralytics import YOLO
+
+from augment_shards import read_polygons
+from fast_preprocess import ImagePreprocessor
+from incremental_training import scan_images
+from prediction_cache import weights_fingerprint
+from test_model import MODEL_PATH, MUSHROOM_TYPES, UNKNOWN_TYPE
+
+INDEX_DIR = Path("runs/similar")
+INDEX_VERSION = 1
+SPLITS = ('train', 'valid')
+CROP_SIZE = 160                # Decupajele sunt aduse (letterbox) la aceeași formă fixă
+CONTEXT = 0.1                  # Margine în jurul casetei (fracțiune din latură)
+IMAGES_PER_STEP = 64           # Imagini decodate odată în timpul construirii
+SEARCH_CHUNK = 65536           # Rânduri float16 convertite odată la căutare
+COMPACT_RATIO = 0.25           # Rescrie fișierul când rândurile șterse depășesc acest procent
+
+def label_boxes(img_path, width, height):
+    """Casetele etichetate ale imaginii în pixeli: [(clasă, [x1, y1, x2, y2])]"""
+    label_path = img_path.parent.parent / 'labels' / f"{img_path.stem}.txt"
+    boxes = []
+    for cls, points in read_polygons(label_path):
+        (x1, y1), (x2, y2) = points.min(0), points.max(0)
+        boxes.append((cls, [float(x1 * width), float(y1 * height),
+                            float(x2 * width), float(y2 * height)]))
+    return boxes
+
+def crop_box(image, box, context=CONTEXT):
+    """Decupajul casetei cu o margine de context, limitat la imagine; None dacă e gol"""
+    h, w = image.shape[:2]
+    x1, y1, x2, y2 = box
+    pad_x, pad_y = (x2 - x1) * context, (y2 - y1) * context
+    x1, y1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+    x2, y2 = min(w, int(np.ceil(x2 + pad_x))), min(h, int(np.ceil(y2 + pad_y)))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return image[y1:y2, x1:x2]
+
+def _read_specimens(img_path):
+    """(decupaje, rânduri de metadate) pentru o imagine; rândul: [imagine, split, clasă, casetă]"""
+    image = cv2.imread(str(img_path))
+    if image is None:
+        print(f"   ⚠️  Imagine coruptă, sărită: {img_path.name}")
+        return [], []
+    
+    crops, rows = [], []
+    split = img_path.parent.parent.name
+    for cls, box in label_boxes(img_path, image.shape[1], image.shape[0]):
+        crop = crop_box(image, box)
+        if crop is not None:
+            crops.append(crop)
+            rows.append([str(img_path), split, cls, [round(v, 1) for v in box]])
+    return crops, rows
+
+class CropEmbedder:
+    """Vectorul backbone-ului (ultimul strat, pooling global) pentru decupaje de ciuperci"""
+    
+    def __init__(self, model_path, device=None, crop_size=CROP_SIZE, batch=32):
+        model = YOLO(str(model_path), task='detect')
+        # Ultimul strat din backbone (C2PSA la YOLO11): caracteristici generale, nu ale capului de detecție
+        self.layer = len(model.model.yaml['backbone']) - 1
+        self.device = torch.device('cuda:0' if device != 'cpu' and torch.cuda.is_available() else 'cpu')
+        self.half = self.device.type == 'cuda'
+        net = model.model.fuse(verbose=False).to(self.device).eval()
+        self.net = net.half() if self.half else net
+        self.batch = batch
+        self.preprocessor = ImagePreprocessor(crop_size)
+        self.buffer = np.empty((batch, crop_size, crop_size, 3), np.uint8)
+    
+    @torch.inference_mode()
+    def __call__(self, crops):
+        """Decupaje BGR -> array (n, dim) float32 cu vectori de normă 1"""
+        vectors = []
+        for start in range(0, len(crops), self.batch):
+            chunk = crops[start:start + self.batch]
+            for i, crop in enumerate(chunk):
+                self.buffer[i] = self.preprocessor.letterbox(crop)[0]
+            x = torch.from_numpy(self.buffer[:len(chunk)]).to(self.device, non_blocking=True)
+            x = x[..., [2, 1, 0]].permute(0, 3, 1, 2)
+            x = (x.half() if self.half else x.float()) / 255
+            features = torch.stack(self.net.predict(x, embed=[self.layer])).float()
+            vectors.append(torch.nn.functional.normalize(features, dim=1).cpu().numpy())
+        return np.concatenate(vectors) if vectors else np.zeros((0, 0), np.float32)
+
+class SpecimenIndex:
+    """Fișier float16 (n x dim) cu vectorii + index JSON (metadate per rând, rânduri per imagine)
+    
+    Greutățile folosite la construire sunt copiate lângă index: reantrenarea best.pt nu
+    invalidează vectorii existenți; rebuild=True re-indexează totul cu greutățile noi
+    """
+    
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = Path(index_dir)
+        self.data_path = self.index_dir / "embeddings.f16"
+        self.meta_path = self.index_dir / "index.json"
+        self.weights_path = self.index_dir / "weights.pt"
+        self.meta = None
+        self.vectors = None
+        self._embedder = None
+        if self.meta_path.exists():
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            if meta.get('version') == INDEX_VERSION and self.weights_path.exists():
+                self._load(meta)
+    
+    def _load(self, meta):
+        self.meta = meta
+        rows = meta['rows']
+        self.live = np.array([row is not None for row in rows], bool)
+        self.classes = np.array([row[2] if row else -1 for row in rows], np.int64)
+        self.vectors = np.memmap(self.data_path, dtype=np.float16, mode='r',
+                                 shape=(len(rows), meta['dim'])) if rows else None
+    
+    def __len__(self):
+        return int(self.live.sum()) if self.meta else 0
+    
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = CropEmbedder(self.weights_path, crop_size=self.meta['crop_size'])
+        return self._embedder
+    
+    def update(self, model_path=MODEL_PATH, splits=SPLITS, rebuild=False, workers=4):
+        """Adaugă imaginile noi/modificate, marchează cele șterse; doar acestea sunt procesate"""
+        if self.meta is None or rebuild:
+            if not Path(model_path).exists():
+                print(f"❌ Modelul nu există: {model_path}")
+                return None
+            print(f"🗂️  Index nou de exemplare din {model_path}")
+            shutil.rmtree(self.index_dir, ignore_errors=True)
+            self.index_dir.mkdir(parents=True)
+            shutil.copy2(model_path, self.weights_path)
+            self._embedder = None
+            self._load({'version': INDEX_VERSION, 'weights': weights_fingerprint(self.weights_path),
+                        'crop_size': CROP_SIZE, 'dim': 0, 'rows': [], 'images': {}})
+            self.data_path.touch()
+        elif Path(model_path).exists() and weights_fingerprint(model_path) != self.meta['weights']:
+            print(f"⚠️  {model_path} diferă de greutățile indexului - imaginile noi folosesc "
+                  "tot greutățile indexului (--rebuild pentru a re-indexa)")
+        
+        current = {}
+        for split in splits:
+            if Path(split, 'images').is_dir():
+                current.update(scan_images(Path(split, 'images')))
+        
+        meta = self.meta
+        images = meta['images']
+        changed = [path for path, signature in current.items()
+                   if images.get(path, {}).get('signature') != signature]
+        removed = [path for path in images if path not in current]
+        for path in removed + changed:
+            entry = images.pop(path, None)
+            if entry is not None:
+                for row in range(*entry['rows']):
+                    meta['rows'][row] = None
+        
+        if not changed and not removed:
+            print(f"✅ Index la zi: {len(self)} exemplare din {len(images)} imagini")
+            return self
+        
+        start = time.perf_counter()
+        print(f"🔄 Actualizare index: {len(changed)} imagini noi/modificate, {len(removed)} șterse")
+        # Rândurile de după ultima salvare (o actualizare întreruptă) sunt ignorate
+        with open(self.data_path, 'r+b') as f:
+            f.truncate(len(meta['rows']) * meta['dim'] * 2)
+        
+        added = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for step in range(0, len(changed), IMAGES_PER_STEP):
+                paths = changed[step:step + IMAGES_PER_STEP]
+                crops, rows, spans = [], [], []
+                for path, (image_crops, image_rows) in zip(paths, pool.map(
+                        lambda p: _read_specimens(Path(p)), paths)):
+                    first = len(meta['rows']) + len(rows)
+                    spans.append((path, first, first + len(image_rows)))
+                    crops += image_crops
+                    rows += image_rows
+                
+                vectors = self.embedder(crops)
+                if len(vectors):
+                    meta['dim'] = meta['dim'] or vectors.shape[1]
+                    with open(self.data_path, 'ab') as f:
+                        f.write(vectors.astype(np.float16).tobytes())
+                meta['rows'] += rows
+                for path, first, end in spans:
+                    images[path] = {'signature': current[path], 'rows': [first, end]}
+                added += len(rows)
+        
+        stale = sum(row is None for row in meta['rows'])
+        if stale > COMPACT_RATIO * max(len(meta['rows']), 1):
+            self._compact()
+        self._save()
+        print(f"   ✅ +{added} exemplare în {time.perf_counter() - start:.1f}s "
+              f"(total {len(self)} din {len(images)} imagini)")
+        return self
+    
+    def _compact(self):
+        """Rescrie fișierul doar cu rândurile active (copiere, fără re-embedding)"""
+        meta = self.meta
+        self.vectors = None
+        keep = [i for i, row in enumerate(meta['rows']) if row is not None]
+        remap = {old: new for new, old in enumerate(keep)}
+        vectors = np.memmap(self.data_path, dtype=np.float16, mode='r',
+                            shape=(len(meta['rows']), meta['dim']))
+        tmp_path = self.data_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            for start in range(0, len(keep), SEARCH_CHUNK):
+                f.write(np.ascontiguousarray(vectors[keep[start:start + SEARCH_CHUNK]]).tobytes())
+        del vectors
+        tmp_path.replace(self.data_path)
+        
+        for entry in meta['images'].values():
+            first, end = entry['rows']
+            entry['rows'] = [remap[first], remap[first] + end - first] if end > first else [0, 0]
+        meta['rows'] = [meta['rows'][i] for i in keep]
+        print(f"   🧹 Index compactat: {len(keep)} rânduri active")
+    
+    def _save(self):
+        """Metadatele se scriu atomic, după vectori: un index salvat are mereu toate rândurile"""
+        tmp_path = self.meta_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f)
+        tmp_path.replace(self.meta_path)
+        self._load(self.meta)
+    
+    def search(self, vector, k=5, cls=None):
+        """Cele mai apropiate k exemplare (similaritate cosinus) pentru un vector normalizat"""
+        if not len(self):
+            return []
+        query = np.asarray(vector, np.float32)
+        scores = np.empty(len(self.live), np.float32)
+        for start in range(0, len(scores), SEARCH_CHUNK):
+            block = np.asarray(self.vectors[start:start + SEARCH_CHUNK], np.float32)
+            scores[start:start + len(block)] = block @ query
+        
+        scores[~self.live] = -np.inf
+        if cls is not None:
+            scores[self.classes != cls] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+        top = np.argpartition(-scores, k - 1)[:k] if k else []
+        top = sorted(top, key=lambda i: -scores[i])
+        
+        matches = []
+        for i in top:
+            image, split, class_id, box = self.meta['rows'][i]
+            matches.append({'image': image, 'split': split, 'class_id': class_id,
+                            'box': box, 'similarity': float(scores[i])})
+        return matches
+    
+    def similar(self, image, box, k=5, cls=None):
+        """Exemplarele etichetate cele mai asemănătoare cu caseta din imagine (BGR)"""
+        crop = crop_box(image, box)
+        if crop is None or not len(self):
+            return []
+        return self.search(self.embedder([crop])[0], k, cls)
+
+def print_matches(matches):
+    """Afișează exemplarele găsite, cu clasa lor etichetată"""
+    if not matches:
+        print("      ❓ Niciun exemplar asemănător în index")
+        return
+    for i, match in enumerate(matches, 1):
+        name, _, emoji = MUSHROOM_TYPES.get(match['class_id'], UNKNOWN_TYPE)
+        x1, y1, x2, y2 = match['box']
+        print(f"      {i}. {emoji} {name:<15} {match['similarity']:.3f}  "
+              f"{match['split']}/{Path(match['image']).name} "
+              f"[{x1:.0f}, {y1:.0f}, {x2:.0f}, {y2:.0f}]")
+
+def find_similar(img_path, k=5, same_class=False, index=None):
+    """Detectează ciupercile din imagine și listează exemplarele etichetate cele mai apropiate
+    (detecțiile death-cap primele)"""
+    from mushroom_detector import DEATH_CAP, MushroomDetector
+    
+    index = index or SpecimenIndex()
+    if not len(index):
+        print("❌ Indexul de exemplare lipsește - rulați: python specimen_index.py --build")
+        return None
+    image = cv2.imread(str(img_path))
+    if image is None:
+        print(f"❌ Nu pot citi imaginea: {img_path}")
+        return None
+    detector = MushroomDetector.load('pytorch')
+    if detector is None:
+        return None
+    
+    result = detector(image)
+    order = sorted(range(len(result['classes'])),
+                   key=lambda i: (result['classes'][i] != DEATH_CAP, -result['confidences'][i]))
+    report = []
+    print(f"🔎 {len(order)} detecții în {Path(img_path).name}, {len(index)} exemplare în index")
+    for i in order:
+        cls = int(result['classes'][i])
+        name, _, emoji = MUSHROOM_TYPES.get(cls, UNKNOWN_TYPE)
+        start = time.perf_counter()
+        matches = index.similar(image, result['boxes'][i].tolist(), k,
+                                cls if same_class else None)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n   {emoji} {name} ({result['confidences'][i]:.2%}) - {elapsed:.1f}ms")
+        print_matches(matches)
+        report.append({'class_id': cls, 'box': result['boxes'][i].tolist(), 'matches': matches})
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index de exemplare asemănătoare (embedding-uri)")
+    parser.add_argument('image', nargs='?', help="Imaginea pentru care se caută exemplare")
+    parser.add_argument('--build', action='store_true', help="Actualizează indexul (incremental)")
+    parser.add_argument('--rebuild', action='store_true', help="Re-indexează cu best.pt curent")
+    parser.add_argument('--weights', default=MODEL_PATH)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--same-class', action='store_true')
+    args = parser.parse_args()
+    
+    index = SpecimenIndex()
+    if args.build or args.rebuild or index.meta is None:
+        index = index.update(args.weights, rebuild=args.rebuild)
+    if index is not None and args.image:
+        find_similar(args.image, args.k, args.same_class, index)
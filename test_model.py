@@ -3,33 +3,221 @@ Script pentru testarea modelului antrenat de detecție ciuperci
 Optimizat pentru RTX 4050
 """
 
-from ultralytics import YOLO
-import cv2
-import matplotlib.pyplot as plt
+import argparse
 from pathlib import Path
-import torch
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-def test_trained_model():
+from prediction_cache import PredictionCache, cached_predict
+
+MODEL_PATH = "runs/detect/mushroom_detector_rtx4050/weights/best.pt"
+EXPORT_REPORT = "runs/export/export_report.json"
+
+# Pragurile de confidence per clasă alese de offline_eval.py
+CLASS_THRESHOLDS_PATH = "runs/eval/thresholds.json"
+DEFAULT_CONF = 0.25
+
+BACKENDS = ('pytorch', 'onnx', 'onnx_int8', 'openvino', 'openvino_int8')
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+# Peste această latură (px) imaginea este analizată pe felii
+SLICED_MIN_SIDE = 2000
+
+# Tipurile de ciuperci: (nume, siguranță, emoji)
+MUSHROOM_TYPES = {
+    0: ("Chanterelle (Galbiori)", "✅ COMESTIBIL", "🟢"),
+    1: ("Death-cap (Coprini)", "⚠️ EXTREM DE TOXIC!", "🔴"),
+    2: ("Field Mushroom (De câmp)", "✅ COMESTIBIL", "🟢")
+}
+UNKNOWN_TYPE = ("Necunoscut", "❓ NEIDENTIFICAT", "⚪")
+
+def letterbox(image, new_size=480, color=(114, 114, 114)):
+    """Redimensionează imaginea păstrând proporțiile și o completează la new_size x new_size"""
+    import cv2
+    
+    h, w = image.shape[:2]
+    scale = min(new_size / h, new_size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    
+    if (new_w, new_h) != (w, h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    
+    # Padding egal pe ambele părți (ca în LoadImages din Ultralytics)
+    pad_x = (new_size - new_w) / 2
+    pad_y = (new_size - new_h) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right,
+                               cv2.BORDER_CONSTANT, value=color)
+    
+    return image, scale, (left, top)
+
+def resolve_backend(backend='pytorch'):
+    """Calea modelului și device-ul pentru backend-ul ales; returnează (None, None) dacă lipsește"""
+    if backend == 'pytorch':
+        if not Path(MODEL_PATH).exists():
+            print("❌ Modelul antrenat nu a fost găsit!")
+            print(f"🔍 Căutați în: {MODEL_PATH}")
+            return None, None
+        import torch
+        return MODEL_PATH, 0 if torch.cuda.is_available() else 'cpu'
+    
+    if backend not in BACKENDS:
+        print(f"❌ Backend necunoscut: {backend} (opțiuni: {', '.join(BACKENDS)})")
+        return None, None
+    
+    if not Path(EXPORT_REPORT).exists():
+        print("❌ Nu există modele exportate! Rulați: python export_model.py")
+        return None, None
+    
+    with open(EXPORT_REPORT) as f:
+        entry = json.load(f)['backends'].get(backend)
+    
+    if entry is None or not Path(entry['path']).exists():
+        print(f"❌ Backend-ul {backend} nu a fost exportat")
+        return None, None
+    if not entry['accepted']:
+        print(f"❌ Backend-ul {backend} a fost respins (Δ mAP50-95 = {entry['map_delta']:+.3f})")
+        return None, None
+    
+    # Modelele exportate rulează pe CPU (ONNX Runtime / OpenVINO)
+    return entry['path'], 'cpu'
+
+def load_class_thresholds(model_path):
+    """Pragurile per clasă din offline_eval.py; {} dacă lipsesc sau sunt pentru alte greutăți"""
+    if not Path(CLASS_THRESHOLDS_PATH).exists():
+        return {}
+    
+    from prediction_cache import weights_fingerprint
+    
+    with open(CLASS_THRESHOLDS_PATH) as f:
+        saved = json.load(f)
+    if saved['weights'] != weights_fingerprint(model_path):
+        print("⚠️  Pragurile per clasă sunt pentru alt model - folosesc conf 0.25")
+        return {}
+    return {int(cls): threshold for cls, threshold in saved['thresholds'].items()}
+
+def prediction_conf(thresholds):
+    """Pragul trimis modelului: cel mai mic prag per clasă (filtrarea finală vine după)"""
+    return min(thresholds.values(), default=DEFAULT_CONF)
+
+def filter_detections(detections, thresholds, default=DEFAULT_CONF):
+    """Păstrează detecțiile peste pragul clasei lor (`default` pentru clasele fără prag)"""
+    return [det for det in detections
+            if det['confidence'] >= thresholds.get(det['class_id'], default)]
+
+def _load_and_letterbox(img_path, imgsz):
+    """Decodează (redus, pentru JPEG-uri mari) și face letterbox unei imagini
+    (rulează pe thread-urile de prefetch)"""
+    from fast_preprocess import read_image
+    
+    start = time.perf_counter()
+    image, _ = read_image(img_path, imgsz)
+    if image is None:
+        return img_path, None, time.perf_counter() - start
+    image, _, _ = letterbox(image, imgsz)
+    return img_path, image, time.perf_counter() - start
+
+def _prefetch_batches(image_paths, batch_size, imgsz, workers, prefetch):
+    """Generator: thread-uri de fundal pregătesc batch-uri cât timp modelul rulează
+    (cel mult batch_size * prefetch imagini decodate în zbor, plus coada de batch-uri)"""
+    batches = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    window = max(batch_size * prefetch, workers)
+    
+    def put(item):
+        """put() care renunță dacă consumatorul s-a oprit (altfel thread-ul ar rămâne blocat)"""
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def producer():
+        # Orice excepție (ex. decodorul pe un fișier malformat) ajunge la consumator prin coadă;
+        # fără santinelă, batches.get() ar aștepta la nesfârșit
+        failure = None
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                remaining = iter(image_paths)
+                paths, images, decode_time = [], [], 0.0
+                while True:
+                    # Fereastră de futures: decodarea nu o ia mai mult de `window` imagini înainte
+                    for img_path in remaining:
+                        pending.append(pool.submit(_load_and_letterbox, img_path, imgsz))
+                        if len(pending) >= window:
+                            break
+                    if not pending:
+                        break
+                    img_path, image, elapsed = pending.popleft().result()
+                    if stop.is_set():
+                        for future in pending:
+                            future.cancel()
+                        return
+                    decode_time += elapsed
+                    if image is None:
+                        print(f"   ⚠️  Imagine coruptă, sărită: {img_path.name}")
+                        continue
+                    paths.append(img_path)
+                    images.append(image)
+                    if len(images) == batch_size:
+                        if not put((paths, images, decode_time)):
+                            return
+                        paths, images, decode_time = [], [], 0.0
+                if images and not put((paths, images, decode_time)):
+                    return
+        except Exception as error:
+            failure = error
+        finally:
+            put(failure)
+    
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    try:
+        while True:
+            wait_start = time.perf_counter()
+            item = batches.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item, time.perf_counter() - wait_start
+    finally:
+        stop.set()
+
+def test_trained_model(use_cache=True, backend='pytorch', cascade=False, annotate=False):
     """Testează modelul antrenat pe imagini de test"""
+    from fast_preprocess import read_image
+    from mushroom_detector import MushroomDetector, to_detections
+    from results_store import ANNOTATED_DIR, AnnotationWriter, ResultsStore
     
-    # Calea către modelul antrenat
-    model_path = "runs/detect/mushroom_detector_rtx4050/weights/best.pt"
+    # Calea către modelul antrenat (sau exportul ONNX/OpenVINO)
+    model_path, _ = resolve_backend(backend)
     
-    if not Path(model_path).exists():
-        print("❌ Modelul antrenat nu a fost găsit!")
-        print(f"🔍 Căutați în: {model_path}")
+    if model_path is None:
         return
     
-    # Încarcă modelul antrenat
-    print("📥 Încărcare model antrenat...")
-    model = YOLO(model_path)
+    # Încarcă modelul o singură dată (cu încălzire la forma fixă 480x480)
+    thresholds = load_class_thresholds(model_path)
+    detector = MushroomDetector.load(backend, thresholds=thresholds)
+    cache = PredictionCache(model_path) if use_cache else None
     
-    # Definește tipurile de ciuperci
-    class_names = {
-        0: "chanterelle (galbiori) ✅",
-        1: "death-cap (coprini) ⚠️ TOXIC!",
-        2: "field-mushroom (de câmp) ✅"
-    }
+    # Cascadă: triajul rapid decide dacă detectorul merită rulat
+    triage = None
+    if cascade:
+        from cascade_triage import TRIAGE_PATH, TriageClassifier, image_features
+        if Path(TRIAGE_PATH).exists():
+            triage = TriageClassifier.load(TRIAGE_PATH)
+        else:
+            print("⚠️  Triajul nu este antrenat (python cascade_triage.py train) - rulez fără cascadă")
     
     # Testează pe câteva imagini din setul de test
     test_dir = Path("test/images")
@@ -37,50 +225,201 @@ def test_trained_model():
     
     print(f"🧪 Testez pe {len(test_images)} imagini...")
     
+    # Detecțiile merg în baza de rezultate; imaginile adnotate (opțional) pe un thread separat
+    store = ResultsStore()
+    run_id = store.start_run(model_path, backend, detector.conf, 480)
+    writer = AnnotationWriter() if annotate else None
+    
     for img_path in test_images:
         print(f"\n📸 Procesez: {img_path.name}")
         
-        # Predicție
-        results = model.predict(
-            source=str(img_path),
-            save=True,
-            conf=0.25,  # Confidence threshold
-            device=0 if torch.cuda.is_available() else 'cpu'
-        )
+        # Decodare redusă (JPEG-uri mari); letterbox-ul se face în bufferul detectorului
+        image, factor = read_image(img_path, detector.imgsz)
+        if image is None:
+            print("   ⚠️  Imagine coruptă, sărită")
+            continue
+        
+        if triage is not None and not triage.should_run_detector(image_features(image)):
+            print("   ⏭️  Triaj: fără ciuperci probabile - detector sărit")
+            continue
+        
+        # Predicție (din cache dacă imaginea a mai fost văzută cu aceleași greutăți)
+        # Cache-ul păstrează detecțiile brute (pragul NMS din cheie); pragurile per clasă se
+        # aplică după, ca modificarea lor în thresholds.json să nu fie ascunsă de un cache hit
+        if cache is not None:
+            detections, hit = cached_predict(
+                None, cache, img_path, conf=detector.conf, imgsz=480,
+                predict=lambda: to_detections(detector(image, factor, raw=True)))
+            if hit:
+                print("   ⚡ Rezultat din cache")
+        else:
+            detections = to_detections(detector(image, factor, raw=True))
+        detections = filter_detections(detections, thresholds)
+        store.add(run_id, img_path, detections)
+        if writer is not None:
+            writer.submit(img_path, detections)
         
         # Afișează rezultatele
-        for result in results:
-            boxes = result.boxes
-            if boxes is not None:
-                for box in boxes:
-                    cls = int(box.cls[0])
-                    conf = float(box.conf[0])
-                    mushroom_type = class_names.get(cls, "necunoscut")
-                    
-                    print(f"   🍄 Detectat: {mushroom_type}")
-                    print(f"   📊 Confidence: {conf:.2%}")
-                    
-                    # Avertizare pentru ciuperci toxice
-                    if cls == 1:  # death-cap
-                        print("   ⚠️  ATENȚIE: CIUPERCĂ TOXICĂ!")
-            else:
-                print("   ❓ Nu s-au detectat ciuperci")
-    
-    print(f"\n✅ Test complet! Rezultatele salvate în: runs/detect/predict/")
-
-def run_interactive_test():
-    """Test interactiv pe o imagine specificată"""
-    
-    model_path = "runs/detect/mushroom_detector_rtx4050/weights/best.pt"
-    
-    if not Path(model_path).exists():
-        print("❌ Rulați mai întâi train_mushroom_model.py")
+        for det in detections:
+            print(f"   🍄 Detectat: {det['emoji']} {det['name']} - {det['safety']}")
+            print(f"   📊 Confidence: {det['confidence']:.2%}")
+            
+            # Avertizare pentru ciuperci toxice
+            if det['toxic']:
+                print("   ⚠️  ATENȚIE: CIUPERCĂ TOXICĂ!")
+        if not detections:
+            print("   ❓ Nu s-au detectat ciuperci")
+    
+    if cache is not None:
+        stats = cache.stats()
+        print(f"\n💾 Cache: hit rate {stats['hit_rate']:.1%} "
+              f"({stats['hits']} hits / {stats['misses']} misses, {stats['entries']} intrări)")
+        cache.close()
+    
+    store.close()
+    print(f"\n✅ Test complet! Rezultatele salvate în: runs/results/ (rulare {run_id})")
+    print(f"🔎 Interogare: python results_store.py --run {run_id}")
+    if writer is not None:
+        written = writer.close()
+        print(f"🖼️  Imagini adnotate: {written['written']} în {ANNOTATED_DIR} "
+              f"({written['dropped']} sărite - coadă plină)")
+
+def test_trained_model_batched(source_dir="test/images", batch_size=8, imgsz=480,
+                               workers=2, prefetch=2, conf=DEFAULT_CONF, backend='pytorch'):
+    """Predicție în batch-uri pe un director întreg, cu prefetch pe thread-uri de fundal"""
+    from mushroom_detector import MushroomDetector, to_detections
+    
+    model_path, _ = resolve_backend(backend)
+    
+    if model_path is None:
+        return None
+    
+    image_paths = sorted(p for p in Path(source_dir).iterdir()
+                         if p.suffix.lower() in IMAGE_EXTENSIONS)
+    if not image_paths:
+        print(f"❌ Nu există imagini în {source_dir}")
+        return None
+    
+    # Același detector și aceleași praguri per clasă ca test_trained_model
+    thresholds = load_class_thresholds(model_path)
+    detector = MushroomDetector.load(backend, imgsz=imgsz, conf=conf, thresholds=thresholds,
+                                     max_batch=batch_size)
+    
+    print(f"🧪 Procesez {len(image_paths)} imagini în batch-uri de {batch_size} "
+          f"(imgsz={imgsz}, workers={workers})...")
+    
+    timings = {'decode': 0.0, 'wait': 0.0, 'detect': 0.0}
+    counts = {name: 0 for name, _, _ in MUSHROOM_TYPES.values()}
+    processed = 0
+    empty = 0
+    
+    start = time.perf_counter()
+    for (paths, images, decode_time), wait_time in _prefetch_batches(
+            image_paths, batch_size, imgsz, workers, prefetch):
+        timings['decode'] += decode_time
+        timings['wait'] += wait_time
+        
+        # Imaginile vin deja cu letterbox la imgsz: letterbox-ul detectorului nu le mai modifică
+        detect_start = time.perf_counter()
+        results = detector.detect_batch(images, raw=True)
+        timings['detect'] += time.perf_counter() - detect_start
+        
+        for img_path, result in zip(paths, results):
+            detections = filter_detections(to_detections(result), thresholds, default=conf)
+            if not detections:
+                empty += 1
+            for det in detections:
+                counts[det['name']] = counts.get(det['name'], 0) + 1
+            if any(det['toxic'] for det in detections):
+                print(f"   ⚠️  ATENȚIE: CIUPERCĂ TOXICĂ în {img_path.name}!")
+        
+        processed += len(paths)
+    
+    elapsed = time.perf_counter() - start
+    throughput = processed / elapsed if elapsed > 0 else 0.0
+    
+    print(f"\n📊 Rezultate pe {processed} imagini:")
+    for name, count in counts.items():
+        print(f"   🍄 {name}: {count} detecții")
+    print(f"   ❓ Fără detecții: {empty}/{processed}")
+    
+    print(f"\n⏱️  Performanță:")
+    print(f"   • Throughput: {throughput:.1f} imagini/sec")
+    print(f"   • Timp total: {elapsed:.2f}s")
+    if processed:
+        print(f"   • Decodare + letterbox (fundal): {timings['decode'] / processed * 1000:.1f}ms/imagine")
+        print(f"   • Așteptare după prefetch: {timings['wait'] / processed * 1000:.1f}ms/imagine")
+        print(f"   • Detector (inferență + NMS): {timings['detect'] / processed * 1000:.1f}ms/imagine")
+    
+    return {
+        'images': processed,
+        'images_per_sec': throughput,
+        'elapsed': elapsed,
+        'timings': timings,
+        'counts': counts,
+        'empty': empty,
+    }
+
+def make_detection(cls, conf, xyxy):
+    """O detecție (clasă, siguranță, confidence, casetă) în formatul testului interactiv"""
+    name, safety, emoji = MUSHROOM_TYPES.get(cls, UNKNOWN_TYPE)
+    return {
+        'class_id': cls,
+        'name': name,
+        'safety': safety,
+        'emoji': emoji,
+        'confidence': conf,
+        'box': xyxy,
+        'toxic': cls == 1,
+    }
+
+def describe_detections(result):
+    """Transformă un rezultat YOLO în lista de detecții (clasă, siguranță, confidence)"""
+    detections = []
+    boxes = result.boxes
+    if boxes is None:
+        return detections
+    
+    for cls, conf, xyxy in zip(boxes.cls.int().tolist(),
+                               boxes.conf.tolist(),
+                               boxes.xyxy.tolist()):
+        detections.append(make_detection(cls, conf, xyxy))
+    return detections
+
+def print_detections(detections):
+    """Afișează detecțiile în formatul testului interactiv"""
+    if not detections:
+        print("❓ Nu s-au detectat ciuperci în imagine")
         return
     
-    model = YOLO(model_path)
+    print(f"\n🍄 Găsite {len(detections)} ciuperci:")
+    for i, det in enumerate(detections, 1):
+        print(f"   {i}. {det['emoji']} {det['name']}")
+        print(f"      Siguranță: {det['safety']}")
+        print(f"      Confidence: {det['confidence']:.2%}")
+        
+        if det['toxic']:
+            print("      🚨 NU CONSUMAȚI! Contactați un specialist!")
+
+def run_interactive_test(server_url=None, backend='pytorch', sliced=None, img_path=None, show=True,
+                         annotate=False):
+    """Test interactiv pe o imagine specificată (fără input() dacă img_path este dat)"""
+    
+    from inference_client import DEFAULT_SERVER_URL, identify, server_is_running
+    
+    server_url = server_url or DEFAULT_SERVER_URL
+    use_server = server_is_running(server_url)
+    
+    model_path, device = (None, None) if use_server else resolve_backend(backend)
+    
+    if not use_server and model_path is None:
+        print("❌ Rulați mai întâi train_mushroom_model.py")
+        return
     
     # Cere utilizatorului să specifice o imagine
-    img_path = input("📁 Introduceți calea către imaginea de test: ").strip()
+    if img_path is None:
+        img_path = input("📁 Introduceți calea către imaginea de test: ").strip()
+    img_path = str(img_path)
     
     if not Path(img_path).exists():
         print("❌ Imaginea nu există!")
@@ -88,49 +427,137 @@ def run_interactive_test():
     
     print("🔍 Analizez imaginea...")
     
-    # Predicție
-    results = model.predict(
-        source=img_path,
-        save=True,
-        show=True,  # Afișează rezultatul
-        conf=0.25
+    if use_server:
+        # Modelul este deja încărcat în server - fără cold start
+        print(f"⚡ Folosesc serverul de inferență: {server_url}")
+        print_detections(identify(img_path, server_url))
+        return
+    
+    import cv2
+    
+    from fast_preprocess import image_size, read_image
+    from results_store import AnnotationWriter, ResultsStore
+    
+    thresholds = load_class_thresholds(model_path)
+    store = ResultsStore()
+    run_id = store.start_run(model_path, backend, prediction_conf(thresholds), 480)
+    
+    def record(detections):
+        store.add(run_id, img_path, detections)
+        store.close()
+        if annotate:
+            writer = AnnotationWriter()
+            writer.submit(img_path, detections)
+            writer.close()
+    
+    # Fotografiile mari de telefon sunt analizate pe felii (ciupercile mici nu dispar);
+    # dimensiunea vine din header-ul JPEG, fără decodare
+    if sliced is None:
+        size = image_size(img_path)
+        sliced = size is not None and max(size) >= SLICED_MIN_SIDE
+    if sliced:
+        from ultralytics import YOLO
+        
+        from sliced_inference import sliced_predict
+        model = YOLO(model_path, task='detect')
+        detections, stats = sliced_predict(model, cv2.imread(img_path), imgsz=480,
+                                           conf=prediction_conf(thresholds), device=device)
+        print(f"🧩 Analiză pe felii: {stats['tiles_run']}/{stats['tiles_total']} felii rulate")
+        detections = filter_detections(detections, thresholds)
+        record(detections)
+        print_detections(detections)
+        return
+    
+    from mushroom_detector import MushroomDetector, to_detections
+    
+    detector = MushroomDetector(model_path, device, thresholds=thresholds)
+    cache = PredictionCache(model_path)
+    
+    # Predicție (fotografiile retrimise vin direct din cache)
+    detections, hit = cached_predict(
+        None, cache, img_path,
+        conf=detector.conf,
+        imgsz=480,
+        predict=lambda: to_detections(detector(img_path, raw=True))
     )
+    if hit:
+        print("⚡ Rezultat din cache (aceeași imagine și aceleași greutăți)")
+    cache.close()
+    
+    detections = filter_detections(detections, thresholds)
+    record(detections)
     
     # Interpretează rezultatele
-    for result in results:
-        boxes = result.boxes
-        if boxes is not None:
-            print(f"\n🍄 Găsite {len(boxes)} ciuperci:")
-            for i, box in enumerate(boxes, 1):
-                cls = int(box.cls[0])
-                conf = float(box.conf[0])
-                
-                mushroom_types = {
-                    0: ("Chanterelle (Galbiori)", "✅ COMESTIBIL", "🟢"),
-                    1: ("Death-cap (Coprini)", "⚠️ EXTREM DE TOXIC!", "🔴"),
-                    2: ("Field Mushroom (De câmp)", "✅ COMESTIBIL", "🟢")
-                }
-                
-                name, safety, emoji = mushroom_types.get(cls, ("Necunoscut", "❓ NEIDENTIFICAT", "⚪"))
-                
-                print(f"   {i}. {emoji} {name}")
-                print(f"      Siguranță: {safety}")
-                print(f"      Confidence: {conf:.2%}")
-                
-                if cls == 1:
-                    print("      🚨 NU CONSUMAȚI! Contactați un specialist!")
-        else:
-            print("❓ Nu s-au detectat ciuperci în imagine")
+    print_detections(detections)
+    
+    if show:
+        from video_stream import draw_detections
+        
+        image, _ = read_image(img_path)
+        cv2.imshow("Mushroom detector", draw_detections(image, detections))
+        cv2.waitKey(0)
+        cv2.destroyAllWindows()
 
-if __name__ == "__main__":
+def run_menu():
+    """Meniul interactiv (rulat când nu se dă niciun argument)"""
     print("🍄 Test Model Detecție Ciuperci")
     print("=" * 40)
     
-    choice = input("Alegeți modul de test:\n1. Test automat pe imagini\n2. Test interactiv\nOpțiune (1/2): ").strip()
+    choice = input("Alegeți modul de test:\n1. Test automat pe imagini\n2. Test interactiv\n3. Test batch pe director\n4. Flux video / cameră\nOpțiune (1/2/3/4): ").strip()
     
     if choice == "1":
         test_trained_model()
     elif choice == "2":
         run_interactive_test()
+    elif choice == "3":
+        source_dir = input("📁 Director (implicit test/images): ").strip() or "test/images"
+        test_trained_model_batched(source_dir)
+    elif choice == "4":
+        from video_stream import make_synthetic_video, run_stream
+        source = input("🎥 Fișier video sau index cameră (gol = video sintetic): ").strip()
+        if not source:
+            source = make_synthetic_video()
+        run_stream(int(source) if source.isdigit() else source, show=True)
     else:
-        print("❌ Opțiune invalidă!")
\ No newline at end of file
+        print("❌ Opțiune invalidă!")
+
+def add_predict_arguments(parser):
+    """Argumentele de predicție (folosite și de mushroom_cli.py predict)"""
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--auto', action='store_true', help="Test automat pe test/images")
+    mode.add_argument('--image', help="O singură imagine (fără input())")
+    mode.add_argument('--batch-dir', help="Predicție în batch-uri pe un director")
+    mode.add_argument('--stream', help="Fișier video, index cameră sau 'synthetic'")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Cu --batch-dir: procese paralele, rulare reluabilă (sharded_predict.py)")
+    parser.add_argument('--backend', default='pytorch', choices=BACKENDS)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--cascade', action='store_true', help="Triaj rapid înaintea detectorului")
+    parser.add_argument('--show', action='store_true', help="Afișează rezultatul într-o fereastră")
+    parser.add_argument('--annotate', action='store_true',
+                        help="Salvează imaginile adnotate (pe un thread de fundal)")
+
+def run_predict(args):
+    """Rulează modul de predicție ales prin argumente; fără mod => meniul interactiv"""
+    if args.auto:
+        return test_trained_model(use_cache=not args.no_cache, backend=args.backend,
+                                  cascade=args.cascade, annotate=args.annotate)
+    if args.image:
+        return run_interactive_test(backend=args.backend, img_path=args.image, show=args.show,
+                                    annotate=args.annotate)
+    if args.batch_dir and args.workers > 1:
+        from sharded_predict import sharded_predict
+        return sharded_predict(args.batch_dir, workers=args.workers, backend=args.backend)
+    if args.batch_dir:
+        return test_trained_model_batched(args.batch_dir, backend=args.backend)
+    if args.stream:
+        from video_stream import make_synthetic_video, run_stream
+        source = make_synthetic_video() if args.stream == 'synthetic' else args.stream
+        return run_stream(int(source) if source.isdigit() else source, backend=args.backend,
+                          show=args.show)
+    return run_menu()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Testarea modelului de detecție ciuperci")
+    add_predict_arguments(parser)
+    run_predict(parser.parse_args())
@@ -7,6 +7,50 @@ from ultralytics import YOLO
 import torch
 import gc
 import os
+from pathlib import Path
+
+from auto_batch import NOMINAL_BATCH, effective_batch, is_out_of_memory, probe_max_batch
+from training_telemetry import TrainingTelemetry
+
+# Parametri optimizați pentru RTX 4050
+TRAINING_PARAMS = {
+    'data': 'data.yaml',           # Dataset path
+    'epochs': 100,                 # Numărul de epoci
+    'imgsz': 480,                  # Dimensiune mai mică (în loc de 640)
+    'batch': 4,                    # Batch size foarte mic pentru 6GB
+    'nbs': NOMINAL_BATCH,          # Batch nominal: acumularea gradientului păstrează batch-ul efectiv
+    'patience': 15,                # Early stopping
+    'save': True,                  # Salvează modelul
+    'device': 0,                   # Prima GPU
+    'workers': 2,                  # Mai puține procese worker
+    'amp': True,                   # Mixed precision (economisește VRAM)
+    'cache': False,                # Nu cache datele în RAM (vezi image_store.py)
+    'close_mosaic': 15,            # Dezactivează mosaic în ultimele epoci
+    'name': 'mushroom_detector_rtx4050',
+    'project': 'runs/detect',
+    'exist_ok': True,
+    'pretrained': True,
+    'optimizer': 'AdamW',          # Optimizer eficient
+    'lr0': 0.001,                  # Learning rate mai mic
+    'weight_decay': 0.0005,        # Regularizare
+    'warmup_epochs': 3,            # Warmup pentru stabilitate
+    'box': 7.5,                    # Loss weight pentru bounding boxes
+    'cls': 0.5,                    # Loss weight pentru clasificare
+    'dfl': 1.5,                    # Distribution focal loss weight
+    'hsv_h': 0.015,                # Augmentare culoare
+    'hsv_s': 0.7,                  # Augmentare saturație
+    'hsv_v': 0.4,                  # Augmentare luminozitate
+    'degrees': 0.0,                # Fără rotație (economisește compute)
+    'translate': 0.1,              # Translație minimă
+    'scale': 0.5,                  # Scaling augmentation
+    'shear': 0.0,                  # Fără shear
+    'perspective': 0.0,            # Fără perspective
+    'flipud': 0.0,                 # Fără flip vertical
+    'fliplr': 0.5,                 # Flip orizontal
+    'mosaic': 1.0,                 # Mosaic augmentation
+    'mixup': 0.0,                  # Fără mixup (economisește VRAM)
+    'copy_paste': 0.0,             # Fără copy-paste
+}
 
 def check_gpu_memory():
     """Verifică memoria GPU disponibilă"""
@@ -30,7 +74,8 @@ def check_gpu_memory():
 def optimize_for_rtx4050():
     """Optimizări specifice pentru RTX 4050"""
     # Curăță cache-ul GPU
-    torch.cuda.empty_cache()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
     gc.collect()
     
     # Setări pentru eficiență memorie
@@ -38,74 +83,129 @@ def optimize_for_rtx4050():
     
     print("🔧 Optimizări aplicate pentru RTX 4050")
 
-def train_mushroom_detector():
-    """Antrenează modelul de detecție ciuperci"""
+def train_mushroom_detector(use_image_store=True, auto_batch=False, max_oom_retries=3,
+                            offline_augment=0, augment_seed=0, device=None):
+    """Antrenează modelul de detecție ciuperci (device='cpu' sau fără CUDA: rețeta pentru CPU)"""
     
-    # Verifică GPU
-    if not check_gpu_memory():
-        print("⚠️  Memorie GPU insuficientă!")
-        return
-    
-    # Aplică optimizări
-    optimize_for_rtx4050()
+    use_cpu = device == 'cpu' or not torch.cuda.is_available()
+    if use_cpu:
+        print("🧮 CUDA indisponibil sau device=cpu - antrenare pe CPU")
+    else:
+        # Verifică GPU
+        if not check_gpu_memory():
+            print("⚠️  Memorie GPU insuficientă!")
+            return
+        
+        # Aplică optimizări
+        optimize_for_rtx4050()
     
     # Încarcă modelul cel mai mic (nano)
     print("📥 Încărcare model YOLOv11 nano...")
     model = YOLO('yolo11n.pt')  # Modelul cel mai mic pentru 6GB VRAM
     
     # Parametri optimizați pentru RTX 4050
-    training_params = {
-        'data': 'data.yaml',           # Dataset path
-        'epochs': 100,                 # Numărul de epoci
-        'imgsz': 480,                  # Dimensiune mai mică (în loc de 640)
-        'batch': 4,                    # Batch size foarte mic pentru 6GB
-        'patience': 15,                # Early stopping
-        'save': True,                  # Salvează modelul
-        'device': 0,                   # Prima GPU
-        'workers': 2,                  # Mai puține procese worker
-        'amp': True,                   # Mixed precision (economisește VRAM)
-        'cache': False,                # Nu cache datele în RAM
-        'close_mosaic': 15,            # Dezactivează mosaic în ultimele epoci
-        'name': 'mushroom_detector_rtx4050',
-        'project': 'runs/detect',
-        'exist_ok': True,
-        'pretrained': True,
-        'optimizer': 'AdamW',          # Optimizer eficient
-        'lr0': 0.001,                  # Learning rate mai mic
-        'weight_decay': 0.0005,        # Regularizare
-        'warmup_epochs': 3,            # Warmup pentru stabilitate
-        'box': 7.5,                    # Loss weight pentru bounding boxes
-        'cls': 0.5,                    # Loss weight pentru clasificare
-        'dfl': 1.5,                    # Distribution focal loss weight
-        'hsv_h': 0.015,                # Augmentare culoare
-        'hsv_s': 0.7,                  # Augmentare saturație
-        'hsv_v': 0.4,                  # Augmentare luminozitate
-        'degrees': 0.0,                # Fără rotație (economisește compute)
-        'translate': 0.1,              # Translație minimă
-        'scale': 0.5,                  # Scaling augmentation
-        'shear': 0.0,                  # Fără shear
-        'perspective': 0.0,            # Fără perspective
-        'flipud': 0.0,                 # Fără flip vertical
-        'fliplr': 0.5,                 # Flip orizontal
-        'mosaic': 1.0,                 # Mosaic augmentation
-        'mixup': 0.0,                  # Fără mixup (economisește VRAM)
-        'copy_paste': 0.0,             # Fără copy-paste
-    }
+    training_params = dict(TRAINING_PARAMS)
+    if use_cpu:
+        # Thread-uri și worker-i după nuclee, bf16 unde e suportat, același batch efectiv
+        from cpu_training import cpu_training_params
+        training_params, cpu_plan, cpu_bf16 = cpu_training_params(training_params)
+    elif device is not None:
+        training_params['device'] = device
+    
+    run_dir = Path(training_params['project']) / training_params['name']
+    
+    # Așteptare după dataloader vs calcul, throughput și memorie, per epocă
+    telemetry = TrainingTelemetry(run_dir / 'telemetry')
+    telemetry.attach(model)
+    
+    if auto_batch and not use_cpu:
+        # Cel mai mare batch care încape în memorie (mașinile mari nu mai rulează la batch 4)
+        probed = probe_max_batch('yolo11n.pt', imgsz=training_params['imgsz'],
+                                 amp=training_params['amp'], device=training_params['device'],
+                                 log_path=run_dir / 'batch_probe.json')
+        if probed:
+            training_params['batch'] = probed
+    
+    # nbs fixat la batch-ul efectiv al primei încercări: după un OOM, batch-ul înjumătățit
+    # acumulează dublu și păstrează exact același batch efectiv (scalarea loss-ului și LR-ul)
+    training_params['nbs'] = effective_batch(training_params['batch'], training_params['nbs'])
     
     print("🚀 Începe antrenarea cu parametri optimizați...")
     print(f"📋 Parametri cheie:")
     print(f"   • Batch size: {training_params['batch']}")
+    print(f"   • Batch efectiv (acumulare): "
+          f"{effective_batch(training_params['batch'], training_params['nbs'])}")
     print(f"   • Image size: {training_params['imgsz']}")
     print(f"   • Mixed precision: {training_params['amp']}")
     print(f"   • Workers: {training_params['workers']}")
+    print(f"   • Image store (memmap): {use_image_store and not offline_augment}")
+    print(f"   • Augmentare offline: {f'{offline_augment} epoci pre-generate' if offline_augment else 'nu'}")
     print("-" * 40)
     
+    train_kwargs = dict(training_params)
+    generator = None
+    if offline_augment:
+        # Epoci augmentate generate în fundal de un pool de procese, citite în ordine din shard-uri
+        from augment_shards import ShardDetectionTrainer, start_offline_augmentation
+        generator = start_offline_augmentation(offline_augment, training_params['epochs'], augment_seed)
+        if generator is None:
+            return None
+        train_kwargs['trainer'] = ShardDetectionTrainer
+        # Variantele fără mosaic sunt deja în shard-uri; close_mosaic ar reseta dataloader-ul
+        train_kwargs['close_mosaic'] = 0
+    elif use_image_store:
+        # Imagini decodate și redimensionate o singură dată, citite din memmap
+        from image_store import MemmapDetectionTrainer
+        train_kwargs['trainer'] = MemmapDetectionTrainer
+    
+    if use_cpu:
+        from cpu_training import cpu_trainer
+        from ultralytics.models.yolo.detect import DetectionTrainer
+        train_kwargs['trainer'] = cpu_trainer(train_kwargs.get('trainer', DetectionTrainer),
+                                              cpu_plan['workers'], cpu_bf16)
+    
     try:
-        # Antrenează modelul
-        results = model.train(**training_params)
+        for attempt in range(max_oom_retries + 1):
+            try:
+                # Antrenează modelul
+                results = model.train(**train_kwargs)
+                break
+            except RuntimeError as e:
+                if not is_out_of_memory(e) or attempt == max_oom_retries or train_kwargs['batch'] <= 1:
+                    raise
+                
+                # OOM: reluăm de la ultimul checkpoint cu batch mai mic; Ultralytics acumulează
+                # max(round(nbs / batch), 1) pași, iar nbs este batch-ul efectiv al primei încercări
+                new_batch = max(1, train_kwargs['batch'] // 2)
+                print(f"❌ CUDA out of memory la batch {train_kwargs['batch']}!")
+                print(f"🔄 Reîncerc cu batch {new_batch} "
+                      f"(acumulare {max(round(training_params['nbs'] / new_batch), 1)} pași, "
+                      f"batch efectiv {effective_batch(new_batch, training_params['nbs'])})")
+                
+                model = None
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                gc.collect()
+                
+                last_checkpoint = run_dir / 'weights' / 'last.pt'
+                if last_checkpoint.exists():
+                    print(f"📂 Reluare din: {last_checkpoint}")
+                    model = YOLO(str(last_checkpoint))
+                    telemetry.attach(model)
+                    # nbs este deja în argumentele checkpoint-ului; îl trimitem explicit pentru claritate
+                    train_kwargs = {'resume': True, 'batch': new_batch,
+                                    'nbs': training_params['nbs'],
+                                    'trainer': train_kwargs.get('trainer')}
+                    if train_kwargs['trainer'] is None:
+                        del train_kwargs['trainer']
+                else:
+                    model = YOLO('yolo11n.pt')
+                    telemetry.attach(model)
+                    train_kwargs['batch'] = new_batch
         
         print("✅ Antrenare completă!")
         print(f"📁 Modelul salvat în: runs/detect/mushroom_detector_rtx4050/")
+        telemetry.print_summary()
         
         # Validare finală
         print("🧪 Rulare validare finală...")
@@ -117,10 +217,14 @@ def train_mushroom_detector():
         print(f"   • Precision: {metrics.box.mp:.3f}")
         print(f"   • Recall: {metrics.box.mr:.3f}")
         
+        # Manifestul imaginilor învățate: punctul de plecare pentru incremental_training.py
+        from incremental_training import save_manifest, scan_images
+        save_manifest(scan_images(), float(metrics.box.map), run_dir / 'weights' / 'best.pt')
+        
         return results
         
     except RuntimeError as e:
-        if "out of memory" in str(e):
+        if is_out_of_memory(e):
             print("❌ CUDA out of memory!")
             print("💡 Încercați să reduceți batch_size la 2 sau 1")
             print("💡 Sau reduceți imgsz la 416")
@@ -129,8 +233,12 @@ def train_mushroom_detector():
         return None
     
     finally:
+        if generator is not None:
+            generator.close()
+        
         # Curăță memoria
-        torch.cuda.empty_cache()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
         gc.collect()
 
 if __name__ == "__main__":
@@ -145,6 +253,8 @@ if __name__ == "__main__":
         print("\n🎉 Antrenare reușită!")
         print("📝 Pentru a testa modelul:")
         print("   python test_model.py")
+        print("📝 Pentru imagini noi adăugate ulterior:")
+        print("   python incremental_training.py")
     else:
         print("\n❌ Antrenarea a eșuat!")
         print("💡 Verificați memoria GPU și reduceți parametrii")
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Telemetrie pentru antrenare prin callback-urile Ultralytics
+Măsoară per epocă și la fiecare N iterații timpul de așteptare după dataloader vs forward/backward,
+imagini/sec, vârful de RSS și de memorie pe accelerator; scrie JSONL + fișier text Prometheus
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import psutil
+import torch
+
+def _process_rss():
+    """RSS al procesului + al worker-ilor dataloader (procese copil)"""
+    process = psutil.Process()
+    rss = process.memory_info().rss
+    for child in process.children(recursive=True):
+        try:
+            rss += child.memory_info().rss
+        except psutil.Error:
+            pass
+    return rss
+
+class TrainingTelemetry:
+    """Callback-uri de antrenare care separă așteptarea după date de calcul"""
+    
+    def __init__(self, log_dir, every=20):
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.jsonl_path = self.log_dir / "telemetry.jsonl"
+        self.prom_path = self.log_dir / "telemetry.prom"
+        self.every = every
+        self.cuda = torch.cuda.is_available()
+        
+        self.totals = {'wait': 0.0, 'compute': 0.0, 'validation': 0.0, 'images': 0, 'epochs': 0}
+        self.peak_rss = 0
+        self.peak_accelerator = None
+        self._reset_window()
+    
+    def attach(self, model):
+        """Înregistrează callback-urile pe un model YOLO (din nou după fiecare reîncărcare)"""
+        model.add_callback('on_train_epoch_start', self.on_train_epoch_start)
+        model.add_callback('on_train_batch_start', self.on_train_batch_start)
+        model.add_callback('on_train_batch_end', self.on_train_batch_end)
+        model.add_callback('on_train_epoch_end', self.on_train_epoch_end)
+        model.add_callback('on_fit_epoch_end', self.on_fit_epoch_end)
+        return self
+    
+    def _reset_window(self):
+        self.window = {'wait': 0.0, 'compute': 0.0, 'images': 0, 'iterations': 0}
+    
+    def _sync(self):
+        # Kernel-urile CUDA sunt asincrone: fără sincronizare calculul ar apărea ca așteptare
+        if self.cuda:
+            torch.cuda.synchronize()
+    
+    def on_train_epoch_start(self, trainer):
+        self.epoch_start = time.perf_counter()
+        self.last_end = self.epoch_start
+        self.epoch = {'wait': 0.0, 'compute': 0.0, 'images': 0}
+        if self.cuda:
+            torch.cuda.reset_peak_memory_stats()
+    
+    def on_train_batch_start(self, trainer):
+        now = time.perf_counter()
+        wait = now - self.last_end
+        self.epoch['wait'] += wait
+        self.window['wait'] += wait
+        self.batch_start = now
+    
+    def on_train_batch_end(self, trainer):
+        self._sync()
+        now = time.perf_counter()
+        compute = now - self.batch_start
+        self.last_end = now
+        
+        images = trainer.batch_size
+        for bucket in (self.epoch, self.window):
+            bucket['compute'] += compute
+            bucket['images'] += images
+        self.window['iterations'] += 1
+        
+        if self.window['iterations'] >= self.every:
+            self._sample_memory()
+            busy = self.window['wait'] + self.window['compute']
+            self._write({
+                'type': 'iterations',
+                'epoch': trainer.epoch + 1,
+                'iterations': self.window['iterations'],
+                'dataloader_wait_s': self.window['wait'],
+                'compute_s': self.window['compute'],
+                'wait_fraction': self.window['wait'] / busy if busy else 0.0,
+                'images_per_sec': self.window['images'] / busy if busy else 0.0,
+                'peak_rss_bytes': self.peak_rss,
+                'peak_accelerator_bytes': self.peak_accelerator,
+            })
+            self._reset_window()
+    
+    def on_train_epoch_end(self, trainer):
+        self.train_loop_end = time.perf_counter()
+    
+    def on_fit_epoch_end(self, trainer):
+        # on_fit_epoch_end vine după validare: diferența față de bucla de antrenare = validarea
+        now = time.perf_counter()
+        validation = now - getattr(self, 'train_loop_end', now)
+        self._sample_memory()
+        
+        busy = self.epoch['wait'] + self.epoch['compute']
+        record = {
+            'type': 'epoch',
+            'epoch': trainer.epoch + 1,
+            'epoch_s': now - self.epoch_start,
+            'dataloader_wait_s': self.epoch['wait'],
+            'compute_s': self.epoch['compute'],
+            'validation_s': validation,
+            'wait_fraction': self.epoch['wait'] / busy if busy else 0.0,
+            'images_per_sec': self.epoch['images'] / busy if busy else 0.0,
+            'peak_rss_bytes': self.peak_rss,
+            'peak_accelerator_bytes': self.peak_accelerator,
+        }
+        self._write(record)
+        self._write_prometheus(record)
+        
+        self.totals['wait'] += self.epoch['wait']
+        self.totals['compute'] += self.epoch['compute']
+        self.totals['validation'] += validation
+        self.totals['images'] += self.epoch['images']
+        self.totals['epochs'] += 1
+    
+    def _sample_memory(self):
+        self.peak_rss = max(self.peak_rss, _process_rss())
+        if self.cuda:
+            peak = torch.cuda.max_memory_reserved()
+            self.peak_accelerator = max(self.peak_accelerator or 0, peak)
+    
+    def _write(self, record):
+        record['time'] = time.time()
+        with open(self.jsonl_path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+    
+    def _write_prometheus(self, record):
+        """Fișier text pentru node_exporter (textfile collector), scris atomic"""
+        metrics = {
+            'mushroom_train_epoch': record['epoch'],
+            'mushroom_train_images_per_second': record['images_per_sec'],
+            'mushroom_train_dataloader_wait_seconds': record['dataloader_wait_s'],
+            'mushroom_train_compute_seconds': record['compute_s'],
+            'mushroom_train_validation_seconds': record['validation_s'],
+            'mushroom_train_dataloader_wait_ratio': record['wait_fraction'],
+            'mushroom_train_peak_rss_bytes': record['peak_rss_bytes'],
+        }
+        if record['peak_accelerator_bytes'] is not None:
+            metrics['mushroom_train_peak_accelerator_bytes'] = record['peak_accelerator_bytes']
+        
+        tmp_path = self.prom_path.with_suffix('.prom.tmp')
+        with open(tmp_path, 'w') as f:
+            for name, value in metrics.items():
+                f.write(f"# TYPE {name} gauge\n{name} {value}\n")
+        os.replace(tmp_path, self.prom_path)
+    
+    def summary(self):
+        """Totalurile rulării și blocajul dominant"""
+        totals = self.totals
+        total = totals['wait'] + totals['compute'] + totals['validation']
+        if not total:
+            return None
+        
+        shares = {
+            'dataloader': totals['wait'] / total,
+            'compute': totals['compute'] / total,
+            'validation': totals['validation'] / total,
+        }
+        busy = totals['wait'] + totals['compute']
+        return {
+            'epochs': totals['epochs'],
+            'images_per_sec': totals['images'] / busy if busy else 0.0,
+            'shares': shares,
+            'bottleneck': max(shares, key=shares.get),
+            'peak_rss_bytes': self.peak_rss,
+            'peak_accelerator_bytes': self.peak_accelerator,
+        }
+    
+    def print_summary(self):
+        summary = self.summary()
+        if summary is None:
+            print("⚠️  Telemetrie: nicio epocă înregistrată")
+            return None
+        
+        shares = summary['shares']
+        print(f"\n📈 Telemetrie antrenare ({summary['epochs']} epoci):")
+        print(f"   • Throughput: {summary['images_per_sec']:.1f} imagini/sec")
+        print(f"   • Așteptare dataloader: {shares['dataloader']:.0%}")
+        print(f"   • Forward/backward: {shares['compute']:.0%}")
+        print(f"   • Validare: {shares['validation']:.0%}")
+        print(f"   • Vârf RSS (cu worker-ii): {summary['peak_rss_bytes'] / 1024**3:.2f}GB")
+        if summary['peak_accelerator_bytes'] is not None:
+            print(f"   • Vârf memorie GPU: {summary['peak_accelerator_bytes'] / 1024**3:.2f}GB")
+        
+        advice = {
+            'dataloader': "modelul așteaptă după date - măriți 'workers', folosiți image store "
+                          "sau reduceți augmentarea (mosaic)",
+            'compute': "calculul domină - dataloader-ul ține pasul cu modelul",
+            'validation': "validarea domină - validați mai rar sau pe imgsz mai mic",
+        }
+        print(f"   🎯 Blocaj dominant: {summary['bottleneck']} - {advice[summary['bottleneck']]}")
+        if summary['bottleneck'] != 'dataloader' and shares['dataloader'] >= 0.25:
+            print(f"   ⚠️  Totuși {shares['dataloader']:.0%} din timp se așteaptă după date - "
+                  f"{advice['dataloader']}")
+        print(f"📁 Telemetrie: {self.jsonl_path}, {self.prom_path}")
+        return summary
@@ -0,0 +1,255 @@
+"""
+Inferență pe flux video (fișier sau cameră) cu sărire adaptivă de cadre
+Decodarea rulează pe un thread separat într-o coadă limitată; avertizările death-cap nu se pierd niciodată
+"""
+
+import argparse
+import math
+import queue
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from mushroom_detector import MushroomDetector, to_detections
+from test_model import MUSHROOM_TYPES, filter_detections, load_class_thresholds, resolve_backend
+
+DEATH_CAP = 1
+
+class FrameReader:
+    """Citește cadre pe un thread separat; la coadă plină renunță la cel mai vechi cadru"""
+    
+    def __init__(self, source, max_queue=4, realtime=None):
+        self.capture = cv2.VideoCapture(source)
+        if not self.capture.isOpened():
+            raise IOError(f"Nu pot deschide sursa video: {source}")
+        
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        # Fișierele video sunt citite în ritmul lor nativ, ca o cameră reală
+        self.realtime = realtime if realtime is not None else not isinstance(source, int)
+        self.frames = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.read = 0
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+    
+    def start(self):
+        self.thread.start()
+        return self
+    
+    def _loop(self):
+        start = time.perf_counter()
+        while not self.finished.is_set():
+            ok, frame = self.capture.read()
+            if not ok:
+                break
+            if self.realtime:
+                delay = start + self.read / self.fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            
+            item = (self.read, time.perf_counter(), frame)
+            self.read += 1
+            try:
+                self.frames.put_nowait(item)
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+                self.frames.put_nowait(item)
+        
+        self.capture.release()
+        self.finished.set()
+    
+    def get(self, timeout=0.1):
+        """Următorul cadru sau None când sursa s-a terminat"""
+        while True:
+            try:
+                return self.frames.get(timeout=timeout)
+            except queue.Empty:
+                if self.finished.is_set() and self.frames.empty():
+                    return None
+    
+    def latest(self, item):
+        """Renunță la cadrele învechite din coadă și returnează cel mai recent"""
+        while True:
+            try:
+                newer = self.frames.get_nowait()
+            except queue.Empty:
+                return item
+            self.dropped += 1
+            item = newer
+    
+    def stop(self):
+        self.finished.set()
+        self.thread.join(timeout=2)
+
+def draw_detections(frame, detections):
+    """Desenează casetele pe cadru (roșu pentru death-cap)"""
+    for det in detections:
+        x1, y1, x2, y2 = (int(v) for v in det['box'])
+        color = (0, 0, 255) if det['toxic'] else (0, 200, 0)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, f"{det['name']} {det['confidence']:.0%}", (x1, max(15, y1 - 5)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    return frame
+
+def run_stream(source=0, target_latency_ms=150, conf=0.25, imgsz=480, backend='pytorch',
+               show=False, output=None, max_queue=4, alert_hold_s=2.0):
+    """Inferență continuă pe un flux video; returnează statisticile rulării"""
+    
+    model_path, _ = resolve_backend(backend)
+    if model_path is None:
+        return None
+    thresholds = load_class_thresholds(model_path)
+    
+    # Încălzirea la încărcare: primul cadru nu umflă media timpului de inferență
+    detector = MushroomDetector.load(backend, imgsz=imgsz, conf=conf, thresholds=thresholds)
+    if detector is None:
+        return None
+    
+    reader = FrameReader(source, max_queue=max_queue).start()
+    writer = None
+    
+    latencies = []
+    alerts = []
+    processed = inferred = skipped = 0
+    detections = []
+    infer_ms = None                # medie exponențială a timpului de inferență
+    frame_interval_ms = 1000 / reader.fps
+    alert_until = 0.0
+    next_inference = 0
+    
+    print(f"🎥 Flux pornit ({reader.fps:.0f} FPS sursă, țintă latență {target_latency_ms}ms)")
+    start = time.perf_counter()
+    
+    try:
+        while True:
+            item = reader.get()
+            if item is None:
+                break
+            
+            now = time.perf_counter()
+            watching_death_cap = now < alert_until
+            
+            # Latență peste țintă: sărim direct la cel mai recent cadru
+            if (now - item[1]) * 1000 > target_latency_ms:
+                item = reader.latest(item)
+            index, captured, frame = item
+            
+            # Death-cap recent => inferență pe fiecare cadru, fără sărituri
+            if watching_death_cap or index >= next_inference:
+                t0 = time.perf_counter()
+                result = detector(frame, raw=True)
+                elapsed_ms = (time.perf_counter() - t0) * 1000
+                infer_ms = elapsed_ms if infer_ms is None else 0.8 * infer_ms + 0.2 * elapsed_ms
+                detections = filter_detections(to_detections(result), thresholds, default=conf)
+                death_caps = [det['confidence'] for det in detections if det['class_id'] == DEATH_CAP]
+                inferred += 1
+                
+                # Câte cadre încap într-o inferență: le refolosim casetele
+                stride = max(1, math.ceil(infer_ms / frame_interval_ms))
+                next_inference = index + stride
+                
+                if death_caps:
+                    alert_until = time.perf_counter() + alert_hold_s
+                    best = max(death_caps)
+                    alerts.append({'frame': index, 'confidence': best,
+                                   'time_s': time.perf_counter() - start})
+                    # Avertizarea se emite sincron - nu trece prin nicio coadă care pierde elemente
+                    print(f"🚨 CADRU {index}: {MUSHROOM_TYPES[DEATH_CAP][0]} "
+                          f"({best:.0%}) - NU CONSUMAȚI!")
+            else:
+                skipped += 1
+            
+            if show or output:
+                annotated = draw_detections(frame.copy(), detections)
+                if output:
+                    if writer is None:
+                        h, w = annotated.shape[:2]
+                        writer = cv2.VideoWriter(str(output), cv2.VideoWriter_fourcc(*'mp4v'),
+                                                 reader.fps, (w, h))
+                    writer.write(annotated)
+                if show:
+                    cv2.imshow("Mushroom stream", annotated)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        break
+            
+            processed += 1
+            latencies.append((time.perf_counter() - captured) * 1000)
+    
+    except KeyboardInterrupt:
+        print("\n🛑 Oprire flux...")
+    finally:
+        reader.stop()
+        if writer is not None:
+            writer.release()
+        if show:
+            cv2.destroyAllWindows()
+    
+    elapsed = time.perf_counter() - start
+    stats = {
+        'frames_read': reader.read,
+        'frames_processed': processed,
+        'frames_inferred': inferred,
+        'frames_reused': skipped,
+        'frames_dropped': reader.dropped,
+        'fps': processed / elapsed if elapsed > 0 else 0.0,
+        'inference_fps': inferred / elapsed if elapsed > 0 else 0.0,
+        'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies else 0.0,
+        'latency_p95_ms': float(np.percentile(latencies, 95)) if latencies else 0.0,
+        'death_cap_alerts': alerts,
+    }
+    
+    print(f"\n📊 Rezultate flux:")
+    print(f"   • FPS obținut: {stats['fps']:.1f} (inferență: {stats['inference_fps']:.1f})")
+    print(f"   • Latență end-to-end: p50 {stats['latency_p50_ms']:.0f}ms, "
+          f"p95 {stats['latency_p95_ms']:.0f}ms")
+    print(f"   • Cadre: {reader.read} citite, {inferred} inferate, {skipped} cu casete refolosite, "
+          f"{reader.dropped} aruncate")
+    print(f"   • Avertizări death-cap: {len(alerts)}")
+    
+    return stats
+
+def make_synthetic_video(path="runs/stream/synthetic.mp4", image_dir="test/images",
+                         frames_per_image=15, fps=30, size=(640, 480), limit=10):
+    """Generează un video local din imaginile de test (pentru testarea fluxului)"""
+    images = sorted(Path(image_dir).glob("*.jpg"))[:limit]
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for img_path in images:
+        frame = cv2.resize(cv2.imread(str(img_path)), size)
+        for i in range(frames_per_image):
+            # Mică deplasare pe fiecare cadru, ca într-o filmare din mână
+            shift = np.float32([[1, 0, i % 5 - 2], [0, 1, i % 3 - 1]])
+            writer.write(cv2.warpAffine(frame, shift, size, borderMode=cv2.BORDER_REFLECT))
+    writer.release()
+    
+    print(f"🎞️  Video sintetic: {path} ({len(images) * frames_per_image} cadre, {fps} FPS)")
+    return str(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detecție ciuperci pe flux video")
+    parser.add_argument('source', nargs='?', default=None,
+                        help="Fișier video sau index cameră (implicit: video sintetic)")
+    parser.add_argument('--target-latency-ms', type=float, default=150)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--imgsz', type=int, default=480)
+    parser.add_argument('--show', action='store_true')
+    parser.add_argument('--output', help="Salvează video-ul adnotat")
+    args = parser.parse_args()
+    
+    if args.source is None:
+        source = make_synthetic_video()
+    elif args.source.isdigit():
+        source = int(args.source)
+    else:
+        source = args.source
+    
+    run_stream(source, args.target_latency_ms, args.conf, args.imgsz,
+               show=args.show, output=args.output)